@@ -1,5 +1,6 @@
 from configparser import SectionProxy
-from azure.identity import DeviceCodeCredential
+from azure.identity import (AuthenticationRecord, DeviceCodeCredential,
+                            TokenCachePersistenceOptions)
 from msgraph.graph_service_client import GraphServiceClient
 from msgraph.generated.users.item.user_item_request_builder import UserItemRequestBuilder
 from msgraph.generated.users.item.mail_folders.item.messages.messages_request_builder import (
@@ -13,7 +14,6 @@ from msgraph.generated.models.recipient import Recipient
 from msgraph.generated.models.email_address import EmailAddress
 
 import webbrowser
-import json
 import os
 
 class Graph:
@@ -27,8 +27,18 @@ class Graph:
         tenant_id = self.settings['tenantId']
         graph_scopes = self.settings['graphUserScopes'].split(' ')
 
+        # Tokens (including the refresh token) live in the persistent MSAL cache;
+        # the authentication record tells the credential which cached account to use,
+        # so later runs get tokens silently instead of prompting for a device code
+        self.auth_record = self.load_login_info()
         self.device_code_credential = DeviceCodeCredential(
-            client_id, tenant_id=tenant_id)
+            client_id, tenant_id=tenant_id,
+            cache_persistence_options=TokenCachePersistenceOptions(
+                name=self.settings.get('tokenCacheName', 'python_ms_graph'),
+                # plaintext fallback only when explicitly enabled (e.g. headless hosts without a keyring)
+                allow_unencrypted_storage=self.settings.get(
+                    'allowUnencryptedCache', 'false').lower() == 'true'),
+            authentication_record=self.auth_record)
         self.user_client = GraphServiceClient(self.device_code_credential,
                                               graph_scopes)
 
@@ -53,12 +63,11 @@ class Graph:
         # ^ this cause: type object 'UserItemRequestBuilder' has no attribute 'UserItemRequestBuilderGetRequestConfiguration'
         #   need rolling back to msgraph-sdk==1.2.0
 
-        
-        # open default browser and go to https://microsoft.com/devicelogin
-        webbrowser.open("https://microsoft.com/devicelogin")
+
+        if self.auth_record is None:
+            self.login()
 
         user = await self.user_client.me.get(request_configuration=request_config)
-        self.save_login_info()
 
 
         return user
@@ -138,42 +147,52 @@ class Graph:
 
     # extra functions not in tutorial
 
+    def _record_path(self):
+        record_file = self.settings.get('authRecordPath', 'pri/auth_record.json')
+        if not os.path.isabs(record_file):
+            record_file = os.path.join(os.getcwd(), record_file)
+        return record_file
+
+    def login(self):
+        """
+        Run the device code flow once and save the resulting authentication record.
+        The tokens themselves are kept in the persistent cache.
+        """
+        # open default browser and go to https://microsoft.com/devicelogin
+        webbrowser.open("https://microsoft.com/devicelogin")
+        graph_scopes = self.settings['graphUserScopes'].split(' ')
+        self.auth_record = self.device_code_credential.authenticate(scopes=graph_scopes)
+        self.save_login_info()
+
     def load_login_info(self):
-        token_file_path = self.settings.get('tokenFilePath', 'pri/tokens.json')
-        if os.path.exists(token_file_path):
+        record_file = self._record_path()
+        if os.path.exists(record_file):
             try:
-                with open(token_file_path, 'r') as f:
-                    tokens = json.load(f)
-                    print(f"Loaded token from {token_file_path}")
+                with open(record_file, 'r') as f:
+                    record = AuthenticationRecord.deserialize(f.read())
+                print(f"Loaded login info from {record_file}")
+                return record
             except Exception as e:
                 print(f"Failed to load login info: {e}")
         else:
-            print(f"Token file not found: {token_file_path}")
+            print(f"Login info not found: {record_file}")
+        return None
 
 
     def save_login_info(self):
-        token_file = 'pri/tokens.json'
-        graph_scopes = self.settings['graphUserScopes']
-        access_token = self.device_code_credential.get_token(graph_scopes)
-
-        # Validate the token_file path
-        if not os.path.isabs(token_file):
-            token_file = os.path.join(os.getcwd(), token_file)
-
-        tokens = {
-            'graph_scopes': graph_scopes,
-            'access_token': access_token.token,
-            # Uncommenting refresh_token if needed
-            #'refresh_token': access_token.refresh_token
-        }
+        # The authentication record holds the account and tenant only, so saving it
+        # needs no token request
+        if self.auth_record is None:
+            print("Not logged in yet, nothing to save")
+            return
 
+        record_file = self._record_path()
         try:
-            with open(token_file, 'w') as f:
-                json.dump(tokens, f)
-            print(f"Login info saved successfully to {token_file}")
+            os.makedirs(os.path.dirname(record_file), exist_ok=True)
+            with open(record_file, 'w') as f:
+                f.write(self.auth_record.serialize())
+            print(f"Login info saved successfully to {record_file}")
         except IOError as e:
             print(f"An I/O error occurred while saving login info: {e}")
-        except json.JSONDecodeError as e:
-            print(f"JSON encoding error: {e}")
         except Exception as e:
             print(f"Unexpected error: {e}")
@@ -0,0 +1,261 @@
+"""
+向量化回測模塊
+以 (日期 × 股票) 陣列一次計算整段歷史的技術指標與 InvestmentAdvisor 評分，
+模擬次日進場的部位與交易成本，回報報酬與回撤
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from analysis.investment_advisor import InvestmentAdvisor
+
+
+def _ema_panel(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    逐欄 EMA（與 TechnicalIndicators.calculate_ema 相同：第一個值用 SMA）
+
+    Args:
+        values: (T, N) 陣列；每欄允許開頭為 NaN（尚未上市或指標尚未產生）
+        period: 週期
+
+    Returns:
+        (T, N) 陣列
+    """
+    valid_count = np.cumsum(~np.isnan(values), axis=0)
+    sma = pd.DataFrame(values).rolling(period, min_periods=period).mean().to_numpy()
+    multiplier = 2 / (period + 1)
+
+    out = np.full(values.shape, np.nan)
+    ema = np.full(values.shape[1], np.nan)
+    for t in range(values.shape[0]):
+        seed = valid_count[t] == period
+        ema = np.where(seed, sma[t], (values[t] - ema) * multiplier + ema)
+        out[t] = ema
+    return out
+
+
+def _shift(values: np.ndarray) -> np.ndarray:
+    """沿時間軸後移一列（取得前一根的值）"""
+    shifted = np.full(values.shape, np.nan)
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def compute_indicators(closes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    計算整段歷史的指標面板（欄位名稱與 score_universe 相同）
+
+    Args:
+        closes: (T, N) 收盤價；中間缺值需先前向填補
+
+    Returns:
+        欄位名稱 → (T, N) 陣列
+    """
+    closes = np.asarray(closes, dtype=float)
+    frame = pd.DataFrame(closes)
+
+    rolling20 = frame.rolling(20, min_periods=20)
+    middle = rolling20.mean().to_numpy()
+    std = rolling20.std(ddof=0).to_numpy()
+
+    # RSI：最近 14 個價差的簡單平均（無下跌時為 100）
+    deltas = frame.diff()
+    gains = deltas.clip(lower=0).rolling(14, min_periods=14).sum().to_numpy()
+    losses = (-deltas.clip(upper=0)).rolling(14, min_periods=14).sum().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(losses > 0, 100 - 100 / (1 + gains / losses), 100.0)
+    rsi[np.isnan(gains)] = np.nan
+
+    macd = _ema_panel(closes, 12) - _ema_panel(closes, 26)
+    signal_line = _ema_panel(macd, 9)
+    histogram = macd - signal_line
+
+    return {
+        'close': closes,
+        'ma20': middle,
+        'rsi14': rsi,
+        'macd': macd,
+        'macd_prev': _shift(macd),
+        'signal': signal_line,
+        'signal_prev': _shift(signal_line),
+        'histogram': histogram,
+        'histogram_prev': _shift(histogram),
+        'upper': middle + 2 * std,
+        'middle': middle,
+        'lower': middle - 2 * std,
+    }
+
+
+def performance_metrics(returns: np.ndarray, periods_per_year: int = 252) -> Dict:
+    """
+    計算報酬序列的績效指標
+
+    Args:
+        returns: 每期報酬
+        periods_per_year: 每年期數
+
+    Returns:
+        總報酬、年化報酬、年化波動、夏普值、最大回撤
+    """
+    returns = np.nan_to_num(np.asarray(returns, dtype=float))
+    if not len(returns):
+        return {'total_return': 0.0, 'cagr': 0.0, 'volatility': 0.0, 'sharpe': 0.0, 'max_drawdown': 0.0}
+
+    equity = np.cumprod(1 + returns)
+    peak = np.maximum.accumulate(equity)
+    drawdown = equity / peak - 1
+
+    years = len(returns) / periods_per_year
+    total = equity[-1] - 1
+    std = returns.std()
+
+    return {
+        'total_return': round(float(total), 4),
+        'cagr': round(float(equity[-1] ** (1 / years) - 1), 4) if years > 0 and equity[-1] > 0 else 0.0,
+        'volatility': round(float(std * np.sqrt(periods_per_year)), 4),
+        'sharpe': round(float(returns.mean() / std * np.sqrt(periods_per_year)), 3) if std > 0 else 0.0,
+        'max_drawdown': round(float(drawdown.min()), 4),
+    }
+
+
+class Backtester:
+    """InvestmentAdvisor 訊號回測器"""
+
+    def __init__(self, advisor: Optional[InvestmentAdvisor] = None,
+                 buy_threshold: float = 20, sell_threshold: float = -20,
+                 cost_bps: float = 10.0, allow_short: bool = False,
+                 periods_per_year: int = 252):
+        """
+        初始化
+
+        Args:
+            advisor: 投資建議器（評分規則來源）
+            buy_threshold: 評分達此值時持有多單（預設同「買入」）
+            sell_threshold: 評分低於此值時出場（或放空）
+            cost_bps: 單邊交易成本（基點，含手續費與滑價）
+            allow_short: 賣出訊號是否放空
+            periods_per_year: 每年交易日數
+        """
+        self.advisor = advisor or InvestmentAdvisor()
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.cost_bps = cost_bps
+        self.allow_short = allow_short
+        self.periods_per_year = periods_per_year
+
+    def positions(self, score: np.ndarray) -> np.ndarray:
+        """
+        由評分產生目標部位（介於門檻之間維持原部位）
+
+        Args:
+            score: (T, N) 評分
+
+        Returns:
+            (T, N) 目標部位（1 多單、0 空手、-1 空單）
+        """
+        short = -1.0 if self.allow_short else 0.0
+        target = np.where(score >= self.buy_threshold, 1.0,
+                          np.where(score < self.sell_threshold, short, np.nan))
+        return pd.DataFrame(target).ffill().fillna(0.0).to_numpy()
+
+    def simulate(self, closes: np.ndarray, target: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        模擬部位報酬（收盤產生訊號，次一根 K 線持有）
+
+        Args:
+            closes: (T, N) 收盤價
+            target: (T, N) 目標部位
+
+        Returns:
+            {'held': 實際部位, 'returns': 扣成本後每股報酬, 'turnover': 換手}
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            asset_returns = np.nan_to_num(closes[1:] / closes[:-1] - 1)
+
+        held = np.zeros(closes.shape)
+        held[1:] = target[:-1]
+        turnover = np.abs(np.diff(held, axis=0, prepend=0))
+        gross = np.zeros(closes.shape)
+        gross[1:] = held[1:] * asset_returns
+        net = gross - turnover * self.cost_bps / 10000
+        return {'held': held, 'returns': net, 'turnover': turnover}
+
+    def run(self, closes, indicators: Optional[Dict[str, np.ndarray]] = None,
+            score: Optional[np.ndarray] = None, per_symbol: bool = True) -> Dict:
+        """
+        執行回測
+
+        Args:
+            closes: 收盤價 DataFrame（索引為日期、欄為股票代碼）
+            indicators: 預先計算的指標面板（None 時計算）
+            score: 預先計算的評分（None 時以 advisor 計算）
+            per_symbol: 是否計算各股績效（參數掃描時可關閉）
+
+        Returns:
+            回測結果：整體績效、等權買進持有基準、各股績效與淨值曲線
+        """
+        if not isinstance(closes, pd.DataFrame):
+            closes = pd.DataFrame(closes)
+        symbols = [str(c) for c in closes.columns]
+        prices = closes.ffill().to_numpy(dtype=float)
+
+        if score is None:
+            if indicators is None:
+                indicators = compute_indicators(prices)
+            score = self.advisor.score_universe(indicators)['score']
+
+        target = self.positions(score)
+        sim = self.simulate(prices, target)
+
+        # 等權分配：每支股票一份資金，未持有的部分為現金
+        listed = ~np.isnan(prices)
+        weights = listed / np.maximum(listed.sum(axis=1, keepdims=True), 1)
+        portfolio = (sim['returns'] * weights).sum(axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            asset_returns = np.zeros(prices.shape)
+            asset_returns[1:] = np.nan_to_num(prices[1:] / prices[:-1] - 1)
+        benchmark = (asset_returns * weights).sum(axis=1)
+
+        metrics = performance_metrics(portfolio, self.periods_per_year)
+        metrics.update({
+            'exposure': round(float((np.abs(sim['held']) * weights).sum(axis=1).mean()), 4),
+            'turnover': round(float((sim['turnover'] * weights).sum()), 2),
+            'trades': int((sim['turnover'] > 0).sum()),
+        })
+
+        symbol_stats = {}
+        for i, symbol in enumerate(symbols if per_symbol else []):
+            stats = performance_metrics(sim['returns'][:, i], self.periods_per_year)
+            stats['trades'] = int((sim['turnover'][:, i] > 0).sum())
+            symbol_stats[symbol] = stats
+
+        return {
+            'metrics': metrics,
+            'benchmark': performance_metrics(benchmark, self.periods_per_year),
+            'per_symbol': symbol_stats,
+            'equity': pd.Series(np.cumprod(1 + portfolio), index=closes.index),
+            'parameters': {
+                'buy_threshold': self.buy_threshold,
+                'sell_threshold': self.sell_threshold,
+                'cost_bps': self.cost_bps,
+                'allow_short': self.allow_short,
+                'rsi_levels': dict(self.advisor.rsi_levels),
+            },
+        }
+
+
+def closes_frame(history: Dict[str, Dict]) -> pd.DataFrame:
+    """
+    將 get_multiple_symbols 的結果轉為收盤價 DataFrame
+
+    Args:
+        history: 股票代碼 → 歷史數據（含 'dates' 與 'prices'）
+
+    Returns:
+        索引為日期、欄為股票代碼的 DataFrame
+    """
+    series = {symbol: pd.Series(data['prices'], index=pd.to_datetime(data['dates']))
+              for symbol, data in history.items() if data.get('prices')}
+    return pd.DataFrame(series).sort_index()
@@ -0,0 +1,232 @@
+"""
+個股新聞實體索引
+一次掃描新聞語料，將股票代碼與公司名稱對應到文章，
+並以時間衰減加權彙總每支股票的新聞情感
+"""
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Optional, Iterable
+
+# 公司名稱中可省略的後綴（「Apple Inc.」也要能比對「Apple」）
+_COMPANY_SUFFIXES = {
+    'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'companies',
+    'ltd', 'limited', 'plc', 'llc', 'lp', 'holdings', 'holding', 'group',
+    'sa', 'ag', 'nv', 'se', 'class', 'a', 'b', 'c', '&',
+}
+
+# 別名最短長度（避免「GE」這類名稱比對到一般詞彙）
+_MIN_ALIAS_LENGTH = 3
+
+
+def company_aliases(name: str) -> List[str]:
+    """
+    由公司全名產生比對用別名
+
+    Args:
+        name: 公司名稱，例如 'Apple Inc.'
+
+    Returns:
+        別名列表，例如 ['Apple Inc.', 'Apple']
+    """
+    if not name:
+        return []
+
+    aliases = [name.strip()]
+    words = re.sub(r'[,.]', ' ', name).split()
+    while len(words) > 1 and words[-1].lower() in _COMPANY_SUFFIXES:
+        words.pop()
+    short = ' '.join(words)
+    if short and short.lower() != aliases[0].lower():
+        aliases.append(short)
+
+    return [alias for alias in aliases if len(alias) >= _MIN_ALIAS_LENGTH]
+
+
+def parse_published(value) -> Optional[datetime]:
+    """
+    解析新聞發佈時間（RSS 的 RFC 822 格式或 ISO 格式）
+
+    Returns:
+        含時區的 datetime（無時區視為 UTC），無法解析時回傳 None
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif not value:
+        return None
+    else:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            try:
+                parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+            except ValueError:
+                return None
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class EntityIndex:
+    """股票 → 相關新聞的倒排索引"""
+
+    def __init__(self, half_life_hours: float = 24.0, threshold: float = 0.05):
+        """
+        初始化
+
+        Args:
+            half_life_hours: 情感權重的半衰期（小時）
+            threshold: 彙總極性的中性區間閾值
+        """
+        self.half_life_hours = half_life_hours
+        self.threshold = threshold
+        self.articles: List[Dict] = []
+        # 股票代碼大小寫敏感（避免 'ON'、'ALL' 比對到一般英文）；公司名稱不區分大小寫
+        self._tickers: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._pattern = None
+
+    def add_symbol(self, symbol: str, name: Optional[str] = None,
+                   aliases: Optional[Iterable[str]] = None):
+        """
+        添加股票
+
+        Args:
+            symbol: 股票代碼
+            name: 公司名稱（如 get_stock_info 的 'name'）
+            aliases: 其他別名
+        """
+        self._tickers[symbol] = symbol
+        for alias in company_aliases(name) + list(aliases or []):
+            self._names.setdefault(alias.lower(), symbol)
+        self._postings.setdefault(symbol, [])
+        self._pattern = None
+
+    def add_symbols(self, infos: List[Dict]):
+        """批量添加股票（get_stock_info 格式的字典列表）"""
+        for info in infos:
+            if info.get('symbol'):
+                self.add_symbol(info['symbol'], info.get('name'))
+
+    def _compile(self):
+        """將所有代碼與名稱合併為單一正則表達式"""
+        def alternation(terms):
+            return '|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+
+        parts = []
+        if self._tickers:
+            tickers = alternation(self._tickers)
+            # 一個字母的代碼只接受 $ 前綴寫法
+            long_tickers = alternation(t for t in self._tickers if len(t) > 1)
+            parts.append(rf'\$(?:{tickers})')
+            if long_tickers:
+                parts.append(long_tickers)
+        if self._names:
+            parts.append(rf'(?i:{alternation(self._names)})')
+
+        self._pattern = re.compile(rf"(?<![\w$])(?:{'|'.join(parts)})(?![\w])")
+
+    def _resolve(self, match: str) -> Optional[str]:
+        ticker = match.lstrip('$')
+        if ticker in self._tickers:
+            return self._tickers[ticker]
+        return self._names.get(match.lower())
+
+    def match(self, text: str) -> List[str]:
+        """找出文本提及的股票（依首次出現順序）"""
+        if not self._tickers:
+            return []
+        if self._pattern is None:
+            self._compile()
+
+        found = []
+        for m in self._pattern.finditer(text):
+            symbol = self._resolve(m.group(0))
+            if symbol and symbol not in found:
+                found.append(symbol)
+        return found
+
+    def index(self, articles: List[Dict]) -> 'EntityIndex':
+        """
+        索引新聞（單次掃描）
+
+        Args:
+            articles: 新聞列表（標題與摘要皆會比對）
+
+        Returns:
+            self
+        """
+        for article in articles:
+            position = len(self.articles)
+            self.articles.append(article)
+            text = f"{article.get('title', '')} {article.get('summary', '')}"
+            for symbol in self.match(text):
+                self._postings[symbol].append(position)
+        return self
+
+    def articles_for(self, symbol: str) -> List[Dict]:
+        """取得股票的相關新聞"""
+        return [self.articles[i] for i in self._postings.get(symbol, [])]
+
+    def _weight(self, article: Dict, now: datetime) -> float:
+        published = parse_published(article.get('published'))
+        if published is None or not self.half_life_hours:
+            return 1.0
+        age_hours = max(0.0, (now - published).total_seconds() / 3600)
+        return 0.5 ** (age_hours / self.half_life_hours)
+
+    def aggregate(self, symbol: str, now: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        彙總單一股票的新聞情感（新聞需已由 analyze_articles 標註 'sentiment'）
+
+        Args:
+            symbol: 股票代碼
+            now: 計算時間衰減的基準時間（預設現在）
+
+        Returns:
+            {'sentiment', 'polarity', 'article_count', 'weight'}，無相關新聞時回傳 None
+        """
+        now = now or datetime.now(timezone.utc)
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+
+        total_weight = 0.0
+        weighted = 0.0
+        count = 0
+        for article in self.articles_for(symbol):
+            result = article.get('sentiment')
+            if not result:
+                continue
+            weight = self._weight(article, now)
+            total_weight += weight
+            weighted += weight * result.get('polarity', 0)
+            count += 1
+
+        if not count or total_weight <= 0:
+            return None
+
+        polarity = weighted / total_weight
+        if polarity > self.threshold:
+            sentiment = 'positive'
+        elif polarity < -self.threshold:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+
+        return {
+            'sentiment': sentiment,
+            'polarity': round(polarity, 4),
+            'article_count': count,
+            'weight': round(total_weight, 4),
+        }
+
+    def aggregate_all(self, now: Optional[datetime] = None) -> Dict[str, Dict]:
+        """彙總所有有相關新聞的股票"""
+        results = {}
+        for symbol in self._postings:
+            result = self.aggregate(symbol, now)
+            if result:
+                results[symbol] = result
+        return results
@@ -172,12 +172,18 @@ class InvestmentAdvisor:
         else:
             impact = 0
 
-        return {
+        result = {
             'sentiment': sentiment,
             'score': round(polarity, 3),
             'impact': round(impact, 2)
         }
 
+        # 個股彙總情感（EntityIndex.aggregate）附帶新聞數量
+        if 'article_count' in sentiment_data:
+            result['article_count'] = sentiment_data['article_count']
+
+        return result
+
     def generate_recommendation(self, 
                                 symbol: str,
                                 indicators: Dict,
@@ -238,6 +244,132 @@ class InvestmentAdvisor:
 
         return report
 
+    def score_components(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        分項計算技術評分（規則與 analyze_technical 相同）
+
+        欄位（任意形狀，可廣播）：rsi14, macd, macd_prev, signal, signal_prev,
+        histogram, histogram_prev, upper, middle, lower, ma20, close（當前價格）；
+        缺少的欄位或 NaN 視為沒有該指標
+
+        只有 'rsi' 分項與 rsi_levels 有關，參數掃描時其餘分項可重複使用
+
+        Args:
+            columns: 欄位名稱 → 最新值陣列
+
+        Returns:
+            {'rsi', 'macd', 'bollinger', 'ma'} 分項評分陣列
+        """
+        arrays = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+        shape = np.broadcast(*arrays.values()).shape if arrays else (0,)
+        missing = np.full(shape, np.nan)
+
+        def get(name):
+            return np.broadcast_to(arrays[name], shape) if name in arrays else missing
+
+        with np.errstate(invalid='ignore'):
+            # MACD 交叉與柱狀圖（最新 MACD 或訊號線缺值時整段略過）
+            macd, signal_line = get('macd'), get('signal')
+            macd_prev, signal_prev = get('macd_prev'), get('signal_prev')
+            macd_ok = ~np.isnan(macd) & ~np.isnan(signal_line)
+            golden = (macd_prev <= signal_prev) & (macd > signal_line)
+            death = ~golden & (macd_prev >= signal_prev) & (macd < signal_line)
+            hist, hist_prev = get('histogram'), get('histogram_prev')
+            hist_up = (hist_prev < 0) & (hist > 0)
+            hist_down = (hist_prev > 0) & (hist < 0)
+            macd_score = np.where(macd_ok, 20 * golden - 20 * death + 15 * hist_up - 15 * hist_down, 0)
+
+            # 布林帶與 MA20 需要當前價格
+            price = get('close')
+            price_ok = ~np.isnan(price) & (price != 0)
+            upper, middle, lower = get('upper'), get('middle'), get('lower')
+            bands_ok = price_ok & ~np.isnan(upper) & ~np.isnan(middle) & ~np.isnan(lower)
+            bollinger_score = np.where(bands_ok, np.select(
+                [price < lower, price > upper, price < middle, price > middle],
+                [25, -25, -5, 5], 0), 0)
+
+            ma20 = get('ma20')
+            ma_score = np.where(price_ok & ~np.isnan(ma20), np.where(price > ma20, 10, -10), 0)
+
+        return {
+            'rsi': self.rsi_score(get('rsi14')),
+            'macd': macd_score,
+            'bollinger': bollinger_score,
+            'ma': ma_score,
+        }
+
+    def rsi_score(self, rsi: np.ndarray) -> np.ndarray:
+        """RSI 分項評分（依 rsi_levels）"""
+        rsi = np.asarray(rsi, dtype=float)
+        with np.errstate(invalid='ignore'):
+            return np.select(
+                [rsi < self.rsi_levels['oversold'], rsi < 40, rsi > self.rsi_levels['overbought'], rsi > 60],
+                [30, 10, -30, -10], 0)
+
+    def score_universe(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        以 NumPy 遮罩一次計算整個股票池的技術評分（規則與 analyze_technical 相同）
+
+        Args:
+            columns: 欄位名稱 → 最新值陣列（可由 indicator_columns 建立，
+                     欄位說明見 score_components）
+
+        Returns:
+            {'score', 'recommendation', 'confidence', 'risk_level'} 陣列
+        """
+        components = self.score_components(columns)
+        score = sum(components.values()).astype(float)
+        rsi = np.broadcast_to(np.asarray(columns.get('rsi14', np.nan), dtype=float), score.shape)
+
+        with np.errstate(invalid='ignore'):
+            recommendation = np.select(
+                [score >= 50, score >= 20, score >= -20, score >= -50],
+                ['強烈買入', '買入', '持有', '賣出'], '強烈賣出')
+            confidence = np.select(
+                [score >= 50, score >= 20],
+                [np.minimum(score, 100), score], np.maximum(0, 50 + score))
+            risk_level = np.select(
+                [(rsi > 80) | (rsi < 20), (rsi > 60) | (rsi < 40)],
+                ['高風險', '中風險'], '正常風險')
+
+        return {
+            'score': score,
+            'recommendation': recommendation,
+            'confidence': confidence,
+            'risk_level': risk_level,
+        }
+
+    def rank_universe(self, symbols: List[str], columns: Dict[str, np.ndarray],
+                      top: Optional[int] = None) -> List[Dict]:
+        """
+        對股票池評分並排序
+
+        Args:
+            symbols: 股票代碼列表（與欄位陣列等長）
+            columns: 欄位名稱 → 最新值陣列
+            top: 只回傳評分最高的前 N 支（None 為全部）
+
+        Returns:
+            依評分由高到低排列的結果列表
+        """
+        result = self.score_universe(columns)
+        score = result['score']
+
+        if top is not None and top < len(score):
+            # 只對前 N 名完整排序
+            candidates = np.argpartition(-score, top)[:top]
+            order = candidates[np.argsort(-score[candidates], kind='stable')]
+        else:
+            order = np.argsort(-score, kind='stable')
+
+        return [{
+            'symbol': symbols[i],
+            'score': float(score[i]),
+            'recommendation': str(result['recommendation'][i]),
+            'confidence': round(float(result['confidence'][i]), 2),
+            'risk_level': str(result['risk_level'][i]),
+        } for i in order]
+
     def _assess_risk(self, indicators: Dict) -> str:
         """評估風險等級"""
         rsi = indicators.get('rsi14', [])
@@ -276,6 +408,35 @@ class InvestmentAdvisor:
         return actions[:5]  # 最多 5 個建議
 
 
+def indicator_columns(indicators_list: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    由逐支股票的指標字典（analyze_stock 格式）取出最新值，組成 score_universe 的欄位
+
+    Args:
+        indicators_list: 指標字典列表；當前價格取自 'current_price'
+
+    Returns:
+        欄位名稱 → 陣列
+    """
+    def value(series, offset):
+        if not series or len(series) < offset:
+            return np.nan
+        return series[-offset]
+
+    columns = {name: [] for name in ('rsi14', 'macd', 'macd_prev', 'signal', 'signal_prev',
+                                      'histogram', 'histogram_prev', 'upper', 'middle',
+                                      'lower', 'ma20', 'close')}
+    for indicators in indicators_list:
+        for name in ('rsi14', 'macd', 'signal', 'histogram', 'upper', 'middle', 'lower', 'ma20'):
+            columns[name].append(value(indicators.get(name), 1))
+        for name in ('macd', 'signal', 'histogram'):
+            columns[f'{name}_prev'].append(value(indicators.get(name), 2))
+        price = indicators.get('current_price')
+        columns['close'].append(np.nan if price is None else price)
+
+    return {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+
+
 # 快捷函數
 def get_investment_advice(symbol: str, 
                           indicators: Dict, 
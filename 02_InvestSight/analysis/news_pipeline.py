@@ -0,0 +1,168 @@
+"""
+串流新聞情感管線
+抓取 → 解析 → 去重 → 評分 → 彙總，每個階段都是產生器，
+逐篇傳遞新聞，大量積壓的新聞也能以固定記憶體處理
+"""
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional
+
+try:
+    from analysis.sentiment import analyzer as default_analyzer, SentimentAnalyzer
+except ImportError:
+    from sentiment import analyzer as default_analyzer, SentimentAnalyzer
+
+
+def _article_key(article: Dict) -> str:
+    """去重鍵值：優先使用連結，否則使用正規化標題"""
+    link = article.get('link')
+    if link:
+        return link
+    return ' '.join(article.get('title', '').lower().split())
+
+
+def dedupe(articles: Iterable[Dict], max_seen: int = 10000) -> Iterator[Dict]:
+    """
+    去除重複新聞（多個來源轉載同一篇）
+
+    Args:
+        articles: 新聞串流
+        max_seen: 記住的鍵值上限（超過時遺忘最舊的）
+
+    Yields:
+        未出現過的新聞
+    """
+    seen = OrderedDict()
+    for article in articles:
+        key = _article_key(article)
+        if key in seen:
+            seen.move_to_end(key)
+            continue
+        seen[key] = None
+        if len(seen) > max_seen:
+            seen.popitem(last=False)
+        yield article
+
+
+def score(articles: Iterable[Dict], analyzer: Optional[SentimentAnalyzer] = None,
+          batch_size: int = 32) -> Iterator[Dict]:
+    """
+    分批計算情感（沿用 analyze_batch 的去重、緩存與進程池）
+
+    Args:
+        articles: 新聞串流
+        analyzer: 情感分析器（預設全域 analyzer）
+        batch_size: 每批篇數；越小第一篇結果越早產生
+
+    Yields:
+        附帶 'sentiment' 的新聞副本（不修改輸入）
+    """
+    analyzer = analyzer or default_analyzer
+    articles = iter(articles)
+    while True:
+        batch = list(islice(articles, batch_size))
+        if not batch:
+            return
+        texts = [f"{article['title']} {article.get('summary', '')}" for article in batch]
+        for article, result in zip(batch, analyzer.analyze_batch(texts)):
+            scored = dict(article)
+            scored['sentiment'] = result
+            yield scored
+
+
+class SentimentAggregator:
+    """情感的累計統計（只保留計數與最近幾篇）"""
+
+    def __init__(self, keep_recent: int = 20):
+        """
+        初始化
+
+        Args:
+            keep_recent: 保留最近幾篇新聞供報告顯示
+        """
+        self.count = 0
+        self.counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        self.polarity_sum = 0.0
+        self.by_source: Dict[str, Dict] = {}
+        self.recent = deque(maxlen=keep_recent)
+
+    def update(self, article: Dict):
+        """加入一篇已評分的新聞"""
+        result = article.get('sentiment') or {}
+        sentiment = result.get('sentiment', 'neutral')
+        polarity = result.get('polarity', 0) or 0
+
+        self.count += 1
+        self.counts[sentiment] = self.counts.get(sentiment, 0) + 1
+        self.polarity_sum += polarity
+
+        source = self.by_source.setdefault(article.get('source', 'Unknown'),
+                                           {'count': 0, 'polarity_sum': 0.0})
+        source['count'] += 1
+        source['polarity_sum'] += polarity
+
+        self.recent.append(article)
+
+    def consume(self, articles: Iterable[Dict]) -> Iterator[Dict]:
+        """統計並原樣傳遞（可串接在管線中）"""
+        for article in articles:
+            self.update(article)
+            yield article
+
+    @property
+    def average_polarity(self) -> float:
+        return self.polarity_sum / self.count if self.count else 0.0
+
+    def summary(self) -> str:
+        """市場情緒總結"""
+        if self.counts['positive'] > self.counts['negative']:
+            return "市場情緒偏向正面"
+        elif self.counts['negative'] > self.counts['positive']:
+            return "市場情緒偏向負面"
+        return "市場情緒中性"
+
+    def to_dict(self) -> Dict:
+        """轉換為字典"""
+        return {
+            'count': self.count,
+            'positive': self.counts['positive'],
+            'negative': self.counts['negative'],
+            'neutral': self.counts['neutral'],
+            'average_polarity': round(self.average_polarity, 4),
+            'summary': self.summary(),
+            'by_source': {
+                name: {'count': s['count'], 'average_polarity': round(s['polarity_sum'] / s['count'], 4)}
+                for name, s in self.by_source.items()
+            },
+        }
+
+
+def stream_sentiment(fetcher, analyzer: Optional[SentimentAnalyzer] = None,
+                     aggregator: Optional[SentimentAggregator] = None,
+                     limit: Optional[int] = None, batch_size: int = 32) -> Iterator[Dict]:
+    """
+    完整管線：並行抓取 → 去重 → 評分 → 彙總
+
+    Args:
+        fetcher: NewsFetcher（需提供 iter_all）
+        analyzer: 情感分析器
+        aggregator: 累計統計（None 為不統計）
+        limit: 每個來源最多篇數
+        batch_size: 評分批次大小
+
+    Returns:
+        已評分新聞的串流
+    """
+    stream = score(dedupe(fetcher.iter_all(limit=limit)), analyzer, batch_size)
+    if aggregator is not None:
+        stream = aggregator.consume(stream)
+    return stream
+
+
+def run_pipeline(fetcher, analyzer: Optional[SentimentAnalyzer] = None,
+                 keep_recent: int = 20, limit: Optional[int] = None) -> SentimentAggregator:
+    """執行管線並回傳統計結果"""
+    aggregator = SentimentAggregator(keep_recent)
+    for _ in stream_sentiment(fetcher, analyzer, aggregator, limit):
+        pass
+    return aggregator
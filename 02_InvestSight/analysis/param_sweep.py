@@ -0,0 +1,224 @@
+"""
+InvestmentAdvisor 參數掃描
+網格或隨機產生參數組合，以進程池並行回測；
+指標只計算一次並放入共享記憶體，各進程直接引用，不複製
+"""
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Dict, Optional, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis.backtest import Backtester, compute_indicators
+from analysis.investment_advisor import InvestmentAdvisor
+
+# 可掃描的參數與預設網格
+DEFAULT_GRID = {
+    'oversold': [20, 25, 30, 35],
+    'overbought': [65, 70, 75, 80],
+    'buy_threshold': [10, 20, 30, 50],
+    'sell_threshold': [-50, -30, -20, -10],
+}
+
+# 每個進程快取的 RSI 分項評分數量上限
+_RSI_CACHE_SIZE = 32
+
+# 進程內的共享陣列與快取（由 _init_worker 設定）
+_worker = {}
+
+
+def grid_configs(space: Optional[Dict[str, List]] = None) -> List[Dict]:
+    """
+    產生網格參數組合（略過超賣 ≥ 超買、賣出門檻 ≥ 買入門檻的無效組合）
+
+    Args:
+        space: 參數名稱 → 候選值列表（預設 DEFAULT_GRID）
+
+    Returns:
+        參數字典列表
+    """
+    space = space or DEFAULT_GRID
+    names = list(space)
+    configs = [dict(zip(names, values)) for values in itertools.product(*space.values())]
+    return [c for c in configs if _valid(c)]
+
+
+def random_configs(space: Optional[Dict[str, Tuple[float, float]]] = None, count: int = 100,
+                   seed: Optional[int] = None) -> List[Dict]:
+    """
+    隨機產生參數組合
+
+    Args:
+        space: 參數名稱 → (下限, 上限)，或候選值列表
+        count: 組合數量
+        seed: 亂數種子
+
+    Returns:
+        參數字典列表
+    """
+    space = space or {name: (min(values), max(values)) for name, values in DEFAULT_GRID.items()}
+    rng = random.Random(seed)
+    configs = []
+    attempts = 0
+    while len(configs) < count and attempts < count * 20:
+        attempts += 1
+        config = {}
+        for name, choices in space.items():
+            if isinstance(choices, tuple):
+                config[name] = round(rng.uniform(*choices), 1)
+            else:
+                config[name] = rng.choice(list(choices))
+        if _valid(config):
+            configs.append(config)
+    return configs
+
+
+def _valid(config: Dict) -> bool:
+    if config.get('oversold', 30) >= config.get('overbought', 70):
+        return False
+    return config.get('sell_threshold', -20) < config.get('buy_threshold', 20)
+
+
+class _SharedArrays:
+    """將多個 NumPy 陣列放入共享記憶體"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.blocks = []
+        self.specs = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array, dtype=float)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=float, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """附加到既有共享記憶體（由建立者負責 unlink）"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 以前沒有 track 參數；子進程與父進程共用 resource tracker，
+        # 重複登記同一名稱不影響父進程的 unlink
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(specs: Dict[str, Tuple[str, tuple]], options: Dict):
+    """進程初始化：附加共享陣列"""
+    blocks = {name: _attach(block_name) for name, (block_name, _) in specs.items()}
+    _worker.clear()
+    _worker['blocks'] = blocks
+    _worker['arrays'] = {name: np.ndarray(specs[name][1], dtype=float, buffer=blocks[name].buf)
+                         for name in specs}
+    _worker['options'] = options
+    _worker['rsi_cache'] = {}
+
+
+def _rsi_part(oversold: float, overbought: float) -> np.ndarray:
+    """RSI 分項評分（同一組 RSI 門檻只算一次）"""
+    cache = _worker['rsi_cache']
+    key = (oversold, overbought)
+    if key not in cache:
+        if len(cache) >= _RSI_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        advisor = InvestmentAdvisor()
+        advisor.rsi_levels = {'oversold': oversold, 'overbought': overbought}
+        cache[key] = advisor.rsi_score(_worker['arrays']['rsi14'])
+    return cache[key]
+
+
+def _evaluate(config: Dict) -> Dict:
+    """回測單一參數組合"""
+    arrays = _worker['arrays']
+    options = _worker['options']
+
+    oversold = config.get('oversold', 30)
+    overbought = config.get('overbought', 70)
+    score = arrays['base_score'] + _rsi_part(oversold, overbought)
+
+    advisor = InvestmentAdvisor()
+    advisor.rsi_levels = {'oversold': oversold, 'overbought': overbought}
+    backtester = Backtester(advisor,
+                            buy_threshold=config.get('buy_threshold', 20),
+                            sell_threshold=config.get('sell_threshold', -20),
+                            cost_bps=options['cost_bps'],
+                            allow_short=options['allow_short'])
+    result = backtester.run(arrays['close'], score=score, per_symbol=False)
+    return {'params': config, 'metrics': result['metrics']}
+
+
+class ParameterSweep:
+    """參數掃描執行器"""
+
+    def __init__(self, closes: pd.DataFrame, cost_bps: float = 10.0, allow_short: bool = False):
+        """
+        初始化並預先計算指標（整個掃描只算一次）
+
+        Args:
+            closes: 收盤價 DataFrame（日期 × 股票）
+            cost_bps: 單邊交易成本（基點）
+            allow_short: 賣出訊號是否放空
+        """
+        if not isinstance(closes, pd.DataFrame):
+            closes = pd.DataFrame(closes)
+        prices = closes.ffill().to_numpy(dtype=float)
+        indicators = compute_indicators(prices)
+
+        # 與 RSI 門檻無關的分項先加總
+        components = InvestmentAdvisor().score_components(indicators)
+        base_score = components['macd'] + components['bollinger'] + components['ma']
+
+        self.arrays = {'close': prices, 'rsi14': indicators['rsi14'], 'base_score': base_score}
+        self.options = {'cost_bps': cost_bps, 'allow_short': allow_short}
+
+    def run(self, configs: Iterable[Dict], workers: Optional[int] = None,
+            objective: str = 'sharpe') -> List[Dict]:
+        """
+        執行掃描
+
+        Args:
+            configs: 參數組合
+            workers: 進程數（None 為 CPU 數，1 為單進程）
+            objective: 排序依據的績效指標（如 'sharpe'、'total_return'、'max_drawdown'）
+
+        Returns:
+            依 objective 由高到低排序的結果列表
+        """
+        configs = list(configs)
+        workers = workers or os.cpu_count() or 1
+        shared = _SharedArrays(self.arrays)
+        try:
+            results = None
+            if workers > 1 and len(configs) > 1:
+                try:
+                    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=(shared.specs, self.options)) as pool:
+                        chunksize = max(1, len(configs) // (workers * 4))
+                        results = list(pool.map(_evaluate, configs, chunksize=chunksize))
+                except Exception as e:
+                    print(f"進程池失敗，改為單進程：{e}")
+
+            if results is None:
+                _init_worker(shared.specs, self.options)
+                try:
+                    results = [_evaluate(config) for config in configs]
+                finally:
+                    # 先釋放陣列引用才能關閉共享記憶體
+                    blocks = _worker.pop('blocks', {})
+                    _worker.clear()
+                    for block in blocks.values():
+                        block.close()
+        finally:
+            shared.close()
+
+        return sorted(results, key=lambda r: r['metrics'].get(objective, float('-inf')), reverse=True)
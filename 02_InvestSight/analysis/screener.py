@@ -0,0 +1,279 @@
+"""
+股票篩選引擎
+以欄式表格保存每支股票的最新指標，新 K 線到來時逐支增量更新；
+篩選條件沿用警示規則的表達式語法，前 N 名以 argpartition 部分排序取得
+"""
+import math
+from typing import List, Dict, Optional, Iterable, Tuple
+
+import numpy as np
+
+from data.alert_rules import AlertSnapshot, CompiledCondition
+from analysis.investment_advisor import InvestmentAdvisor
+
+# 存放區欄位（與 score_universe、警示規則的欄位名稱一致）
+COLUMNS = (
+    'close', 'prev_close', 'change_pct', 'volume', 'bars',
+    'ma20', 'ma60', 'rsi14',
+    'macd', 'macd_prev', 'signal', 'signal_prev', 'histogram', 'histogram_prev',
+    'upper', 'middle', 'lower',
+)
+
+# 篩選結果預設顯示的欄位
+DEFAULT_FIELDS = ('close', 'change_pct', 'rsi14', 'ma20', 'score')
+
+
+class _SymbolState:
+    """單一股票的增量指標狀態（計算方式與 TechnicalIndicators 相同）"""
+
+    FAST, SLOW, SIGNAL = 12, 26, 9
+
+    def __init__(self):
+        # 最近 61 根收盤價（MA60 與前一根收盤所需）
+        self.closes: List[float] = []
+        self.count = 0
+        self.ema_fast = None
+        self.ema_slow = None
+        self.signal = None
+        self.macd_seed = []
+        self.macd = math.nan
+        self.histogram = math.nan
+
+    def _ema(self, previous, period: int, close: float):
+        if self.count < period:
+            return None
+        if self.count == period:
+            # 第一個 EMA 用 SMA
+            return sum(self.closes[-period:]) / period
+        return (close - previous) * (2 / (period + 1)) + previous
+
+    def _window(self, period: int) -> Optional[List[float]]:
+        if self.count < period:
+            return None
+        return self.closes[-period:]
+
+    def update(self, close: float) -> Dict[str, float]:
+        """加入一根收盤價，回傳最新指標"""
+        prev_close = self.closes[-1] if self.closes else math.nan
+        self.closes.append(close)
+        if len(self.closes) > 61:
+            del self.closes[0]
+        self.count += 1
+
+        values = {
+            'close': close,
+            'prev_close': prev_close,
+            'change_pct': (close - prev_close) / prev_close * 100 if prev_close else math.nan,
+            'bars': self.count,
+        }
+
+        # 窗口很短，純 Python 比建立 NumPy 陣列快
+        window = self._window(20)
+        if window is not None:
+            middle = sum(window) / 20
+            std = math.sqrt(sum((x - middle) ** 2 for x in window) / 20)
+            values.update(ma20=middle, upper=middle + 2 * std, middle=middle, lower=middle - 2 * std)
+        else:
+            values.update(ma20=math.nan, upper=math.nan, middle=math.nan, lower=math.nan)
+
+        window = self._window(60)
+        values['ma60'] = sum(window) / 60 if window is not None else math.nan
+
+        # RSI（最近 14 個價差的簡單平均）
+        window = self._window(15)
+        if window is not None:
+            gains = losses = 0.0
+            for previous, current in zip(window, window[1:]):
+                delta = current - previous
+                if delta > 0:
+                    gains += delta
+                elif delta < 0:
+                    losses -= delta
+            values['rsi14'] = 100.0 if not losses else 100 - 100 / (1 + gains / losses)
+        else:
+            values['rsi14'] = math.nan
+
+        # MACD：快慢 EMA → MACD 線 → 訊號線（MACD 的 EMA）
+        values['macd_prev'] = self.macd
+        values['signal_prev'] = self.signal if self.signal is not None else math.nan
+        values['histogram_prev'] = self.histogram
+
+        self.ema_fast = self._ema(self.ema_fast, self.FAST, close)
+        self.ema_slow = self._ema(self.ema_slow, self.SLOW, close)
+        if self.ema_slow is not None:
+            self.macd = self.ema_fast - self.ema_slow
+            if self.signal is None:
+                self.macd_seed.append(self.macd)
+                if len(self.macd_seed) == self.SIGNAL:
+                    self.signal = sum(self.macd_seed) / self.SIGNAL
+                    self.macd_seed = []
+            else:
+                self.signal = (self.macd - self.signal) * (2 / (self.SIGNAL + 1)) + self.signal
+            if self.signal is not None:
+                self.histogram = self.macd - self.signal
+
+        values['macd'] = self.macd
+        values['signal'] = self.signal if self.signal is not None else math.nan
+        values['histogram'] = self.histogram
+        return values
+
+
+class IndicatorStore:
+    """欄式指標存放區：每支股票一列，每個指標一個 NumPy 陣列"""
+
+    def __init__(self, capacity: int = 1024):
+        """
+        初始化
+
+        Args:
+            capacity: 初始容量（股票數超過時自動加倍）
+        """
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self._states: List[_SymbolState] = []
+        self._columns = {name: np.full(capacity, np.nan) for name in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def _row(self, symbol: str) -> int:
+        row = self.index.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            capacity = len(self._columns['close'])
+            if row >= capacity:
+                for name, values in self._columns.items():
+                    grown = np.full(capacity * 2, np.nan)
+                    grown[:capacity] = values
+                    self._columns[name] = grown
+            self.symbols.append(symbol)
+            self.index[symbol] = row
+            self._states.append(_SymbolState())
+        return row
+
+    def update(self, symbol: str, close: float, volume: Optional[float] = None):
+        """
+        加入一根新 K 線並更新該股票的指標列
+
+        Args:
+            symbol: 股票代碼
+            close: 收盤價
+            volume: 成交量（可選）
+        """
+        row = self._row(symbol)
+        for name, value in self._states[row].update(float(close)).items():
+            self._columns[name][row] = value
+        self._columns['volume'][row] = np.nan if volume is None else volume
+
+    def update_many(self, bars: Iterable[Tuple[str, float]]):
+        """批量更新（symbol, close）"""
+        for symbol, close in bars:
+            self.update(symbol, close)
+
+    def load_history(self, symbol: str, closes: List[float], volumes: Optional[List[float]] = None):
+        """
+        以歷史收盤價初始化單一股票
+
+        Args:
+            symbol: 股票代碼
+            closes: 收盤價列表（由舊到新）
+            volumes: 成交量列表（可選）
+        """
+        for i, close in enumerate(closes):
+            self.update(symbol, close, volumes[i] if volumes else None)
+
+    def snapshot(self) -> AlertSnapshot:
+        """
+        取得目前的欄式快照
+
+        快照直接引用存放區的陣列，存放區更新後請重新取得
+        """
+        n = len(self.symbols)
+        return AlertSnapshot(self.symbols, {name: values[:n] for name, values in self._columns.items()})
+
+
+class Screener:
+    """股票篩選器"""
+
+    def __init__(self, store: IndicatorStore, advisor: Optional[InvestmentAdvisor] = None):
+        """
+        初始化
+
+        Args:
+            store: 指標存放區
+            advisor: 計算 'score' 欄位用的投資建議器
+        """
+        self.store = store
+        self.advisor = advisor or InvestmentAdvisor()
+        self._compiled: Dict[str, CompiledCondition] = {}
+
+    def _compile(self, expression: str) -> CompiledCondition:
+        condition = self._compiled.get(expression)
+        if condition is None:
+            condition = CompiledCondition(expression)
+            self._compiled[expression] = condition
+        return condition
+
+    def query(self, where: Optional[str] = None, sort_by: str = 'score',
+              ascending: bool = False, top: Optional[int] = 20,
+              fields: Iterable[str] = DEFAULT_FIELDS) -> List[Dict]:
+        """
+        篩選並排序
+
+        Args:
+            where: 篩選條件，例如 'rsi14 < 30 and close < lower'（None 為全部）
+            sort_by: 排序欄位或表達式，例如 'rsi14'、'close / ma20'；
+                     'score' 為 InvestmentAdvisor 的技術評分
+            ascending: 是否由小到大排序
+            top: 回傳筆數上限（None 為全部）
+            fields: 結果中附帶的欄位
+
+        Returns:
+            結果列表，每筆含 'symbol'、'value'（排序值）與指定欄位
+
+        Raises:
+            ValueError: 表達式語法錯誤
+        """
+        snapshot = self.store.snapshot()
+        if not len(snapshot):
+            return []
+
+        condition = self._compile(where) if where else None
+        sort_key = self._compile(sort_by)
+        fields = list(fields)
+
+        needed = set(sort_key.fields) | set(fields)
+        if condition is not None:
+            needed |= condition.fields
+        if 'score' in needed:
+            snapshot.columns['score'] = self.advisor.score_universe(snapshot.columns)['score']
+
+        memo = {}
+        if condition is not None:
+            candidates = np.flatnonzero(condition.evaluate(snapshot, memo))
+        else:
+            candidates = np.arange(len(snapshot))
+        if not len(candidates):
+            return []
+
+        values = sort_key.values(snapshot, memo).astype(float)[candidates]
+        key = values if ascending else -values
+        # NaN 排在最後
+        key = np.where(np.isnan(key), np.inf, key)
+
+        k = len(candidates) if top is None else min(top, len(candidates))
+        if k < len(candidates):
+            part = np.argpartition(key, k - 1)[:k]
+        else:
+            part = np.arange(len(candidates))
+        order = part[np.argsort(key[part], kind='stable')]
+
+        results = []
+        for i in order:
+            row = candidates[i]
+            result = {'symbol': snapshot.symbols[row], 'value': float(values[i])}
+            for name in fields:
+                column = snapshot.columns.get(name)
+                result[name] = float(column[row]) if column is not None else None
+            results.append(result)
+        return results
@@ -2,20 +2,31 @@
 情感分析模塊
 分析新聞情感（正面/負面/中性）
 """
-from textblob import TextBlob
-from typing import List, Dict
+import os
+import re
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterable, Tuple
+
+try:
+    from analysis.sentiment_cache import SentimentCache, text_key
+except ImportError:  # 直接執行本文件時
+    from sentiment_cache import SentimentCache, text_key
+
+# 分析邏輯版本；規則變更時遞增以讓緩存失效
+ANALYZER_VERSION = '1.2'
 
 NEGATIVE_KEYWORDS = [
     'war', 'iran', 'israel', 'attack', 'conflict', 'crisis', 'fear',
     'plunge', 'crash', 'lose', 'fall', 'drop', 'miss', 'misses',
-    'decline', 'decline', 'sinks', 'slump', 'slumps', 'tumble',
+    'decline', 'sinks', 'slump', 'slumps', 'tumble',
     'worse', 'worst', 'danger', 'threat', 'risk', 'warn', 'warning',
-    'fail', 'failure', 'lose', 'loss', 'lost', 'death', 'dead',
+    'fail', 'failure', 'loss', 'lost', 'death', 'dead',
     'recession', 'inflation', 'stagflation', 'bankruptcy', 'lawsuit',
     'scandal', 'fraud', 'investigation', 'probe', 'fired', 'layoff',
     'strike', 'terror', 'military', 'bomb', 'explosion', 'casualties',
     'geopolitical', 'tension', 'uncertainty', 'volatility', 'selloff',
-    'sell-off', 'pullback', 'correction', 'bear market', 'recession'
+    'sell-off', 'pullback', 'correction', 'bear market'
 ]
 
 POSITIVE_KEYWORDS = [
@@ -24,22 +35,104 @@ POSITIVE_KEYWORDS = [
     'success', 'successful', 'beat', 'beats', 'exceed', 'exceeds',
     'record', 'high', 'highs', 'breakthrough', 'innovation', 'innovative',
     'profit', 'profits', 'up', 'higher', 'best', 'strong', 'strength',
-    'opportunity', 'profit', 'winning', 'winner', 'upgrade', 'outperform'
+    'opportunity', 'winning', 'winner', 'upgrade', 'outperform'
 ]
 
 
+class KeywordMatcher:
+    """關鍵詞比對器
+    
+    將正負面關鍵詞編譯為單一正則（含單字邊界），一次掃描文本計算命中數；
+    允許複數字尾（crash → crashes），但不會在單字內部命中（'up' 不匹配 'supply'）
+    """
+    
+    def __init__(self, negative: Iterable[str], positive: Iterable[str]):
+        self.negative = tuple(dict.fromkeys(kw.lower() for kw in negative))
+        self.positive = tuple(dict.fromkeys(kw.lower() for kw in positive))
+        self.signature = hashlib.sha256(
+            ('\n'.join(sorted(self.negative)) + '\0' + '\n'.join(sorted(self.positive))).encode('utf-8')
+        ).hexdigest()
+        self._pattern = re.compile(
+            r'\b(?:(?P<neg>' + self._alternation(self.negative) + r')'
+            r'|(?P<pos>' + self._alternation(self.positive) + r'))(?:s|es)?\b'
+        )
+    
+    @staticmethod
+    def _alternation(keywords: Iterable[str]) -> str:
+        # 長詞優先，避免 'sell' 搶先匹配 'sell-off'
+        return '|'.join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+    
+    def count(self, text: str) -> Tuple[int, int]:
+        """
+        計算文本中命中的不同關鍵詞數
+        
+        Returns:
+            (負面命中數, 正面命中數)
+        """
+        neg, pos = set(), set()
+        for match in self._pattern.finditer(text.lower()):
+            if match.group('neg'):
+                neg.add(match.group('neg'))
+            else:
+                pos.add(match.group('pos'))
+        return len(neg), len(pos)
+
+
+keyword_matcher = KeywordMatcher(NEGATIVE_KEYWORDS, POSITIVE_KEYWORDS)
+
+
+# TextBlob（含 NLTK）載入較慢，第一次需要時才匯入
+_TextBlob = None
+
+
+def _load_textblob():
+    """延遲載入 TextBlob"""
+    global _TextBlob
+    if _TextBlob is None:
+        from textblob import TextBlob
+        _TextBlob = TextBlob
+    return _TextBlob
+
+
+def _textblob_polarity(text: str):
+    """TextBlob 極性（供進程池呼叫，失敗回傳 None）"""
+    try:
+        return _load_textblob()(text).sentiment.polarity
+    except Exception as e:
+        print(f"情感分析失敗：{e}")
+        return None
+
+
 class SentimentAnalyzer:
     """情感分析器"""
     
-    def __init__(self, threshold: float = 0.05):
+    def __init__(self, threshold: float = 0.05, matcher: KeywordMatcher = None,
+                 workers: int = None, pool_min_batch: int = 64,
+                 cache: SentimentCache = None):
+        """
+        初始化
+        
+        Args:
+            threshold: 中性區間閾值
+            matcher: 關鍵詞比對器
+            workers: TextBlob 階段的進程數（None 為 CPU 數）
+            pool_min_batch: 待處理文本少於此數時不啟動進程池
+            cache: 持久化緩存（None 為不緩存）
+        """
         self.threshold = threshold
+        self.matcher = matcher or keyword_matcher
+        self.workers = workers
+        self.pool_min_batch = pool_min_batch
+        self.cache = cache
+    
+    @property
+    def signature(self) -> str:
+        """分析器簽名：版本 + 閾值 + 關鍵詞列表雜湊"""
+        return f"{ANALYZER_VERSION}:{self.threshold!r}:{self.matcher.signature[:16]}"
     
     def _keyword_analysis(self, text: str) -> Dict:
         """基於關鍵詞的情感分析"""
-        text_lower = text.lower()
-        
-        neg_count = sum(1 for kw in NEGATIVE_KEYWORDS if kw in text_lower)
-        pos_count = sum(1 for kw in POSITIVE_KEYWORDS if kw in text_lower)
+        neg_count, pos_count = self.matcher.count(text)
         
         if neg_count > pos_count and neg_count >= 1:
             return {
@@ -60,42 +153,114 @@ class SentimentAnalyzer:
         
         return None
     
+    def _polarity_result(self, polarity) -> Dict:
+        """由 TextBlob 極性產生結果"""
+        if polarity is None:
+            return {'polarity': 0, 'sentiment': 'neutral'}
+        
+        if polarity > self.threshold:
+            sentiment = 'positive'
+        elif polarity < -self.threshold:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+        
+        return {
+            'polarity': polarity,
+            'sentiment': sentiment,
+            'keyword_trigger': None,
+        }
+    
     def analyze_text(self, text: str) -> Dict:
         """分析單段文本的情感"""
+        if self.cache is not None:
+            return self.analyze_batch([text])[0]
+        
         try:
             keyword_result = self._keyword_analysis(text)
             
             if keyword_result:
                 return keyword_result
             
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            
-            if polarity > self.threshold:
-                sentiment = 'positive'
-            elif polarity < -self.threshold:
-                sentiment = 'negative'
-            else:
-                sentiment = 'neutral'
-            
-            return {
-                'polarity': polarity,
-                'sentiment': sentiment,
-                'keyword_trigger': None,
-            }
+            return self._polarity_result(_textblob_polarity(text))
         except Exception as e:
             print(f"情感分析失敗：{e}")
             return {'polarity': 0, 'sentiment': 'neutral'}
     
+    def _score_textblob(self, texts: List[str], workers: int = None) -> List:
+        """TextBlob 階段：大批量時分派到進程池"""
+        workers = workers if workers is not None else self.workers
+        if len(texts) < self.pool_min_batch or workers == 1:
+            return [_textblob_polarity(text) for text in texts]
+        
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, len(texts) // ((workers or os.cpu_count() or 1) * 4))
+                return list(pool.map(_textblob_polarity, texts, chunksize=chunksize))
+        except Exception as e:
+            print(f"進程池失敗，改為單進程：{e}")
+            return [_textblob_polarity(text) for text in texts]
+    
+    def analyze_batch(self, texts: List[str], workers: int = None) -> List[Dict]:
+        """
+        批量分析文本情感
+        
+        相同文本只計算一次；關鍵詞階段先處理整批，
+        只有關鍵詞無法判斷的文本才送入 TextBlob（可多進程）
+        
+        Args:
+            texts: 文本列表
+            workers: 進程數（覆蓋初始化設定）
+        
+        Returns:
+            與輸入順序一致的結果列表
+        """
+        unique = list(dict.fromkeys(texts))
+        results = {}
+        keys = {}
+        
+        if self.cache is not None:
+            signature = self.signature
+            keys = {text: text_key(signature, text) for text in unique}
+            cached = self.cache.get_many(keys.values())
+            for text, key in keys.items():
+                if key in cached:
+                    results[text] = cached[key]
+        
+        computed = {}
+        unresolved = []
+        for text in unique:
+            if text in results:
+                continue
+            keyword_result = self._keyword_analysis(text)
+            if keyword_result:
+                computed[text] = keyword_result
+            else:
+                unresolved.append(text)
+        
+        if unresolved:
+            for text, polarity in zip(unresolved, self._score_textblob(unresolved, workers)):
+                if polarity is None:
+                    # 失敗結果不寫入緩存
+                    results[text] = self._polarity_result(None)
+                else:
+                    computed[text] = self._polarity_result(polarity)
+        
+        if computed and self.cache is not None:
+            self.cache.put_many({keys[text]: result for text, result in computed.items()}, signature)
+        
+        results.update(computed)
+        return [dict(results[text]) for text in texts]
+    
     def analyze_articles(self, articles: List[Dict]) -> List[Dict]:
         """分析多篇新聞的情感"""
-        for article in articles:
-            text = f"{article['title']} {article.get('summary', '')}"
-            article['sentiment'] = self.analyze_text(text)
+        texts = [f"{article['title']} {article.get('summary', '')}" for article in articles]
+        for article, result in zip(articles, self.analyze_batch(texts)):
+            article['sentiment'] = result
         return articles
 
 
-analyzer = SentimentAnalyzer()
+analyzer = SentimentAnalyzer(cache=SentimentCache())
 
 
 if __name__ == '__main__':
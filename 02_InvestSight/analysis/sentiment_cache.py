@@ -0,0 +1,151 @@
+"""
+情感分析持久化緩存
+以 SQLite 保存分析結果，鍵值為「分析器簽名 + 正規化文本」的雜湊，
+關鍵詞、閾值或版本變更時簽名不同，舊結果自動失效
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from monitoring.metrics import metrics
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# 預設緩存位置
+DEFAULT_CACHE_PATH = BASE_DIR / 'data' / 'cache' / 'sentiment.sqlite'
+
+# SQLite 單次查詢的參數上限
+_QUERY_CHUNK = 500
+
+
+def normalize_text(text: str) -> str:
+    """正規化文本（Unicode NFKC + 合併空白）"""
+    return ' '.join(unicodedata.normalize('NFKC', text).split())
+
+
+def text_key(signature: str, text: str) -> str:
+    """計算緩存鍵值"""
+    payload = f"{signature}\0{normalize_text(text)}".encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+class SentimentCache:
+    """SQLite 情感分析緩存"""
+
+    def __init__(self, path: Optional[Path] = None, max_age_days: Optional[float] = 30):
+        """
+        初始化（首次使用時才開啟資料庫）
+
+        Args:
+            path: 資料庫路徑（預設 SENTIMENT_CACHE_PATH 或 data/cache/sentiment.sqlite）
+            max_age_days: 開啟時清除超過此天數的記錄（None 為不清除）
+        """
+        if path is None:
+            path = os.getenv('SENTIMENT_CACHE_PATH') or DEFAULT_CACHE_PATH
+        self.path = Path(path)
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sentiment ('
+                ' key TEXT PRIMARY KEY,'
+                ' signature TEXT NOT NULL,'
+                ' result TEXT NOT NULL,'
+                ' created_at REAL NOT NULL)'
+            )
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                conn.execute('DELETE FROM sentiment WHERE created_at < ?', (cutoff,))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """
+        批量查詢
+
+        Args:
+            keys: 緩存鍵值
+
+        Returns:
+            命中的 鍵值 → 結果
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if not keys:
+            return found
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                for i in range(0, len(keys), _QUERY_CHUNK):
+                    chunk = keys[i:i + _QUERY_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(
+                        f'SELECT key, result FROM sentiment WHERE key IN ({placeholders})', chunk
+                    ).fetchall()
+                    for key, result in rows:
+                        found[key] = json.loads(result)
+        except sqlite3.Error as e:
+            print(f"⚠ 讀取情感緩存失敗：{e}")
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        metrics.inc('cache_requests_total', len(found), cache='sentiment', result='hit')
+        metrics.inc('cache_requests_total', len(keys) - len(found), cache='sentiment', result='miss')
+        return found
+
+    def put_many(self, items: Dict[str, Dict], signature: str):
+        """
+        批量寫入
+
+        Args:
+            items: 鍵值 → 結果
+            signature: 分析器簽名
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = [(key, signature, json.dumps(result), now) for key, result in items.items()]
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany('INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?, ?)', rows)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠ 寫入情感緩存失敗：{e}")
+
+    def prune(self, keep_signature: str) -> int:
+        """
+        刪除其他簽名的記錄（關鍵詞或設定變更後釋放空間）
+
+        Returns:
+            刪除筆數
+        """
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute('DELETE FROM sentiment WHERE signature != ?', (keep_signature,))
+            conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """關閉資料庫"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -8,6 +8,8 @@ import numpy as np
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+from monitoring.metrics import metrics
+
 
 class TechnicalIndicators:
     """技術指標計算器"""
@@ -279,30 +281,34 @@ class TechnicalIndicators:
         if closes is None:
             closes = prices
 
-        result = {
-            'ma20': self.calculate_ma(prices, 20),
-            'ma60': self.calculate_ma(prices, 60),
-            'ema12': self.calculate_ema(prices, 12),
-            'ema26': self.calculate_ema(prices, 26),
-            'rsi14': self.calculate_rsi(prices, 14),
-        }
+        timer = metrics.timer
+        result = {}
+        with timer('indicator_seconds', indicator='ma'):
+            result['ma20'] = self.calculate_ma(prices, 20)
+            result['ma60'] = self.calculate_ma(prices, 60)
+        with timer('indicator_seconds', indicator='ema'):
+            result['ema12'] = self.calculate_ema(prices, 12)
+            result['ema26'] = self.calculate_ema(prices, 26)
+        with timer('indicator_seconds', indicator='rsi'):
+            result['rsi14'] = self.calculate_rsi(prices, 14)
 
         # MACD
-        macd = self.calculate_macd(prices)
-        result.update(macd)
+        with timer('indicator_seconds', indicator='macd'):
+            result.update(self.calculate_macd(prices))
 
         # 布林帶
-        bb = self.calculate_bollinger_bands(prices)
-        result.update(bb)
+        with timer('indicator_seconds', indicator='bollinger'):
+            result.update(self.calculate_bollinger_bands(prices))
 
         # KD 指標
         if len(closes) >= 14:
-            kd = self.calculate_stochastic(highs, lows, closes)
-            result.update(kd)
+            with timer('indicator_seconds', indicator='stochastic'):
+                result.update(self.calculate_stochastic(highs, lows, closes))
 
         # ATR
         if len(closes) >= 15:
-            result['atr'] = self.calculate_atr(highs, lows, closes)
+            with timer('indicator_seconds', indicator='atr'):
+                result['atr'] = self.calculate_atr(highs, lows, closes)
 
         return result
 
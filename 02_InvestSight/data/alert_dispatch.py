@@ -0,0 +1,243 @@
+"""
+警示派送佇列模組
+觸發的警示放入有界的 asyncio 佇列，由背景 worker 執行回調，
+避免慢速的 Webhook 阻塞價格檢查
+"""
+import asyncio
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Callable, Optional, Tuple
+
+
+# 佇列已滿時的策略
+POLICY_MERGE = 'merge'            # 佇列已滿時合併同一股票/類型的待送警示，沒有可合併的則丟棄最舊
+POLICY_DROP_OLDEST = 'drop_oldest'
+POLICY_DROP_NEW = 'drop_new'
+
+
+class DispatchStats:
+    """派送統計（背壓指標）"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.dispatched = 0
+        self.merged = 0
+        self.dropped = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def to_dict(self, depth: int = 0) -> Dict:
+        """轉換為字典"""
+        return {
+            'submitted': self.submitted,
+            'dispatched': self.dispatched,
+            'merged': self.merged,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'queue_depth': depth,
+            'max_depth': self.max_depth,
+            'avg_latency': self.total_latency / self.dispatched if self.dispatched else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+
+class AlertDispatcher:
+    """非阻塞警示派送器"""
+
+    def __init__(self, callbacks: Optional[List[Callable]] = None, maxsize: int = 100,
+                 workers: int = 2, policy: str = POLICY_MERGE):
+        """
+        初始化
+
+        Args:
+            callbacks: 回調函數列表（同步函數在執行緒池中執行，協程函數直接 await）
+            maxsize: 佇列上限
+            workers: worker 數量
+            policy: 佇列已滿時的策略 ('merge', 'drop_oldest', 'drop_new')
+        """
+        if policy not in (POLICY_MERGE, POLICY_DROP_OLDEST, POLICY_DROP_NEW):
+            raise ValueError(f"未知的佇列策略: {policy}")
+
+        self.callbacks = callbacks if callbacks is not None else []
+        self.maxsize = maxsize
+        self.workers = workers
+        self.policy = policy
+        self.stats = DispatchStats()
+
+        # 待送警示：序號 → (警示, 入列時間)；保留插入順序
+        self._pending: 'OrderedDict[int, Tuple[Dict, float]]' = OrderedDict()
+        # 合併鍵 → 最新一筆待送警示的序號（merge 策略在佇列已滿時使用）
+        self._index: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._in_flight = 0
+        self._idle = threading.Condition(self._lock)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = None
+        self._started = threading.Event()
+        self._atexit_registered = False
+
+    @staticmethod
+    def _key(alert: Dict) -> Tuple:
+        """合併鍵：同一股票同一類型的警示視為同一事件"""
+        return (alert.get('symbol'), alert.get('type'), alert.get('rule'))
+
+    def start(self):
+        """啟動背景事件迴圈與 worker（程序結束時自動送完佇列中的警示）"""
+        if self._thread and self._thread.is_alive():
+            return
+        if not self._atexit_registered:
+            # worker 是 daemon 執行緒，未呼叫 close() 時佇列中的警示會隨程序結束而遺失
+            atexit.register(self.close)
+            self._atexit_registered = True
+        self._started.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='alert-dispatcher', daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._ready = asyncio.Semaphore(0)
+        for _ in range(self.workers):
+            loop.create_task(self._worker())
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    def submit(self, alert: Dict) -> bool:
+        """
+        放入佇列（不阻塞，可由任意執行緒呼叫）
+
+        Args:
+            alert: 警示字典
+
+        Returns:
+            是否已入列（佇列已滿時被合併也算入列；佇列已滿且策略為 drop_new 時回傳 False）
+        """
+        self.start()
+
+        with self._lock:
+            self.stats.submitted += 1
+            key = self._key(alert)
+
+            if len(self._pending) >= self.maxsize:
+                seq = self._index.get(key) if self.policy == POLICY_MERGE else None
+                if seq is not None:
+                    # 合併：保留最早入列時間，內容更新為最新警示
+                    previous, enqueued_at = self._pending[seq]
+                    merged = dict(alert)
+                    merged['merged_count'] = previous.get('merged_count', 0) + 1
+                    self._pending[seq] = (merged, enqueued_at)
+                    self.stats.merged += 1
+                    return True
+                if self.policy == POLICY_DROP_NEW:
+                    self.stats.dropped += 1
+                    return False
+                self._discard(*self._pending.popitem(last=False))
+                self.stats.dropped += 1
+
+            self._sequence += 1
+            self._pending[self._sequence] = (alert, time.monotonic())
+            self._index[key] = self._sequence
+            self.stats.max_depth = max(self.stats.max_depth, len(self._pending))
+
+        self._loop.call_soon_threadsafe(self._ready.release)
+        return True
+
+    def _discard(self, seq: int, item: Tuple[Dict, float]):
+        """移出佇列的項目同時移除合併索引（索引已指向較新的同鍵警示時保留）"""
+        key = self._key(item[0])
+        if self._index.get(key) == seq:
+            del self._index[key]
+
+    def _pop(self) -> Optional[Tuple[Dict, float]]:
+        with self._lock:
+            if not self._pending:
+                return None
+            self._in_flight += 1
+            seq, item = self._pending.popitem(last=False)
+            self._discard(seq, item)
+            return item
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._ready.acquire()
+            item = self._pop()
+            if item is None:
+                # 該項已被丟棄或合併
+                continue
+
+            alert, enqueued_at = item
+            failures = 0
+            try:
+                for callback in self.callbacks:
+                    try:
+                        if asyncio.iscoroutinefunction(callback):
+                            await callback(alert)
+                        else:
+                            await loop.run_in_executor(None, callback, alert)
+                    except Exception as e:
+                        failures += 1
+                        print(f"回調錯誤: {e}")
+            finally:
+                latency = time.monotonic() - enqueued_at
+                with self._lock:
+                    self._in_flight -= 1
+                    self.stats.dispatched += 1
+                    self.stats.failed += failures
+                    self.stats.total_latency += latency
+                    self.stats.max_latency = max(self.stats.max_latency, latency)
+                    self._idle.notify_all()
+
+    @property
+    def depth(self) -> int:
+        """目前佇列深度"""
+        with self._lock:
+            return len(self._pending)
+
+    def get_stats(self) -> Dict:
+        """取得背壓統計"""
+        return self.stats.to_dict(self.depth)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待佇列清空
+
+        Args:
+            timeout: 最長等待秒數
+
+        Returns:
+            是否在時限內清空
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """送完剩餘警示後停止背景迴圈"""
+        if not self._thread:
+            return
+        self.flush(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
@@ -0,0 +1,409 @@
+"""
+表達式警示規則模組
+將 `rsi14 < 30 and close > ma20` 這類條件解析一次，
+編譯為向量化的 NumPy 判斷式，每個快照對所有股票一次計算
+"""
+import ast
+import heapq
+import operator
+import time
+from typing import List, Dict, Callable, Optional, Iterable, Set, Tuple
+
+import numpy as np
+
+
+# 支援的運算子
+_COMPARE_OPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+_FUNCTIONS = {
+    'abs': np.abs,
+}
+
+
+class AlertSnapshot:
+    """單一時間點的全市場快照（欄式存放）"""
+
+    def __init__(self, symbols: List[str], columns: Dict[str, np.ndarray]):
+        """
+        初始化
+
+        Args:
+            symbols: 股票代碼列表
+            columns: 欄位名稱 → 與 symbols 等長的數值陣列
+        """
+        self.symbols = list(symbols)
+        self.columns = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+
+def build_snapshot(rows: List[Dict]) -> AlertSnapshot:
+    """
+    由逐筆股票字典建立欄式快照
+
+    Args:
+        rows: 每支股票一個字典，需包含 'symbol'，其餘數值欄位為指標
+
+    Returns:
+        AlertSnapshot（缺少的欄位以 NaN 補齊）
+    """
+    symbols = [row['symbol'] for row in rows]
+    names = []
+    for row in rows:
+        for key in row:
+            if key != 'symbol' and key not in names:
+                names.append(key)
+
+    columns = {}
+    for name in names:
+        values = []
+        for row in rows:
+            value = row.get(name)
+            values.append(np.nan if value is None else value)
+        try:
+            columns[name] = np.asarray(values, dtype=float)
+        except (TypeError, ValueError):
+            # 非數值欄位（如時間字串）不參與判斷
+            continue
+
+    return AlertSnapshot(symbols, columns)
+
+
+class _Compiler:
+    """將表達式 AST 編譯為接受欄位字典的閉包"""
+
+    def __init__(self):
+        self.fields = set()
+
+    def compile(self, node: ast.AST) -> Tuple[str, Callable]:
+        """回傳 (子表達式鍵值, 計算函數)；鍵值用於同一快照內共用計算結果"""
+        key = ast.dump(node)
+
+        if isinstance(node, ast.Expression):
+            return self.compile(node.body)
+
+        if isinstance(node, ast.BoolOp):
+            parts = [self.compile(v)[1] for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+            def fn(env, parts=parts, combine=combine):
+                result = parts[0](env)
+                for part in parts[1:]:
+                    result = combine(result, part(env))
+                return result
+
+        elif isinstance(node, ast.UnaryOp):
+            operand = self.compile(node.operand)[1]
+            if isinstance(node.op, ast.Not):
+                fn = lambda env, operand=operand: np.logical_not(operand(env))
+            elif isinstance(node.op, ast.USub):
+                fn = lambda env, operand=operand: -operand(env)
+            elif isinstance(node.op, ast.UAdd):
+                fn = operand
+            else:
+                raise ValueError(f"不支援的運算子: {type(node.op).__name__}")
+
+        elif isinstance(node, ast.Compare):
+            left = self.compile(node.left)[1]
+            ops = []
+            for op, comparator in zip(node.ops, node.comparators):
+                if type(op) not in _COMPARE_OPS:
+                    raise ValueError(f"不支援的比較: {type(op).__name__}")
+                ops.append((_COMPARE_OPS[type(op)], self.compile(comparator)[1]))
+
+            def fn(env, left=left, ops=ops):
+                # 支援 a < b < c 連續比較
+                result = None
+                lhs = left(env)
+                for compare, right in ops:
+                    rhs = right(env)
+                    part = compare(lhs, rhs)
+                    result = part if result is None else np.logical_and(result, part)
+                    lhs = rhs
+                return result
+
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in _BIN_OPS:
+                raise ValueError(f"不支援的運算子: {type(node.op).__name__}")
+            op = _BIN_OPS[type(node.op)]
+            left = self.compile(node.left)[1]
+            right = self.compile(node.right)[1]
+            fn = lambda env, op=op, left=left, right=right: op(left(env), right(env))
+
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+                raise ValueError(f"不支援的函數呼叫: {ast.dump(node.func)}")
+            func = _FUNCTIONS[node.func.id]
+            args = [self.compile(a)[1] for a in node.args]
+            fn = lambda env, func=func, args=args: func(*[a(env) for a in args])
+
+        elif isinstance(node, ast.Name):
+            name = node.id
+            self.fields.add(name)
+
+            def fn(env, name=name):
+                columns = env['columns']
+                if name not in columns:
+                    raise KeyError(f"快照缺少欄位: {name}")
+                return columns[name]
+
+        elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float, bool)):
+            value = float(node.value)
+            fn = lambda env, value=value: value
+
+        else:
+            raise ValueError(f"不支援的語法: {type(node).__name__}")
+
+        def cached(env, key=key, fn=fn):
+            memo = env['memo']
+            if key not in memo:
+                memo[key] = fn(env)
+            return memo[key]
+
+        return key, cached
+
+
+class CompiledCondition:
+    """已編譯的條件表達式"""
+
+    def __init__(self, expression: str):
+        """
+        解析並編譯表達式
+
+        Args:
+            expression: 條件，例如 'rsi14 < 30 and close > ma20'
+
+        Raises:
+            ValueError: 表達式語法錯誤或含不支援的語法
+        """
+        self.expression = expression.strip()
+        try:
+            tree = ast.parse(self.expression, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"條件語法錯誤: {expression} ({e.msg})")
+
+        compiler = _Compiler()
+        self.key, self._fn = compiler.compile(tree)
+        self.fields = frozenset(compiler.fields)
+
+    def evaluate(self, snapshot: AlertSnapshot, memo: Optional[Dict] = None) -> np.ndarray:
+        """
+        對快照中所有股票計算條件
+
+        Args:
+            snapshot: 欄式快照
+            memo: 同一快照內共用的子表達式結果
+
+        Returns:
+            布林陣列（NaN 比較結果為 False）
+        """
+        return self.values(snapshot, memo).astype(bool)
+
+    def values(self, snapshot: AlertSnapshot, memo: Optional[Dict] = None) -> np.ndarray:
+        """
+        計算表達式的原始數值（如 'close / ma20'，供排序使用）
+
+        Args:
+            snapshot: 欄式快照
+            memo: 同一快照內共用的子表達式結果
+
+        Returns:
+            與快照等長的陣列
+        """
+        env = {'columns': snapshot.columns, 'memo': {} if memo is None else memo}
+        result = np.asarray(self._fn(env))
+        if result.ndim == 0:
+            result = np.full(len(snapshot), result)
+        return result
+
+
+class AlertRule:
+    """表達式警示規則"""
+
+    def __init__(self, rule_id: int, condition: CompiledCondition,
+                 symbols: Optional[Iterable[str]] = None, name: Optional[str] = None,
+                 rearm: Optional[CompiledCondition] = None,
+                 cooldown_seconds: Optional[float] = None):
+        self.rule_id = rule_id
+        self.condition = condition
+        self.symbols = frozenset(symbols) if symbols else None
+        self.name = name or condition.expression
+        self.rearm = rearm
+        self.cooldown = cooldown_seconds
+
+    @property
+    def expression(self) -> str:
+        return self.condition.expression
+
+
+class AlertRuleEngine:
+    """規則引擎：相同表達式只編譯、計算一次"""
+
+    def __init__(self):
+        self.rules: List[AlertRule] = []
+        self._conditions: Dict[str, CompiledCondition] = {}
+        # 表達式 → {'all': 全市場規則, 'by_symbol': 股票 → 規則}
+        self._groups: Dict[str, Dict] = {}
+        # (規則 ID, 股票) → 觸發時間；只有已觸發的項目需要檢查重新啟用
+        self._fired: Dict[Tuple[int, str], float] = {}
+        # 股票 → 已觸發的規則 ID（遲滯條件只檢查快照中的股票）
+        self._fired_by_symbol: Dict[str, Set[int]] = {}
+        # 冷卻到期堆積：(到期時間, 規則 ID, 股票, 觸發時間)；已失效的項目在彈出時略過
+        self._cooldowns: List[Tuple[float, int, str, float]] = []
+
+    def _compile(self, expression: str) -> CompiledCondition:
+        """編譯表達式（相同表達式共用）"""
+        condition = self._conditions.get(expression.strip())
+        if condition is None:
+            condition = CompiledCondition(expression)
+            self._conditions[condition.expression] = condition
+        return condition
+
+    def add_rule(self, expression: str, symbols: Optional[Iterable[str]] = None,
+                 name: Optional[str] = None, rearm: Optional[str] = None,
+                 cooldown_seconds: Optional[float] = None) -> AlertRule:
+        """
+        添加規則
+
+        Args:
+            expression: 條件表達式
+            symbols: 限定股票（None 為全部）
+            name: 規則名稱
+            rearm: 重新啟用條件（遲滯帶），成立時規則重新啟用
+            cooldown_seconds: 冷卻時間（秒），觸發後經過此時間重新啟用
+
+        未設定 rearm 與 cooldown_seconds 時，觸發後維持停用直到 reset()
+
+        Returns:
+            建立的規則
+        """
+        condition = self._compile(expression)
+        rearm_condition = self._compile(rearm) if rearm else None
+
+        rule = AlertRule(len(self.rules), condition, symbols, name,
+                         rearm=rearm_condition, cooldown_seconds=cooldown_seconds)
+        self.rules.append(rule)
+
+        group = self._groups.setdefault(condition.expression, {'all': [], 'by_symbol': {}})
+        if rule.symbols is None:
+            group['all'].append(rule)
+        else:
+            for symbol in rule.symbols:
+                group['by_symbol'].setdefault(symbol, []).append(rule)
+        return rule
+
+    def _mark_fired(self, rule: AlertRule, symbol: str, now: float):
+        """記錄觸發（有冷卻時間時排入到期堆積）"""
+        self._fired[(rule.rule_id, symbol)] = now
+        self._fired_by_symbol.setdefault(symbol, set()).add(rule.rule_id)
+        if rule.cooldown is not None:
+            heapq.heappush(self._cooldowns, (now + rule.cooldown, rule.rule_id, symbol, now))
+
+    def _clear_fired(self, rule_id: int, symbol: str):
+        """移除觸發記錄（堆積中的對應項目在到期時略過）"""
+        del self._fired[(rule_id, symbol)]
+        rule_ids = self._fired_by_symbol[symbol]
+        rule_ids.discard(rule_id)
+        if not rule_ids:
+            del self._fired_by_symbol[symbol]
+
+    def _rearm_fired(self, snapshot: AlertSnapshot, memo: Dict, now: float):
+        """檢查已觸發項目是否滿足冷卻或遲滯條件（只處理到期與快照中的股票）"""
+        # 冷卻：只彈出已到期的項目
+        while self._cooldowns and self._cooldowns[0][0] <= now:
+            _, rule_id, symbol, fired_at = heapq.heappop(self._cooldowns)
+            # 已被遲滯條件或 rearm() 清除、或之後重新觸發的項目已失效
+            if self._fired.get((rule_id, symbol)) == fired_at:
+                self._clear_fired(rule_id, symbol)
+
+        # 遲滯：只檢查快照中有已觸發規則的股票
+        if len(self._fired_by_symbol) <= len(snapshot):
+            symbols = [symbol for symbol in self._fired_by_symbol if symbol in snapshot.index]
+        else:
+            symbols = [symbol for symbol in snapshot.symbols if symbol in self._fired_by_symbol]
+
+        masks = {}
+        for symbol in symbols:
+            for rule_id in list(self._fired_by_symbol[symbol]):
+                rule = self.rules[rule_id]
+                if rule.rearm is None or rule.rearm.fields - set(snapshot.columns):
+                    continue
+
+                expression = rule.rearm.expression
+                if expression not in masks:
+                    masks[expression] = rule.rearm.evaluate(snapshot, memo)
+                if masks[expression][snapshot.index[symbol]]:
+                    self._clear_fired(rule_id, symbol)
+
+    def evaluate(self, snapshot: AlertSnapshot, now: Optional[float] = None) -> List[Dict]:
+        """
+        計算所有規則並回傳新觸發的 (規則, 股票)
+
+        Args:
+            snapshot: 欄式快照
+            now: 目前時間（秒），預設 time.time()
+
+        Returns:
+            觸發列表
+        """
+        triggered = []
+        memo = {}
+        close = snapshot.columns.get('close')
+        now = time.time() if now is None else now
+
+        if self._fired:
+            self._rearm_fired(snapshot, memo, now)
+
+        for expression, group in self._groups.items():
+            condition = self._conditions[expression]
+            if condition.fields - set(snapshot.columns):
+                continue
+
+            mask = condition.evaluate(snapshot, memo)
+            if not mask.any():
+                continue
+
+            # 只有命中的股票才進入 Python 迴圈
+            for i in np.flatnonzero(mask):
+                symbol = snapshot.symbols[i]
+                for rule in group['all'] + group['by_symbol'].get(symbol, []):
+                    if (rule.rule_id, symbol) in self._fired:
+                        continue
+                    self._mark_fired(rule, symbol, now)
+                    triggered.append({
+                        'symbol': symbol,
+                        'type': 'rule',
+                        'rule': rule.name,
+                        'expression': expression,
+                        'current': float(close[i]) if close is not None else None,
+                        'message': f'{symbol} 符合條件 {rule.name}',
+                    })
+
+        return triggered
+
+    def rearm(self, symbol: str):
+        """重新啟用單一股票的所有規則"""
+        for rule_id in self._fired_by_symbol.pop(symbol, ()):
+            del self._fired[(rule_id, symbol)]
+
+    def reset(self):
+        """重置所有規則的觸發狀態"""
+        self._fired.clear()
+        self._fired_by_symbol.clear()
+        self._cooldowns.clear()
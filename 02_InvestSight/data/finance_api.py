@@ -7,6 +7,8 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import pandas as pd
 
+from monitoring.metrics import metrics
+
 # 默認追蹤股票
 DEFAULT_STOCKS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA']
 
@@ -19,8 +21,8 @@ class FinanceDataFetcher:
     def get_stock_price(self, symbol: str) -> Optional[Dict]:
         """獲取股票當前價格"""
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+            with metrics.timer('fetch_seconds', source='quote', symbol=symbol):
+                info = yf.Ticker(symbol).info
             return {
                 'symbol': symbol,
                 'price': info.get('currentPrice', info.get('regularMarketPrice')),
@@ -41,8 +43,8 @@ class FinanceDataFetcher:
             period: 數據週期 (1d, 5d, 1wk, 1mo)
         """
         try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period=period, interval=interval)
+            with metrics.timer('fetch_seconds', source='intraday', symbol=symbol):
+                data = yf.Ticker(symbol).history(period=period, interval=interval)
             return data
         except Exception as e:
             print(f"獲取 {symbol} 日內數據失敗：{e}")
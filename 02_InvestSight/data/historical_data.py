@@ -3,11 +3,28 @@
 真實歷史數據獲取模塊
 使用 yfinance 獲取真實的歷史股價數據
 """
+import json
 import yfinance as yf
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, List, Optional
 
+from monitoring.metrics import metrics
+
+# 批量歷史數據的磁碟緩存位置
+HISTORY_CACHE_DIR = Path(__file__).resolve().parent / 'cache' / 'history'
+
+# 股票基本信息的磁碟緩存位置
+INFO_CACHE_DIR = Path(__file__).resolve().parent / 'cache' / 'info'
+
+# 記憶體緩存：(股票, 時間範圍) → 歷史數據
+_history_cache: Dict[tuple, Dict] = {}
+
+# 記憶體緩存：股票 → 基本信息
+_info_cache: Dict[str, Dict] = {}
+
 
 def get_historical_data(symbol: str, period: str = '60d') -> Dict:
     """
@@ -21,43 +38,48 @@ def get_historical_data(symbol: str, period: str = '60d') -> Dict:
         包含歷史數據的字典
     """
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period)
+        with metrics.timer('fetch_seconds', source='history', symbol=symbol):
+            hist = yf.Ticker(symbol).history(period=period)
 
         if hist.empty:
             print(f"⚠️  無法獲取 {symbol} 的歷史數據")
             return {}
 
-        # 提取數據
-        data = {
-            'symbol': symbol,
-            'timestamp': datetime.now().isoformat(),
-            'prices': hist['Close'].tolist(),
-            'opens': hist['Open'].tolist(),
-            'highs': hist['High'].tolist(),
-            'lows': hist['Low'].tolist(),
-            'volumes': hist['Volume'].tolist(),
-            'dates': [d.strftime('%Y-%m-%d') for d in hist.index],
-            'current_price': hist['Close'].iloc[-1],
-            'change': hist['Close'].iloc[-1] - hist['Close'].iloc[0],
-            'change_percent': ((hist['Close'].iloc[-1] / hist['Close'].iloc[0]) - 1) * 100,
-        }
-
-        # 添加統計信息
-        data['stats'] = {
-            'high': hist['High'].max(),
-            'low': hist['Low'].min(),
-            'avg_volume': hist['Volume'].mean(),
-            'volatility': hist['Close'].std(),
-        }
-
-        return data
+        return _history_dict(symbol, hist)
 
     except Exception as e:
         print(f"✗ 獲取 {symbol} 歷史數據失敗：{e}")
         return {}
 
 
+def _history_dict(symbol: str, hist: pd.DataFrame) -> Dict:
+    """將 OHLCV DataFrame 轉換為歷史數據字典"""
+    # 提取數據
+    data = {
+        'symbol': symbol,
+        'timestamp': datetime.now().isoformat(),
+        'prices': hist['Close'].tolist(),
+        'opens': hist['Open'].tolist(),
+        'highs': hist['High'].tolist(),
+        'lows': hist['Low'].tolist(),
+        'volumes': hist['Volume'].tolist(),
+        'dates': [d.strftime('%Y-%m-%d') for d in hist.index],
+        'current_price': float(hist['Close'].iloc[-1]),
+        'change': float(hist['Close'].iloc[-1] - hist['Close'].iloc[0]),
+        'change_percent': float(((hist['Close'].iloc[-1] / hist['Close'].iloc[0]) - 1) * 100),
+    }
+
+    # 添加統計信息
+    data['stats'] = {
+        'high': float(hist['High'].max()),
+        'low': float(hist['Low'].min()),
+        'avg_volume': float(hist['Volume'].mean()),
+        'volatility': float(hist['Close'].std()),
+    }
+
+    return data
+
+
 def get_multiple_symbols(symbols: List[str], period: str = '60d') -> Dict[str, Dict]:
     """
     批量獲取多支股票的歷史數據
@@ -77,6 +99,97 @@ def get_multiple_symbols(symbols: List[str], period: str = '60d') -> Dict[str, D
     return results
 
 
+def _cache_path(symbol: str, period: str) -> Path:
+    return HISTORY_CACHE_DIR / period / f"{symbol.replace('/', '_')}.json"
+
+
+def _read_cache(symbol: str, period: str, max_age_hours: float) -> Optional[Dict]:
+    """讀取未過期的緩存（記憶體優先，其次磁碟）"""
+    key = (symbol, period)
+    cached = _history_cache.get(key)
+    if cached is None:
+        path = _cache_path(symbol, period)
+        try:
+            with open(path, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        _history_cache[key] = cached
+
+    age = datetime.now() - datetime.fromisoformat(cached['timestamp'])
+    if age > timedelta(hours=max_age_hours):
+        return None
+    return cached
+
+
+def _write_cache(symbol: str, period: str, data: Dict):
+    _history_cache[(symbol, period)] = data
+    path = _cache_path(symbol, period)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    except OSError as e:
+        print(f"⚠ 寫入歷史數據緩存失敗：{e}")
+
+
+def prefetch_history(symbols: List[str], period: str = '6mo',
+                     max_age_hours: float = 12) -> Dict[str, Dict]:
+    """
+    批量預取歷史數據（一次 yf.download 下載所有未緩存的股票）
+
+    Args:
+        symbols: 股票代號列表
+        period: 時間範圍
+        max_age_hours: 緩存有效時數（0 為不使用緩存）
+
+    Returns:
+        字典，鍵為股票代號，值為歷史數據（格式同 get_historical_data）
+    """
+    symbols = list(dict.fromkeys(symbols))
+    results = {}
+    missing = []
+    for symbol in symbols:
+        cached = _read_cache(symbol, period, max_age_hours) if max_age_hours > 0 else None
+        if cached:
+            results[symbol] = cached
+        else:
+            missing.append(symbol)
+        metrics.inc('cache_requests_total', cache='history', result='hit' if cached else 'miss')
+
+    if missing:
+        try:
+            with metrics.timer('fetch_seconds', source='history_batch'):
+                frame = yf.download(missing, period=period, group_by='ticker', auto_adjust=True,
+                                    threads=True, progress=False)
+        except Exception as e:
+            print(f"✗ 批量下載歷史數據失敗：{e}")
+            frame = None
+
+        for symbol in missing:
+            if frame is None or frame.empty:
+                break
+            try:
+                if isinstance(frame.columns, pd.MultiIndex):
+                    hist = frame[symbol]
+                else:
+                    hist = frame
+                hist = hist.dropna(subset=['Close'])
+            except KeyError:
+                hist = pd.DataFrame()
+
+            if hist.empty:
+                print(f"⚠️  無法獲取 {symbol} 的歷史數據")
+                continue
+
+            data = _history_dict(symbol, hist)
+            _write_cache(symbol, period, data)
+            results[symbol] = data
+
+    # 保持輸入順序
+    return {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+
 def get_stock_info(symbol: str) -> Dict:
     """
     獲取股票基本信息
@@ -88,8 +201,8 @@ def get_stock_info(symbol: str) -> Dict:
         股票信息字典
     """
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        with metrics.timer('fetch_seconds', source='info', symbol=symbol):
+            info = yf.Ticker(symbol).info
 
         return {
             'symbol': symbol,
@@ -108,6 +221,75 @@ def get_stock_info(symbol: str) -> Dict:
         return {}
 
 
+def _info_cache_path(symbol: str) -> Path:
+    return INFO_CACHE_DIR / f"{symbol.replace('/', '_')}.json"
+
+
+def _read_info_cache(symbol: str, max_age_hours: float) -> Optional[Dict]:
+    """讀取未過期的基本信息緩存（記憶體優先，其次磁碟）"""
+    cached = _info_cache.get(symbol)
+    if cached is None:
+        try:
+            with open(_info_cache_path(symbol), encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        _info_cache[symbol] = cached
+
+    age = datetime.now() - datetime.fromisoformat(cached['timestamp'])
+    if age > timedelta(hours=max_age_hours):
+        return None
+    return cached['info']
+
+
+def _write_info_cache(symbol: str, info: Dict):
+    cached = {'timestamp': datetime.now().isoformat(), 'info': info}
+    _info_cache[symbol] = cached
+    path = _info_cache_path(symbol)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cached, f)
+    except OSError as e:
+        print(f"⚠ 寫入股票信息緩存失敗：{e}")
+
+
+def prefetch_info(symbols: List[str], max_age_hours: float = 24 * 7,
+                  max_workers: int = 8) -> Dict[str, Dict]:
+    """
+    批量預取股票基本信息（未緩存的股票並行查詢，結果寫入緩存）
+
+    Args:
+        symbols: 股票代號列表
+        max_age_hours: 緩存有效時數（名稱、產業很少變動；0 為不使用緩存）
+        max_workers: 同時查詢的股票數
+
+    Returns:
+        字典，鍵為股票代號，值為股票信息（格式同 get_stock_info；查詢失敗的股票不包含在內）
+    """
+    symbols = list(dict.fromkeys(symbols))
+    results = {}
+    missing = []
+    for symbol in symbols:
+        cached = _read_info_cache(symbol, max_age_hours) if max_age_hours > 0 else None
+        if cached:
+            results[symbol] = cached
+        else:
+            missing.append(symbol)
+        metrics.inc('cache_requests_total', cache='info', result='hit' if cached else 'miss')
+
+    if missing:
+        # yfinance 沒有批量的 info 端點，改為並行查詢
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+            for symbol, info in zip(missing, pool.map(get_stock_info, missing)):
+                if info:
+                    _write_info_cache(symbol, info)
+                    results[symbol] = info
+
+    # 保持輸入順序
+    return {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+
 if __name__ == '__main__':
     # 測試
     print("=" * 70)
@@ -3,8 +3,12 @@
 支持：RSS Feeds
 """
 import feedparser
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from typing import List, Dict
+from itertools import islice
+from typing import List, Dict, Iterator, Optional
+
+from monitoring.metrics import metrics
 
 # 默認新聞源
 DEFAULT_RSS_FEEDS = ['https://finance.yahoo.com/news/rssindex']
@@ -18,23 +22,29 @@ class NewsFetcher:
         if not self.rss_feeds or self.rss_feeds == ['']:
             self.rss_feeds = DEFAULT_RSS_FEEDS
     
+    @staticmethod
+    def _parse_entry(entry) -> Dict:
+        """將 feedparser 條目轉換為新聞字典"""
+        source_name = 'Unknown'
+        if hasattr(entry, 'source') and entry.source:
+            source_name = entry.source.get('title', 'Unknown')
+        
+        return {
+            'title': entry.title,
+            'link': entry.link,
+            'published': entry.get('published', datetime.now().isoformat()),
+            'source': source_name,
+            'summary': entry.get('summary', '')[:500] or entry.title,
+        }
+    
     def fetch_rss(self, url: str, limit: int = 10) -> List[Dict]:
         """抓取 RSS 新聞"""
         try:
-            feed = feedparser.parse(url)
+            with metrics.timer('fetch_seconds', source='rss'):
+                feed = feedparser.parse(url)
             articles = []
             for entry in feed.entries[:limit]:
-                source_name = 'Unknown'
-                if hasattr(entry, 'source') and entry.source:
-                    source_name = entry.source.get('title', 'Unknown')
-                
-                articles.append({
-                    'title': entry.title,
-                    'link': entry.link,
-                    'published': entry.get('published', datetime.now().isoformat()),
-                    'source': source_name,
-                    'summary': entry.get('summary', '')[:500] or entry.title,
-                })
+                articles.append(self._parse_entry(entry))
             return articles
         except Exception as e:
             print(f"抓取 RSS {url} 失敗：{e}")
@@ -48,6 +58,65 @@ class NewsFetcher:
                 articles = self.fetch_rss(feed_url)
                 all_articles.extend(articles)
         return all_articles
+    
+    def iter_rss(self, url: str, limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        逐篇產生 RSS 新聞（解析錯誤的條目略過，不中斷整個來源）
+        
+        Args:
+            url: RSS 網址
+            limit: 最多篇數（None 為全部）
+        """
+        try:
+            with metrics.timer('fetch_seconds', source='rss'):
+                feed = feedparser.parse(url)
+        except Exception as e:
+            print(f"抓取 RSS {url} 失敗：{e}")
+            return
+        
+        for entry in feed.entries[:limit]:
+            try:
+                yield self._parse_entry(entry)
+            except Exception as e:
+                print(f"解析 RSS 條目失敗（{url}）：{e}")
+    
+    def iter_all(self, limit: Optional[int] = None, max_workers: int = 4) -> Iterator[Dict]:
+        """
+        並行抓取所有新聞源，依完成先後逐篇產生
+        
+        同時下載的來源數不超過 max_workers，已下載未消費的來源也不超過此數，
+        因此來源再多，記憶體用量仍有上限；最快的來源不必等最慢的來源
+        
+        Args:
+            limit: 每個來源最多篇數（None 為全部）
+            max_workers: 同時抓取的來源數
+        """
+        feeds = iter([url for url in self.rss_feeds if url])
+        
+        def load(url):
+            with metrics.timer('fetch_seconds', source='rss'):
+                return url, feedparser.parse(url)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = {pool.submit(load, url) for url in islice(feeds, max_workers)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # 補上下一個來源，保持並行度
+                    for url in islice(feeds, 1):
+                        pending.add(pool.submit(load, url))
+                    
+                    try:
+                        url, feed = future.result()
+                    except Exception as e:
+                        print(f"抓取 RSS 失敗：{e}")
+                        continue
+                    
+                    for entry in feed.entries[:limit]:
+                        try:
+                            yield self._parse_entry(entry)
+                        except Exception as e:
+                            print(f"解析 RSS 條目失敗（{url}）：{e}")
 
 fetcher = NewsFetcher()
 
@@ -3,60 +3,126 @@
 盤中價格變動監控與預警
 """
 import os
+import time
 import asyncio
 from datetime import datetime
-from typing import List, Dict, Callable, Optional
+from typing import List, Dict, Callable, Optional, Iterable
 from dotenv import load_dotenv
 
+from data.alert_rules import AlertRuleEngine, AlertSnapshot, build_snapshot
+from data.alert_dispatch import AlertDispatcher
+
 load_dotenv()
 
 
 class PriceMonitor:
     """價格監控器"""
     
-    def __init__(self, threshold_percent: float = 2.0):
+    def __init__(self, threshold_percent: float = 2.0, async_dispatch: bool = True,
+                 dispatcher: Optional[AlertDispatcher] = None):
         """
         初始化
         
         Args:
             threshold_percent: 價格變動閾值 (默認 2%)
+            async_dispatch: 是否經由背景佇列執行回調（False 則同步執行；程序結束時會送完佇列中的警示）
+            dispatcher: 自訂派送器（佇列大小、worker 數量、滿載策略）
         """
         self.threshold_percent = threshold_percent
         self.alerts = []
         self.callbacks = []
+        if dispatcher is not None:
+            dispatcher.callbacks = self.callbacks
+        elif async_dispatch:
+            dispatcher = AlertDispatcher(self.callbacks)
+        self.dispatcher = dispatcher
+        self.rule_engine = AlertRuleEngine()
+        self.clock = time.time
+        # 股票 → 警示，每次只檢查該股票的警示
+        self._alerts_by_symbol: Dict[str, List[Dict]] = {}
     
-    def add_alert(self, symbol: str, price: float, condition: str = 'above'):
+    def add_alert(self, symbol: str, price: float, condition: str = 'above',
+                  hysteresis: Optional[float] = None, cooldown_seconds: Optional[float] = None):
         """添加價格警示
         
         Args:
             symbol: 股票代碼
             price: 目標價格
             condition: 條件 ('above', 'below', 'change')
+            hysteresis: 回落帶寬（above/below 為目標價的百分比，change 為百分點），
+                        價格回到帶寬外後重新啟用
+            cooldown_seconds: 冷卻時間（秒），觸發後經過此時間重新啟用
+        
+        未設定 hysteresis 與 cooldown_seconds 時，觸發後維持停用直到 reset()
         """
-        self.alerts.append({
+        alert = {
             'symbol': symbol,
             'price': price,
             'condition': condition,
-            'triggered': False
-        })
+            'triggered': False,
+            'triggered_at': None,
+            'hysteresis': hysteresis,
+            'cooldown': cooldown_seconds,
+        }
+        self.alerts.append(alert)
+        self._alerts_by_symbol.setdefault(symbol, []).append(alert)
+        return alert
+    
+    def add_rule(self, expression: str, symbols: Optional[Iterable[str]] = None,
+                 name: Optional[str] = None, rearm: Optional[str] = None,
+                 cooldown_seconds: Optional[float] = None):
+        """添加表達式警示
+        
+        Args:
+            expression: 條件，例如 'rsi14 < 30 and close > ma20' 或 'pct_change_15m > 3'
+            symbols: 限定股票（None 為全部）
+            name: 規則名稱
+            rearm: 重新啟用條件（遲滯），例如觸發 'rsi14 < 30'、重新啟用 'rsi14 > 35'
+            cooldown_seconds: 冷卻時間（秒）
+        """
+        return self.rule_engine.add_rule(expression, symbols, name,
+                                         rearm=rearm, cooldown_seconds=cooldown_seconds)
     
     def add_callback(self, callback: Callable):
         """添加回調函數"""
         self.callbacks.append(callback)
     
+    def _try_rearm(self, alert: Dict, current_price: float, change_pct: Optional[float], now: float) -> bool:
+        """檢查已觸發的警示是否可重新啟用"""
+        cooldown = alert['cooldown']
+        if cooldown is not None and now - alert['triggered_at'] >= cooldown:
+            return True
+        
+        band = alert['hysteresis']
+        if band is None:
+            return False
+        
+        condition = alert['condition']
+        target = alert['price']
+        if condition == 'above':
+            return current_price <= target * (1 - band / 100)
+        if condition == 'below':
+            return current_price >= target * (1 + band / 100)
+        if condition == 'change':
+            return change_pct is not None and change_pct <= target - band
+        return False
+    
     def check_price(self, symbol: str, current_price: float, prev_price: float = None) -> List[Dict]:
         """檢查價格並觸發警示"""
         triggered = []
+        now = self.clock()
+        change_pct = abs((current_price - prev_price) / prev_price * 100) if prev_price else None
         
-        for alert in self.alerts:
-            if alert['triggered'] or alert['symbol'] != symbol:
-                continue
+        for alert in self._alerts_by_symbol.get(symbol, ()):
+            if alert['triggered']:
+                if not self._try_rearm(alert, current_price, change_pct, now):
+                    continue
+                alert['triggered'] = False
             
             condition = alert['condition']
             target = alert['price']
             
             if condition == 'above' and current_price > target:
-                alert['triggered'] = True
                 triggered.append({
                     'symbol': symbol,
                     'type': 'above',
@@ -66,7 +132,6 @@ class PriceMonitor:
                 })
             
             elif condition == 'below' and current_price < target:
-                alert['triggered'] = True
                 triggered.append({
                     'symbol': symbol,
                     'type': 'below',
@@ -75,19 +140,38 @@ class PriceMonitor:
                     'message': f'{symbol} 跌破 \${target:.2f} (現價 \${current_price:.2f})'
                 })
             
-            elif condition == 'change' and prev_price:
-                change_pct = abs((current_price - prev_price) / prev_price * 100)
-                if change_pct >= target:
-                    alert['triggered'] = True
-                    triggered.append({
-                        'symbol': symbol,
-                        'type': 'change',
-                        'target': target,
-                        'current': current_price,
-                        'prev': prev_price,
-                        'change_pct': change_pct,
-                        'message': f'{symbol} 變動 {change_pct:.2f}% (從 \${prev_price:.2f} 到 \${current_price:.2f})'
-                    })
+            elif condition == 'change' and change_pct is not None and change_pct >= target:
+                triggered.append({
+                    'symbol': symbol,
+                    'type': 'change',
+                    'target': target,
+                    'current': current_price,
+                    'prev': prev_price,
+                    'change_pct': change_pct,
+                    'message': f'{symbol} 變動 {change_pct:.2f}% (從 \${prev_price:.2f} 到 \${current_price:.2f})'
+                })
+            
+            else:
+                continue
+            
+            alert['triggered'] = True
+            alert['triggered_at'] = now
+        
+        for t in triggered:
+            self._notify(t)
+        
+        return triggered
+    
+    def check_snapshot(self, snapshot) -> List[Dict]:
+        """對全市場快照計算所有表達式警示
+        
+        Args:
+            snapshot: AlertSnapshot 或逐筆股票字典列表
+        """
+        if not isinstance(snapshot, AlertSnapshot):
+            snapshot = build_snapshot(snapshot)
+        
+        triggered = self.rule_engine.evaluate(snapshot, now=self.clock())
         
         for t in triggered:
             self._notify(t)
@@ -97,16 +181,38 @@ class PriceMonitor:
     def _notify(self, alert: Dict):
         """觸發通知"""
         print(f"⚠️ 價格預警: {alert['message']}")
+        if not self.callbacks:
+            return
+        
+        if self.dispatcher:
+            # 放入佇列後立即返回，不等待 Webhook
+            self.dispatcher.submit(alert)
+            return
+        
         for callback in self.callbacks:
             try:
                 callback(alert)
             except Exception as e:
                 print(f"回調錯誤: {e}")
     
+    def close(self, timeout: float = 10.0):
+        """送完佇列中的警示並停止派送器"""
+        if self.dispatcher:
+            self.dispatcher.close(timeout)
+    
+    def rearm(self, symbol: str):
+        """重新啟用單一股票的所有警示"""
+        for alert in self._alerts_by_symbol.get(symbol, ()):
+            alert['triggered'] = False
+            alert['triggered_at'] = None
+        self.rule_engine.rearm(symbol)
+    
     def reset(self):
         """重置所有警示"""
         for alert in self.alerts:
             alert['triggered'] = False
+            alert['triggered_at'] = None
+        self.rule_engine.reset()
 
 
 class IntradayMonitor:
@@ -118,6 +224,48 @@ class IntradayMonitor:
         self.monitor = PriceMonitor()
         self.running = False
     
+    def tick(self, fetcher=None) -> List[Dict]:
+        """執行一輪檢查（常駐排程器可直接定時呼叫）
+        
+        Args:
+            fetcher: FinanceDataFetcher（None 時使用共用實例）
+        
+        Returns:
+            本輪觸發的警示
+        """
+        if fetcher is None:
+            from data.finance_api import fetcher
+        
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 檢查...")
+        triggered_all = []
+        rows = []
+        
+        for symbol in self.symbols:
+            data = fetcher.get_intraday_data(symbol, interval='15m', period='1d')
+            
+            if data is None or data.empty:
+                continue
+            
+            current = data['Close'].iloc[-1]
+            prev = data['Close'].iloc[-2] if len(data) > 1 else current
+            
+            # 檢查變動
+            triggered = self.monitor.check_price(symbol, current, prev)
+            
+            for t in triggered:
+                print(f"   ⚠️ {t['message']}")
+            triggered_all.extend(triggered)
+            
+            rows.append(snapshot_row(symbol, data))
+        
+        # 表達式警示：整個快照一次計算
+        if rows and self.monitor.rule_engine.rules:
+            for t in self.monitor.check_snapshot(rows):
+                print(f"   ⚠️ {t['message']}")
+                triggered_all.append(t)
+        
+        return triggered_all
+    
     def start(self, duration_minutes: int = None):
         """開始監控
         
@@ -125,7 +273,6 @@ class IntradayMonitor:
             duration_minutes: 監控時長（分鐘），None 為無限
         """
         from data.finance_api import FinanceDataFetcher
-        import time
         
         fetcher = FinanceDataFetcher()
         self.running = True
@@ -136,26 +283,9 @@ class IntradayMonitor:
         print()
         
         start_time = datetime.now()
-        iteration = 0
         
         while self.running:
-            iteration += 1
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] 檢查...")
-            
-            for symbol in self.symbols:
-                data = fetcher.get_intraday_data(symbol, interval='15m', period='1d')
-                
-                if data is None or data.empty:
-                    continue
-                
-                current = data['Close'].iloc[-1]
-                prev = data['Close'].iloc[-2] if len(data) > 1 else current
-                
-                # 檢查變動
-                triggered = self.monitor.check_price(symbol, current, prev)
-                
-                for t in triggered:
-                    print(f"   ⚠️ {t['message']}")
+            self.tick(fetcher)
             
             # 檢查時長
             if duration_minutes:
@@ -165,12 +295,55 @@ class IntradayMonitor:
                     break
             
             time.sleep(self.interval_seconds)
+        
+        self.close()
+    
+    def close(self):
+        """關閉通知派送並印出統計"""
+        self.monitor.close()
+        if self.monitor.dispatcher:
+            stats = self.monitor.dispatcher.get_stats()
+            print(f"   通知: 已送 {stats['dispatched']} | 合併 {stats['merged']} | "
+                  f"丟棄 {stats['dropped']} | 失敗 {stats['failed']}")
     
     def stop(self):
         """停止監控"""
         self.running = False
 
 
+def snapshot_row(symbol: str, data) -> Dict:
+    """由盤中 K 線計算表達式警示可用的欄位
+    
+    Args:
+        symbol: 股票代碼
+        data: 盤中數據 (DataFrame，含 Open/High/Low/Close/Volume)
+    """
+    from analysis.technical_indicators import TechnicalIndicators
+    
+    closes = data['Close'].tolist()
+    close = closes[-1]
+    prev = closes[-2] if len(closes) > 1 else close
+    day_open = data['Open'].iloc[0]
+    
+    indicators = TechnicalIndicators()
+    ma20 = indicators.calculate_ma(closes, 20)
+    rsi14 = indicators.calculate_rsi(closes, 14)
+    
+    return {
+        'symbol': symbol,
+        'close': close,
+        'prev_close': prev,
+        'open': day_open,
+        'high': data['High'].max(),
+        'low': data['Low'].min(),
+        'volume': data['Volume'].sum(),
+        'pct_change_15m': (close - prev) / prev * 100 if prev else None,
+        'day_change_pct': (close - day_open) / day_open * 100 if day_open else None,
+        'ma20': ma20[-1] if ma20 else None,
+        'rsi14': rsi14[-1] if rsi14 else None,
+    }
+
+
 def setup_price_alerts(monitor: PriceMonitor, stocks: List[Dict]):
     """設置默認價格警示"""
     for stock in stocks:
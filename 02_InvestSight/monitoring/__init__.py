@@ -0,0 +1,14 @@
+"""
+InvestSight Monitoring Package
+"""
+from .metrics import MetricsRegistry, metrics
+from .profiling import StackSampler, add_profile_argument, run_profiled, profile_main
+
+__all__ = [
+    'MetricsRegistry',
+    'metrics',
+    'StackSampler',
+    'add_profile_argument',
+    'run_profiled',
+    'profile_main',
+]
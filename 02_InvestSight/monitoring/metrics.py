@@ -0,0 +1,254 @@
+"""
+輕量量測模塊
+計數器、直方圖與計時器（執行緒安全），可輸出 Prometheus 文字格式或 JSON；
+設定環境變數 METRICS_FILE 時，程式結束前自動寫出
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+# 指標名稱前綴
+PREFIX = 'investsight_'
+
+# 預設直方圖區間（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = [(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+class _Histogram:
+    """單一標籤組合的直方圖"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'avg': round(self.sum / self.count, 6) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+        }
+
+
+class MetricsRegistry:
+    """指標登記處"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self.started = datetime.now().isoformat()
+
+    def describe(self, name: str, text: str):
+        """設定指標說明（輸出為 Prometheus # HELP）"""
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        增加計數器
+
+        Args:
+            name: 指標名稱（如 'fetch_errors_total'）
+            value: 增加量
+            **labels: 標籤
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels):
+        """
+        記錄直方圖觀測值
+
+        Args:
+            name: 指標名稱（如 'fetch_seconds'）
+            value: 觀測值
+            buckets: 區間上界（第一次記錄時決定）
+            **labels: 標籤
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        計時（秒）並記錄到直方圖；發生例外時另外累計 <name 去掉 _seconds>_errors_total
+
+        Args:
+            name: 指標名稱（慣例以 _seconds 結尾）
+            **labels: 標籤
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(name.replace('_seconds', '') + '_errors_total', **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels):
+        """計時裝飾器（同 timer）"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def counter_value(self, name: str, **labels) -> float:
+        """讀取計數器目前的值"""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def histogram_value(self, name: str, **labels) -> Optional[Dict]:
+        """讀取直方圖摘要（count、sum、avg、min、max）"""
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+            return histogram.to_dict() if histogram else None
+
+    def snapshot(self) -> Dict:
+        """
+        目前所有指標
+
+        Returns:
+            {'started', 'timestamp', 'counters': {名稱: [{labels, value}]},
+             'histograms': {名稱: [{labels, count, sum, avg, min, max}]}}
+        """
+        with self._lock:
+            counters = {name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {name: [dict(h.to_dict(), labels=dict(key)) for key, h in series.items()]
+                          for name, series in self._histograms.items()}
+        return {'started': self.started, 'timestamp': datetime.now().isoformat(),
+                'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self) -> str:
+        """輸出 Prometheus 文字格式"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in self._counters[name].items():
+                    lines.append(f"{full}{_format_labels(key)} {value:g}")
+
+            for name in sorted(self._histograms):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, h in self._histograms[name].items():
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{full}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{full}_count{_format_labels(key)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path) -> Optional[Path]:
+        """
+        寫出指標（.json 為 JSON，其他副檔名為 Prometheus 文字格式，供 node_exporter textfile 收集）
+
+        Args:
+            path: 輸出路徑
+
+        Returns:
+            輸出路徑，失敗時 None
+        """
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.suffix == '.json':
+                content = json.dumps(self.snapshot(), indent=2, ensure_ascii=False)
+            else:
+                content = self.to_prometheus()
+            # 先寫暫存檔再取代，收集器不會讀到一半的檔案
+            tmp = path.with_name(path.name + '.tmp')
+            tmp.write_text(content, encoding='utf-8')
+            tmp.replace(path)
+            return path
+        except OSError as e:
+            print(f"✗ 寫出指標失敗：{e}")
+            return None
+
+    def reset(self):
+        """清除所有指標"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = datetime.now().isoformat()
+
+
+# 全局實例
+metrics = MetricsRegistry()
+
+metrics.describe('fetch_seconds', 'Latency of market data and news fetches')
+metrics.describe('fetch_errors_total', 'Failed market data and news fetches')
+metrics.describe('cache_requests_total', 'Cache lookups by cache and result (hit/miss)')
+metrics.describe('indicator_seconds', 'Time spent computing each technical indicator')
+metrics.describe('graph_seconds', 'Microsoft Graph call latency')
+metrics.describe('graph_errors_total', 'Failed Microsoft Graph calls')
+metrics.describe('graph_throttled_total', 'Microsoft Graph calls rejected with HTTP 429')
+metrics.describe('notify_seconds', 'Notification send latency')
+metrics.describe('notify_errors_total', 'Failed notification sends')
+metrics.describe('stage_seconds', 'Workflow stage duration')
+
+
+def _export_on_exit():
+    path = os.getenv('METRICS_FILE')
+    if path:
+        metrics.export(path)
+
+
+atexit.register(_export_on_exit)
@@ -0,0 +1,214 @@
+"""
+效能剖析掛鉤
+所有入口腳本共用 --profile 參數：
+  cprofile  以 cProfile 執行，輸出 logs/<名稱>_<時間>.pstats 並印出最耗時函數
+  sample    以背景執行緒定時取樣呼叫堆疊（低負擔，適合常駐模式與盤中監控），
+            輸出 collapsed stack 檔（可用 flamegraph.pl 或 speedscope 開啟）
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+# 預設輸出目錄（專案根目錄下的 logs/）
+PROFILE_DIR = Path(__file__).resolve().parent.parent / 'logs'
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+
+def add_profile_argument(parser):
+    """
+    為 argparse 解析器加上 --profile 參數
+
+    Args:
+        parser: argparse.ArgumentParser
+    """
+    parser.add_argument('--profile', nargs='?', const='cprofile', default=None, choices=PROFILE_MODES,
+                        help='效能剖析：cprofile（預設）或 sample（低負擔取樣，輸出火焰圖堆疊）')
+    parser.add_argument('--profile-interval', type=float, default=0.005,
+                        help='取樣間隔秒數（sample 模式）')
+
+
+def _output_path(name: str, suffix: str, output_dir: Optional[Path]) -> Path:
+    directory = Path(output_dir or PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}"
+
+
+class StackSampler:
+    """以背景執行緒定時取樣其他執行緒的呼叫堆疊"""
+
+    def __init__(self, interval: float = 0.005, all_threads: bool = True):
+        """
+        初始化
+
+        Args:
+            interval: 取樣間隔（秒）
+            all_threads: 取樣所有執行緒（否則只取樣呼叫 start() 的執行緒）
+        """
+        self.interval = interval
+        self.all_threads = all_threads
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (not self.all_threads and ident != self._target):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if self.all_threads:
+                labels.append(names.get(ident, str(ident)))
+            self.stacks[';'.join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """開始取樣"""
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止取樣"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """collapsed stack 格式（每行「框架;框架;... 次數」）"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 10):
+        """依自身取樣次數（堆疊最內層）排序的函數"""
+        leaf = Counter()
+        for stack, count in self.stacks.items():
+            leaf[stack.rsplit(';', 1)[-1]] += count
+        return leaf.most_common(limit)
+
+
+class _ThreadProfilers:
+    """
+    cProfile 只剖析呼叫 enable() 的執行緒；Python 3.12 以前為之後新建的執行緒各掛一個 Profile，
+    結束時合併（工作流的階段在執行緒池中執行）
+    """
+
+    def __init__(self):
+        self.profilers = []
+        self._lock = threading.Lock()
+
+    def _hook(self, *_):
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return
+        with self._lock:
+            self.profilers.append(profiler)
+
+    def install(self):
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._hook)
+
+    def uninstall(self):
+        threading.setprofile(None)
+
+    def merge_into(self, stats: pstats.Stats):
+        with self._lock:
+            profilers = list(self.profilers)
+        for profiler in profilers:
+            try:
+                profiler.create_stats()
+                stats.add(profiler)
+            except (TypeError, ValueError):
+                continue
+
+
+def run_profiled(func: Callable, mode: Optional[str], name: str,
+                 interval: float = 0.005, output_dir: Optional[Path] = None):
+    """
+    以指定模式剖析並執行函數（mode 為 None 時直接執行）
+
+    Args:
+        func: 要執行的函數（無參數）
+        mode: 'cprofile'、'sample' 或 None
+        name: 輸出檔名前綴（通常為腳本名稱）
+        interval: 取樣間隔秒數（sample 模式）
+        output_dir: 輸出目錄（預設 logs/）
+
+    Returns:
+        func 的回傳值
+    """
+    if not mode:
+        return func()
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        threads = _ThreadProfilers()
+        threads.install()
+        try:
+            return profiler.runcall(func)
+        finally:
+            threads.uninstall()
+            path = _output_path(name, '.pstats', output_dir)
+            buffer = io.StringIO()
+            stats = pstats.Stats(profiler, stream=buffer)
+            threads.merge_into(stats)
+            stats.dump_stats(str(path))
+            stats.sort_stats('cumulative').print_stats(15)
+            print(buffer.getvalue())
+            print(f"🔬 cProfile 結果: {path}（python -m pstats {path}）")
+
+    if mode == 'sample':
+        sampler = StackSampler(interval=interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            return func()
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - start
+            path = _output_path(name, '.collapsed', output_dir)
+            path.write_text(sampler.collapsed(), encoding='utf-8')
+            print(f"\n🔬 取樣 {sampler.samples} 次（{elapsed:.1f} 秒），最常出現的函數：")
+            for label, count in sampler.top_functions(10):
+                print(f"   {count:6}  {label}")
+            print(f"🔬 堆疊檔: {path}（flamegraph.pl {path.name} > flame.svg，或拖入 speedscope.app）")
+
+    raise ValueError(f"未知的剖析模式: {mode}")
+
+
+def profile_main(args, func: Callable, name: str):
+    """
+    依 add_profile_argument 解析出的參數執行入口函數
+
+    Args:
+        args: argparse 結果（需含 profile 與 profile_interval）
+        func: 入口函數（無參數）
+        name: 輸出檔名前綴
+    """
+    return run_profiled(func, getattr(args, 'profile', None), name,
+                        getattr(args, 'profile_interval', 0.005))
@@ -11,6 +11,8 @@ from typing import Optional, Dict, List
 from datetime import datetime
 from dotenv import load_dotenv
 
+from monitoring.metrics import metrics
+
 load_dotenv()
 
 
@@ -134,10 +136,11 @@ class SMTPEmailSender:
             else:
                 msg.attach(MIMEText(body, 'plain', 'utf-8'))
             
-            with smtplib.SMTP(self.config.smtp_host, self.config.smtp_port) as server:
-                server.starttls()
-                server.login(self.config.smtp_user, self.config.smtp_password)
-                server.send_message(msg)
+            with metrics.timer('notify_seconds', channel='smtp'):
+                with smtplib.SMTP(self.config.smtp_host, self.config.smtp_port) as server:
+                    server.starttls()
+                    server.login(self.config.smtp_user, self.config.smtp_password)
+                    server.send_message(msg)
             
             print(f"✓ SMTP 郵件已發送到: {to}")
             return True
@@ -162,7 +165,11 @@ class GraphEmailSender:
             self.graph_client.authenticate(use_cache=True)
         
         try:
-            return await self.graph_client.send_email(subject, body, to)
+            with metrics.timer('notify_seconds', channel='graph_mail'):
+                sent = await self.graph_client.send_email(subject, body, to)
+            if not sent:
+                metrics.inc('notify_errors_total', channel='graph_mail')
+            return sent
         except Exception as e:
             print(f"✗ Graph API 發送失敗: {e}")
             return False
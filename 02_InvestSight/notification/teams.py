@@ -9,6 +9,8 @@ from typing import Optional, List, Dict
 from datetime import datetime
 from dotenv import load_dotenv
 
+from monitoring.metrics import metrics
+
 load_dotenv()
 
 
@@ -17,6 +19,8 @@ class TeamsWebhookSender:
     
     def __init__(self, webhook_url: str = None):
         self.webhook_url = webhook_url or os.getenv('TEAMS_WEBHOOK_URL', '')
+        # 重複使用連線（常駐模式下避免每次重新握手）
+        self.session = requests.Session()
     
     @property
     def is_configured(self) -> bool:
@@ -104,17 +108,22 @@ class TeamsWebhookSender:
     def _send_payload(self, payload: dict) -> bool:
         """發送 payload"""
         try:
-            response = requests.post(
-                self.webhook_url,
-                data=json.dumps(payload),
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
+            from storage.throttling import call_with_retry
+            
+            # 429/503 依 Retry-After 等待後重送，不直接丟棄訊息
+            with metrics.timer('notify_seconds', channel='teams_webhook'):
+                response = call_with_retry(lambda: self.session.post(
+                    self.webhook_url,
+                    data=json.dumps(payload),
+                    headers={'Content-Type': 'application/json'},
+                    timeout=10
+                ), 'teams')
             
             if response.status_code == 200:
                 print(f"✓ Teams 訊息已發送")
                 return True
             else:
+                metrics.inc('notify_errors_total', channel='teams_webhook')
                 print(f"✗ Teams 發送失敗: {response.status_code}")
                 return False
                 
@@ -190,6 +199,7 @@ class TeamsGraphSender:
         
         try:
             from msgraph.generated.models.chat_message import ChatMessage
+            from storage.throttling import acall_with_retry
             from msgraph.generated.models.item_body import ItemBody
             from msgraph.generated.models.body_type import BodyType
             
@@ -198,9 +208,10 @@ class TeamsGraphSender:
             chat_message.body.content_type = BodyType.Html
             chat_message.body.content = message
             
-            await self.graph_client.teams.by_team_id(team_id).channels.by_channel_id(
-                channel_id
-            ).messages.post(chat_message)
+            with metrics.timer('notify_seconds', channel='teams_graph'):
+                await acall_with_retry(lambda: self.graph_client.teams.by_team_id(team_id).channels.by_channel_id(
+                    channel_id
+                ).messages.post(chat_message), 'teams')
             
             print(f"✓ Teams 訊息已發送到頻道")
             return True
@@ -215,6 +226,7 @@ class TeamsGraphSender:
         
         try:
             from msgraph.generated.models.chat_message import ChatMessage
+            from storage.throttling import acall_with_retry
             from msgraph.generated.models.item_body import ItemBody
             from msgraph.generated.models.body_type import BodyType
             
@@ -223,7 +235,9 @@ class TeamsGraphSender:
             chat_message.body.content_type = BodyType.Text
             chat_message.body.content = message
             
-            await self.graph_client.chats.by_chat_id(chat_id).messages.post(chat_message)
+            with metrics.timer('notify_seconds', channel='teams_graph'):
+                await acall_with_retry(
+                    lambda: self.graph_client.chats.by_chat_id(chat_id).messages.post(chat_message), 'teams')
             
             print(f"✓ Teams 訊息已發送到聊天")
             return True
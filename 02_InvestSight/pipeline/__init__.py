@@ -0,0 +1,22 @@
+"""
+InvestSight Pipeline Package
+"""
+from .dag import Stage, DAGExecutor
+from .checkpoint import CheckpointStore, content_hash
+from .scheduler import Scheduler, Job, Interval, TimeOfDay
+from .run_record import read_record, write_record, list_records, latest_record
+
+__all__ = [
+    'Stage',
+    'DAGExecutor',
+    'CheckpointStore',
+    'content_hash',
+    'Scheduler',
+    'Job',
+    'Interval',
+    'TimeOfDay',
+    'read_record',
+    'write_record',
+    'list_records',
+    'latest_record',
+]
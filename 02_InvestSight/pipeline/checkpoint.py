@@ -0,0 +1,143 @@
+"""
+工作流階段檢查點
+階段輸出以內容雜湊保存；階段鍵由名稱、參數與依賴輸出的雜湊組成，
+輸入未變的階段可直接取回上次的輸出
+"""
+import hashlib
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# 預設檢查點位置
+CHECKPOINT_DIR = Path('data/logs/checkpoints')
+
+
+def content_hash(value: Any) -> str:
+    """
+    計算可 JSON 序列化值的內容雜湊
+
+    Args:
+        value: 任意值（鍵排序後序列化，無法序列化的物件以 str 表示）
+
+    Returns:
+        SHA-256 十六進位字串
+    """
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CheckpointStore:
+    """內容定址的階段輸出存放區"""
+
+    def __init__(self, root: Optional[Path] = None):
+        """
+        初始化
+
+        Args:
+            root: 存放目錄（預設 data/logs/checkpoints）
+        """
+        self.root = Path(root or CHECKPOINT_DIR)
+        self.objects_dir = self.root / 'objects'
+        self.stages_dir = self.root / 'stages'
+
+    def stage_key(self, name: str, params: Optional[Dict] = None,
+                  input_hashes: Optional[Dict[str, Optional[str]]] = None) -> str:
+        """
+        計算階段鍵
+
+        Args:
+            name: 階段名稱
+            params: 影響輸出的參數（如日期、收件人）
+            input_hashes: 依賴階段名稱 → 輸出雜湊
+
+        Returns:
+            階段鍵
+        """
+        return content_hash({'stage': name, 'params': params or {}, 'inputs': input_hashes or {}})
+
+    def load(self, key: str) -> Optional[Dict]:
+        """
+        取回階段輸出
+
+        Args:
+            key: 階段鍵
+
+        Returns:
+            {'output': 輸出, 'hash': 輸出雜湊, 'created': 時間}，不存在時 None
+        """
+        try:
+            with open(self.stages_dir / f"{key}.json", encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(self.objects_dir / f"{entry['hash']}.json", encoding='utf-8') as f:
+                entry['output'] = json.load(f)
+            return entry
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, key: str, name: str, output: Any) -> Optional[str]:
+        """
+        保存階段輸出（相同內容只存一份）
+
+        Args:
+            key: 階段鍵
+            name: 階段名稱
+            output: 輸出（需可 JSON 序列化）
+
+        Returns:
+            輸出雜湊，失敗時 None
+        """
+        try:
+            payload = json.dumps(output, sort_keys=True, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            print(f"⚠ 階段 {name} 的輸出無法保存為檢查點：{e}")
+            return None
+
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        try:
+            self.objects_dir.mkdir(parents=True, exist_ok=True)
+            self.stages_dir.mkdir(parents=True, exist_ok=True)
+            obj_path = self.objects_dir / f"{digest}.json"
+            if not obj_path.exists():
+                tmp = obj_path.with_suffix('.tmp')
+                tmp.write_text(payload, encoding='utf-8')
+                tmp.replace(obj_path)
+            entry = {'stage': name, 'hash': digest, 'created': datetime.now().isoformat()}
+            (self.stages_dir / f"{key}.json").write_text(json.dumps(entry), encoding='utf-8')
+        except OSError as e:
+            print(f"⚠ 寫入檢查點失敗：{e}")
+            return None
+        return digest
+
+    def prune(self, max_age_days: float = 7) -> int:
+        """
+        刪除過期的階段記錄及不再被引用的輸出
+
+        Args:
+            max_age_days: 保留天數
+
+        Returns:
+            刪除的檔案數
+        """
+        if not self.stages_dir.exists():
+            return 0
+
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        referenced = set()
+        for path in self.stages_dir.glob('*.json'):
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+                continue
+            try:
+                referenced.add(json.loads(path.read_text(encoding='utf-8'))['hash'])
+            except (OSError, ValueError, KeyError):
+                continue
+
+        for path in self.objects_dir.glob('*.json'):
+            if path.stem not in referenced:
+                path.unlink()
+                removed += 1
+        return removed
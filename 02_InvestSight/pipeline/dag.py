@@ -0,0 +1,213 @@
+"""
+工作流 DAG 執行器
+各階段宣告依賴關係，依賴完成後即以執行緒池並行執行，
+並記錄每個階段的狀態與耗時；可搭配 CheckpointStore 跳過輸入未變的階段
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from monitoring.metrics import metrics
+
+from .checkpoint import CheckpointStore, content_hash
+
+
+class Stage:
+    """工作流階段"""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any],
+                 deps: Sequence[str] = (), skip_on_failure: bool = False,
+                 params: Optional[Dict] = None):
+        """
+        初始化
+
+        Args:
+            name: 階段名稱
+            func: 執行函數，參數為依賴階段的輸出（名稱 → 輸出）
+            deps: 依賴的階段名稱
+            skip_on_failure: 任一依賴失敗或被略過時略過此階段
+            params: 影響輸出的參數（計入檢查點鍵）
+        """
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.skip_on_failure = skip_on_failure
+        self.params = params or {}
+
+
+class DAGExecutor:
+    """以執行緒池執行階段 DAG"""
+
+    def __init__(self, max_workers: int = 4, checkpoints: Optional[CheckpointStore] = None,
+                 resume: bool = False):
+        """
+        初始化
+
+        Args:
+            max_workers: 同時執行的階段數上限
+            checkpoints: 檢查點存放區（None 為不保存）
+            resume: 是否取回輸入未變的階段輸出而不重新執行
+        """
+        self.max_workers = max_workers
+        self.checkpoints = checkpoints
+        self.resume = resume
+        self.stages: Dict[str, Stage] = {}
+        self.outputs: Dict[str, Any] = {}
+        self.hashes: Dict[str, Optional[str]] = {}
+        self.records: Dict[str, Dict] = {}
+        self.wall_ms = 0.0
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Any],
+            deps: Sequence[str] = (), skip_on_failure: bool = False,
+            params: Optional[Dict] = None) -> 'DAGExecutor':
+        """
+        新增階段
+
+        Args:
+            name: 階段名稱
+            func: 執行函數，參數為依賴階段的輸出
+            deps: 依賴的階段名稱
+            skip_on_failure: 依賴失敗時略過
+            params: 影響輸出的參數（計入檢查點鍵）
+
+        Returns:
+            self（可串接）
+        """
+        if name in self.stages:
+            raise ValueError(f"重複的階段名稱: {name}")
+        self.stages[name] = Stage(name, func, deps, skip_on_failure, params)
+        return self
+
+    def order(self) -> List[str]:
+        """
+        拓撲排序（同層維持新增順序）
+
+        Returns:
+            階段名稱列表
+
+        Raises:
+            ValueError: 依賴不存在或有循環
+        """
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"階段 {stage.name} 依賴不存在的階段: {dep}")
+
+        ordered = []
+        done = set()
+        remaining = list(self.stages)
+        while remaining:
+            ready = [name for name in remaining if all(d in done for d in self.stages[name].deps)]
+            if not ready:
+                raise ValueError(f"階段依賴有循環: {', '.join(remaining)}")
+            ordered += ready
+            done.update(ready)
+            remaining = [name for name in remaining if name not in done]
+        return ordered
+
+    def _run_stage(self, stage: Stage, inputs: Dict[str, Any]) -> Dict:
+        started = datetime.now()
+        start = time.perf_counter()
+        record = {'name': stage.name, 'deps': stage.deps, 'started': started.isoformat()}
+        key = None
+        if self.checkpoints is not None:
+            key = self.checkpoints.stage_key(stage.name, stage.params,
+                                             {dep: self.hashes.get(dep) for dep in stage.deps})
+            cached = self.checkpoints.load(key) if self.resume else None
+            if cached is not None:
+                self.outputs[stage.name] = cached['output']
+                self.hashes[stage.name] = cached['hash']
+                record.update({'status': 'cached', 'checkpoint': cached['created'],
+                               'duration_ms': round((time.perf_counter() - start) * 1000, 1)})
+                return record
+
+        try:
+            output = stage.func(inputs)
+            record['status'] = 'success'
+        except Exception as e:
+            print(f"   ❌ {stage.name} 失敗: {e}")
+            output = None
+            record['status'] = 'failed'
+            record['error'] = str(e)
+        elapsed = time.perf_counter() - start
+        record['duration_ms'] = round(elapsed * 1000, 1)
+        metrics.observe('stage_seconds', elapsed, stage=stage.name, status=record['status'])
+
+        self.outputs[stage.name] = output
+        self.hashes[stage.name] = None
+        if record['status'] == 'success':
+            # 只保存成功的輸出；失敗的階段下次必定重跑
+            digest = self.checkpoints.save(key, stage.name, output) if key else None
+            self.hashes[stage.name] = digest or content_hash(output)
+        return record
+
+    def _skip(self, stage: Stage) -> Dict:
+        self.outputs[stage.name] = None
+        self.hashes[stage.name] = None
+        return {'name': stage.name, 'deps': stage.deps, 'started': None,
+                'status': 'skipped', 'duration_ms': 0.0}
+
+    def run(self) -> Dict[str, Any]:
+        """
+        執行所有階段（依賴完成即提交）
+
+        Returns:
+            階段名稱 → 輸出（失敗或略過為 None）
+        """
+        order = self.order()
+        self.outputs = {}
+        self.hashes = {}
+        self.records = {}
+        start = time.perf_counter()
+
+        pending = list(order)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if not all(dep in self.records for dep in stage.deps):
+                        continue
+                    pending.remove(name)
+                    if stage.skip_on_failure and any(
+                            self.records[dep]['status'] not in ('success', 'cached')
+                            for dep in stage.deps):
+                        self.records[name] = self._skip(stage)
+                        continue
+                    inputs = {dep: self.outputs[dep] for dep in stage.deps}
+                    running[pool.submit(self._run_stage, stage, inputs)] = name
+
+                if not running:
+                    # 剛略過的階段可能讓後續階段就緒
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self.records[running.pop(future)] = future.result()
+
+        self.wall_ms = round((time.perf_counter() - start) * 1000, 1)
+        return self.outputs
+
+    def critical_path_ms(self) -> float:
+        """依記錄的耗時計算最長依賴路徑（理想的總耗時下限）"""
+        finish = {}
+        for name in self.order():
+            stage = self.stages[name]
+            own = self.records.get(name, {}).get('duration_ms', 0.0)
+            finish[name] = max((finish[d] for d in stage.deps), default=0.0) + own
+        return round(max(finish.values(), default=0.0), 1)
+
+    def summary(self) -> Dict:
+        """
+        執行摘要（可寫入結果 JSON）
+
+        Returns:
+            各階段記錄（依執行順序）、總耗時、階段耗時合計與關鍵路徑
+        """
+        stages = [self.records[name] for name in self.order() if name in self.records]
+        return {
+            'stages': stages,
+            'wall_ms': self.wall_ms,
+            'serial_ms': round(sum(r['duration_ms'] for r in stages), 1),
+            'critical_path_ms': self.critical_path_ms(),
+        }
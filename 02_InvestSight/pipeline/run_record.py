@@ -0,0 +1,240 @@
+"""
+工作流執行記錄格式
+取代縮排 JSON：標頭（魔數、結構版本、編碼）+ zlib 壓縮內容；
+有 msgpack 時以 msgpack 編碼，否則退回緊湊 JSON。
+同欄位的字典列表（股票、新聞）以欄式儲存，並可只保存與上一筆記錄的差異
+"""
+import json
+import struct
+import zlib
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# 檔案標頭：魔數 + 結構版本 + 編碼
+MAGIC = b'ISRR'
+SCHEMA_VERSION = 1
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+_HEADER = struct.Struct('<4sBB')
+
+# 副檔名
+RECORD_SUFFIX = '.isr'
+
+# 差異鏈的最大長度（超過則寫入完整記錄，讀取時不必回溯太多檔案）
+MAX_DELTA_CHAIN = 10
+
+# 差異與欄式標記
+_SAME = '__same__'
+_ROWS = '__rows__'
+_TABLE = '__table__'
+
+
+def _plain(value: Any) -> Any:
+    """轉換為可序列化的基本型別（其他物件以 str 表示，同 json default=str）"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        # NumPy 純量
+        return value.item()
+    return str(value)
+
+
+def _to_columns(value: Any) -> Any:
+    """欄位相同的字典列表轉為欄式表格"""
+    if isinstance(value, dict):
+        return {k: _to_columns(v) for k, v in value.items()}
+    if isinstance(value, list):
+        if len(value) > 1 and all(isinstance(row, dict) for row in value):
+            keys = list(value[0])
+            if keys and all(len(row) == len(keys) and all(k in row for k in keys) for row in value):
+                return {_TABLE: keys,
+                        'columns': [_to_columns([row[k] for row in value]) for k in keys]}
+        return [_to_columns(v) for v in value]
+    return value
+
+
+def _from_columns(value: Any) -> Any:
+    """欄式表格還原為字典列表"""
+    if isinstance(value, dict):
+        if _TABLE in value:
+            keys = value[_TABLE]
+            columns = [_from_columns(c) for c in value['columns']]
+            return [dict(zip(keys, row)) for row in zip(*columns)]
+        return {k: _from_columns(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_columns(v) for v in value]
+    return value
+
+
+def _row_key(row: Any) -> str:
+    return json.dumps(row, sort_keys=True, ensure_ascii=False)
+
+
+def _delta(new: Any, base: Any) -> Any:
+    """
+    計算與上一筆記錄的差異
+
+    未變的子樹以標記取代；字典列表中與上一筆相同的列以索引引用
+    """
+    if new == base:
+        return {_SAME: 1}
+    if isinstance(new, dict) and isinstance(base, dict):
+        return {k: _delta(v, base[k]) if k in base else v for k, v in new.items()}
+    if (isinstance(new, list) and isinstance(base, list) and new
+            and all(isinstance(row, dict) for row in new)):
+        index = {}
+        for i, row in enumerate(base):
+            index.setdefault(_row_key(row), i)
+        rows = [index.get(_row_key(row), row) for row in new]
+        if any(isinstance(r, int) for r in rows):
+            return {_ROWS: rows}
+    return new
+
+
+def _apply_delta(delta: Any, base: Any) -> Any:
+    """將差異套用到上一筆記錄"""
+    if isinstance(delta, dict):
+        if len(delta) == 1 and delta.get(_SAME) == 1:
+            return base
+        if len(delta) == 1 and _ROWS in delta:
+            return [base[r] if isinstance(r, int) else r for r in delta[_ROWS]]
+        base = base if isinstance(base, dict) else {}
+        return {k: _apply_delta(v, base.get(k)) for k, v in delta.items()}
+    return delta
+
+
+def _encode(envelope: Dict, codec: int) -> bytes:
+    if codec == CODEC_MSGPACK:
+        return msgpack.packb(envelope, use_bin_type=True)
+    return json.dumps(envelope, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decode(payload: bytes, codec: int) -> Dict:
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ValueError("此記錄以 msgpack 編碼，請先安裝 msgpack")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    return json.loads(payload.decode('utf-8'))
+
+
+def _read_envelope(path: Path) -> Dict:
+    """讀取並解碼檔案（不套用差異）"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if len(raw) < _HEADER.size:
+        raise ValueError(f"不是執行記錄檔案: {path}")
+    magic, version, codec = _HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise ValueError(f"不是執行記錄檔案: {path}")
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"不支援的記錄版本 {version}（目前支援 {SCHEMA_VERSION}）")
+    return _decode(zlib.decompress(raw[_HEADER.size:]), codec)
+
+
+def read_record(path, with_meta: bool = False) -> Dict:
+    """
+    讀取執行記錄（差異記錄會沿鏈回溯上一筆並還原完整內容）
+
+    Args:
+        path: 記錄檔案路徑
+        with_meta: 是否連同中繼資料一起回傳
+
+    Returns:
+        結果字典；with_meta=True 時為 {'type', 'created', 'schema', 'base', 'depth', 'data'}
+
+    Raises:
+        ValueError: 檔案格式錯誤或版本不支援
+    """
+    path = Path(path)
+    envelope = _read_envelope(path)
+    data = _from_columns(envelope['data'])
+    if envelope.get('base'):
+        base = read_record(path.parent / envelope['base'])
+        data = _apply_delta(data, base)
+    if with_meta:
+        return dict(envelope, data=data)
+    return data
+
+
+def write_record(path, results: Dict, record_type: str = 'daily',
+                 base_path=None, codec: Optional[int] = None) -> Path:
+    """
+    寫入執行記錄
+
+    Args:
+        path: 輸出路徑
+        results: 工作流結果
+        record_type: 記錄類型（daily、weekly 等）
+        base_path: 上一筆記錄；提供時只保存差異（同一目錄，差異鏈過長時改寫完整記錄）
+        codec: CODEC_MSGPACK 或 CODEC_JSON（None 時有 msgpack 則使用）
+
+    Returns:
+        輸出路徑
+    """
+    path = Path(path)
+    if codec is None:
+        codec = CODEC_MSGPACK if msgpack is not None else CODEC_JSON
+    if codec == CODEC_MSGPACK and msgpack is None:
+        raise ValueError("msgpack 未安裝")
+
+    data = _plain(results)
+    base_name = None
+    depth = 0
+    if base_path is not None:
+        try:
+            base = read_record(base_path, with_meta=True)
+            if base.get('depth', 0) < MAX_DELTA_CHAIN:
+                data = _delta(data, base['data'])
+                base_name = Path(base_path).name
+                depth = base.get('depth', 0) + 1
+        except (OSError, ValueError) as e:
+            print(f"⚠ 無法讀取上一筆記錄，改寫完整記錄：{e}")
+
+    envelope = {
+        'schema': SCHEMA_VERSION,
+        'type': record_type,
+        'created': datetime.now().isoformat(),
+        'base': base_name,
+        'depth': depth,
+        'data': _to_columns(data),
+    }
+    payload = zlib.compress(_encode(envelope, codec), 6)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, SCHEMA_VERSION, codec))
+        f.write(payload)
+    return path
+
+
+def list_records(directory, record_type: Optional[str] = None) -> List[Path]:
+    """
+    列出目錄中的執行記錄（依檔名排序，即依時間）
+
+    Args:
+        directory: 目錄
+        record_type: 只列出此類型（檔名前綴）
+
+    Returns:
+        路徑列表
+    """
+    pattern = f"{record_type}_*{RECORD_SUFFIX}" if record_type else f"*{RECORD_SUFFIX}"
+    return sorted(Path(directory).glob(pattern))
+
+
+def latest_record(directory, record_type: Optional[str] = None) -> Optional[Path]:
+    """最新的執行記錄，沒有時為 None"""
+    records = list_records(directory, record_type)
+    return records[-1] if records else None
@@ -0,0 +1,249 @@
+"""
+常駐排程器
+在同一進程內定時執行工作（每日、每週、盤中監控、警報），
+模組、緩存、HTTP 連線與憑證在各次執行之間保持載入，並記錄每個工作的耗時統計
+"""
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+class Interval:
+    """固定間隔排程"""
+
+    def __init__(self, seconds: float, weekdays: Optional[Sequence[int]] = None,
+                 between: Optional[Sequence[str]] = None):
+        """
+        初始化
+
+        Args:
+            seconds: 間隔秒數
+            weekdays: 允許執行的星期（0 為週一，None 為每天）
+            between: 允許執行的時段 ('HH:MM', 'HH:MM')，None 為全天
+        """
+        self.seconds = seconds
+        self.weekdays = set(weekdays) if weekdays is not None else None
+        self.between = tuple(_parse_time(t) for t in between) if between else None
+
+    def _allowed(self, when: datetime) -> bool:
+        if self.weekdays is not None and when.weekday() not in self.weekdays:
+            return False
+        if self.between:
+            start, end = self.between
+            return start <= (when.hour, when.minute) < end
+        return True
+
+    def next_run(self, after: datetime) -> datetime:
+        """
+        計算下次執行時間
+
+        Args:
+            after: 上次執行（或排程開始）時間
+
+        Returns:
+            下次執行時間
+        """
+        candidate = after + timedelta(seconds=self.seconds)
+        if self._allowed(candidate):
+            return candidate
+
+        # 跳到下一個允許時段的開頭
+        start = self.between[0] if self.between else (0, 0)
+        day = candidate.replace(hour=start[0], minute=start[1], second=0, microsecond=0)
+        if day <= candidate:
+            day += timedelta(days=1)
+        for _ in range(8):
+            if self._allowed(day):
+                return day
+            day += timedelta(days=1)
+        return day
+
+    def __repr__(self):
+        return f"every {self.seconds:g}s"
+
+
+class TimeOfDay:
+    """每日定時排程"""
+
+    def __init__(self, at: str, weekdays: Optional[Sequence[int]] = None):
+        """
+        初始化
+
+        Args:
+            at: 執行時間 'HH:MM'
+            weekdays: 執行的星期（0 為週一，None 為每天）
+        """
+        self.at = _parse_time(at)
+        self.weekdays = set(weekdays) if weekdays is not None else None
+
+    def next_run(self, after: datetime) -> datetime:
+        """
+        計算下次執行時間
+
+        Args:
+            after: 上次執行（或排程開始）時間
+
+        Returns:
+            下次執行時間
+        """
+        candidate = after.replace(hour=self.at[0], minute=self.at[1], second=0, microsecond=0)
+        if candidate <= after:
+            candidate += timedelta(days=1)
+        while self.weekdays is not None and candidate.weekday() not in self.weekdays:
+            candidate += timedelta(days=1)
+        return candidate
+
+    def __repr__(self):
+        return f"at {self.at[0]:02d}:{self.at[1]:02d}"
+
+
+def _parse_time(value: str):
+    hour, minute = value.split(':')
+    return int(hour), int(minute)
+
+
+class Job:
+    """排程工作與統計"""
+
+    def __init__(self, name: str, func: Callable[[], object], schedule):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.next_run: Optional[datetime] = None
+        self.runs = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = None
+        self.last_run = None
+        self.last_error = None
+
+    def stats(self) -> Dict:
+        """工作統計"""
+        return {
+            'schedule': repr(self.schedule),
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_run': self.last_run,
+            'next_run': self.next_run.isoformat() if self.next_run else None,
+            'last_ms': self.last_ms,
+            'avg_ms': round(self.total_ms / self.runs, 1) if self.runs else None,
+            'max_ms': self.max_ms if self.runs else None,
+            'last_error': self.last_error,
+        }
+
+
+class Scheduler:
+    """單執行緒排程器（同時只執行一個工作，避免工作互相重疊）"""
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        """
+        初始化
+
+        Args:
+            clock: 取得當前時間的函數（測試時可替換）
+        """
+        self.clock = clock
+        self.jobs: Dict[str, Job] = {}
+        self._queue: List = []
+        self._counter = 0
+        self._stop = threading.Event()
+        self.on_job_done: Optional[Callable[[Job], None]] = None
+
+    def add(self, name: str, func: Callable[[], object], schedule,
+            run_now: bool = False) -> Job:
+        """
+        新增工作
+
+        Args:
+            name: 工作名稱
+            func: 執行函數（無參數）
+            schedule: Interval 或 TimeOfDay
+            run_now: 是否在啟動後立即執行一次
+
+        Returns:
+            Job
+        """
+        if name in self.jobs:
+            raise ValueError(f"重複的工作名稱: {name}")
+        job = Job(name, func, schedule)
+        now = self.clock()
+        job.next_run = now if run_now else schedule.next_run(now)
+        self.jobs[name] = job
+        self._push(job)
+        return job
+
+    def _push(self, job: Job):
+        self._counter += 1
+        heapq.heappush(self._queue, (job.next_run, self._counter, job.name))
+
+    def run_job(self, job: Job):
+        """執行工作並更新統計（例外不會中斷排程器）"""
+        start = time.perf_counter()
+        job.last_run = self.clock().isoformat()
+        try:
+            job.func()
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            print(f"❌ 工作 {job.name} 失敗: {e}")
+        elapsed = round((time.perf_counter() - start) * 1000, 1)
+        job.runs += 1
+        job.total_ms += elapsed
+        job.max_ms = max(job.max_ms, elapsed)
+        job.last_ms = elapsed
+        if self.on_job_done:
+            self.on_job_done(job)
+
+    def run_pending(self) -> List[str]:
+        """
+        執行所有已到期的工作
+
+        Returns:
+            本次執行的工作名稱
+        """
+        ran = []
+        while self._queue and self._queue[0][0] <= self.clock():
+            _, _, name = heapq.heappop(self._queue)
+            job = self.jobs[name]
+            self.run_job(job)
+            ran.append(name)
+            # 以完成時間計算下一次，長時間工作不會連續補跑
+            job.next_run = job.schedule.next_run(self.clock())
+            self._push(job)
+        return ran
+
+    def seconds_until_next(self) -> Optional[float]:
+        """距離下一個工作的秒數"""
+        if not self._queue:
+            return None
+        return max((self._queue[0][0] - self.clock()).total_seconds(), 0.0)
+
+    def run_forever(self, max_sleep: float = 60.0):
+        """
+        持續執行直到 stop()
+
+        Args:
+            max_sleep: 單次等待上限（秒），讓系統時間變動也能及時反應
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            self.run_pending()
+            wait = self.seconds_until_next()
+            self._stop.wait(min(wait, max_sleep) if wait is not None else max_sleep)
+
+    def stop(self):
+        """停止 run_forever"""
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        所有工作的統計
+
+        Returns:
+            工作名稱 → 統計
+        """
+        return {name: job.stats() for name, job in self.jobs.items()}
@@ -4,6 +4,8 @@
 整合技術指標、情感分析和投資建議
 """
 import sys
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 # 添加項目根目錄到路徑
@@ -11,80 +13,102 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from data.finance_api import fetcher as finance_fetcher
 from data.news_api import fetcher as news_fetcher
+from data.historical_data import prefetch_history, prefetch_info
 from analysis.sentiment import analyzer as sentiment_analyzer
+from analysis.entity_index import EntityIndex
 from analysis.technical_indicators import analyze_stock
 from analysis.investment_advisor import get_investment_advice
 
 
-def main():
+@contextmanager
+def stage(timings: dict, name: str):
+    """記錄階段耗時"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def main(symbols: list = None, period: str = '6mo'):
+    """
+    分析觀察清單中的所有股票
+    
+    Args:
+        symbols: 股票代碼（預設為追蹤清單）
+        period: 歷史數據範圍
+    """
+    symbols = symbols or finance_fetcher.stocks
+    timings = {}
+    
     print("=" * 70)
     print("  💡 InvestSight 進階投資分析")
     print("=" * 70)
     print()
     
-    # 1. 抓取股價數據
-    print("📊 步驟 1: 抓取股價數據...")
-    stocks = finance_fetcher.fetch_all_stocks()
+    # 1. 批量預取歷史數據（一次下載，已緩存的股票直接讀取）
+    print("📊 步驟 1: 抓取歷史股價...")
+    with stage(timings, '歷史數據'):
+        history = prefetch_history(symbols, period)
     
-    if not stocks:
+    if not history:
         print("  ✗ 無法獲取股價數據")
         return
     
-    print(f"  ✓ 成功抓取 {len(stocks)} 支股票")
+    print(f"  ✓ 成功取得 {len(history)}/{len(symbols)} 支股票")
     print()
     
     # 2. 抓取新聞
     print("📰 步驟 2: 抓取新聞...")
-    articles = news_fetcher.fetch_all()
-    print(f"  ✓ 成功抓取 {len(articles)} 篇新聞")
+    with stage(timings, '新聞與情感'):
+        articles = news_fetcher.fetch_all()
+        print(f"  ✓ 成功抓取 {len(articles)} 篇新聞")
+        
+        # 建立個股新聞索引（代碼 + 公司名稱），整批分析情感
+        entity_index = EntityIndex()
+        infos = prefetch_info(list(history))
+        entity_index.add_symbols([infos.get(symbol) or {'symbol': symbol} for symbol in history])
+        sentiment_analyzer.analyze_articles(articles)
+        entity_index.index(articles)
+        stock_sentiments = entity_index.aggregate_all()
+    print(f"  ✓ {len(stock_sentiments)} 支股票有相關新聞")
     print()
     
-    # 3. 分析每支股票
+    # 3. 技術指標與投資建議
     print("📈 步驟 3: 分析股票...")
     print()
     
-    for stock in stocks[:3]:  # 只分析前 3 支
-        symbol = stock['symbol']
-        current_price = stock.get('price')
-        
-        if not current_price:
-            continue
-        
+    reports = []
+    with stage(timings, '指標與建議'):
+        for symbol, data in history.items():
+            prices = data['prices']
+            indicators = analyze_stock(symbol, prices)
+            advice = get_investment_advice(
+                symbol=symbol,
+                indicators=indicators,
+                sentiment=stock_sentiments.get(symbol),
+                price=prices[-1]
+            )
+            prev_close = prices[-2] if len(prices) > 1 else prices[-1]
+            advice['change_percent'] = (prices[-1] / prev_close - 1) * 100 if prev_close else 0
+            reports.append(advice)
+    
+    reports.sort(key=lambda r: r['final_score'], reverse=True)
+    
+    for advice in reports:
+        symbol = advice['symbol']
         print("-" * 60)
-        print(f"  {symbol} - ${current_price:.2f} ({stock.get('change_percent', 0):+.2f}%)")
+        print(f"  {symbol} - ${advice['current_price']:.2f} ({advice['change_percent']:+.2f}%)")
         print("-" * 60)
         
-        # 生成模擬價格數據（實際應用應該從歷史數據獲取）
-        import random
-        base_price = current_price * 0.95
-        prices = [base_price + random.uniform(-5, 5) for _ in range(60)]
-        prices[-1] = current_price  # 最後一個價格設為當前價格
-        
-        # 技術指標分析
-        indicators = analyze_stock(symbol, prices)
-        
-        # 尋找相關新聞並分析情感
-        stock_sentiment = None
-        for article in articles[:5]:
-            if symbol.lower() in article['title'].lower():
-                stock_sentiment = sentiment_analyzer.analyze_text(article['title'])
-                break
-        
-        # 生成投資建議
-        advice = get_investment_advice(
-            symbol=symbol,
-            indicators=indicators,
-            sentiment=stock_sentiment,
-            price=current_price
-        )
-        
         # 顯示結果
         print(f"  技術評分：{advice['technical_analysis']['score']}")
         print(f"  技術建議：{advice['technical_analysis']['recommendation']}")
         
         if advice['sentiment_analysis']:
             print(f"  新聞情感：{advice['sentiment_analysis']['sentiment']} "
-                  f"({advice['sentiment_analysis']['impact']:+.1f})")
+                  f"({advice['sentiment_analysis']['impact']:+.1f}，"
+                  f"{advice['sentiment_analysis'].get('article_count', 1)} 篇)")
         
         print(f"  最終建議：{advice['recommendation']}")
         print(f"  信心度：{advice['confidence']}%")
@@ -97,6 +121,11 @@ def main():
         
         print()
     
+    print("⏱️  各階段耗時：")
+    for name, seconds in timings.items():
+        print(f"   {name:10} {seconds:7.2f} 秒")
+    print()
+    
     print("=" * 70)
     print("  ✅ 分析完成！")
     print("=" * 70)
@@ -105,7 +134,23 @@ def main():
     print("   本分析僅供參考，不構成投資建議。")
     print("   投資有風險，入市需謹慎。")
     print()
+    
+    return reports
+
+
+def cli():
+    """命令列入口"""
+    import argparse
+    from monitoring.profiling import add_profile_argument, profile_main
+    
+    parser = argparse.ArgumentParser(description='InvestSight 進階投資分析')
+    parser.add_argument('--symbols', '-s', nargs='*', help='股票代碼（預設為追蹤清單）')
+    parser.add_argument('--period', '-p', type=str, default='6mo', help='歷史數據範圍')
+    add_profile_argument(parser)
+    
+    args = parser.parse_args()
+    profile_main(args, lambda: main(args.symbols, args.period), 'analyze_stocks')
 
 
 if __name__ == '__main__':
-    main()
+    cli()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+InvestSight 訊號回測
+以整段歷史驗證 InvestmentAdvisor 的評分門檻與權重
+"""
+import sys
+import os
+from pathlib import Path
+
+project_root = str(Path(__file__).resolve().parent.parent)
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import json
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from analysis.backtest import Backtester, closes_frame
+from analysis.investment_advisor import InvestmentAdvisor
+from config.settings import DEFAULT_STOCKS
+
+
+def load_closes(args) -> pd.DataFrame:
+    """讀取收盤價：已保存的 CSV（日期 × 股票）或 Yahoo Finance"""
+    if args.csv:
+        return pd.read_csv(args.csv, index_col=0, parse_dates=True)
+
+    from data.historical_data import prefetch_history
+    symbols = list(args.symbols or [])
+    if args.symbols_file:
+        with open(args.symbols_file, encoding='utf-8') as f:
+            symbols += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return closes_frame(prefetch_history(symbols or DEFAULT_STOCKS, args.period))
+
+
+def print_metrics(title: str, metrics: dict):
+    print(f"\n{title}")
+    print(f"   總報酬: {metrics['total_return']:+.2%} | 年化: {metrics['cagr']:+.2%}")
+    print(f"   波動: {metrics['volatility']:.2%} | 夏普: {metrics['sharpe']:.2f} | "
+          f"最大回撤: {metrics['max_drawdown']:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='InvestSight 訊號回測',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+範例:
+  # 預設股票、兩年歷史
+  python scripts/backtest.py
+
+  # 使用已保存的收盤價 CSV（索引為日期、欄為股票代碼）
+  python scripts/backtest.py --csv data/closes.csv --cost-bps 5
+
+  # 調整門檻
+  python scripts/backtest.py --buy 30 --sell -30 --oversold 25 --overbought 75
+        """
+    )
+    parser.add_argument('--symbols', '-s', nargs='*', help='股票代碼')
+    parser.add_argument('--symbols-file', '-f', type=str, default='', help='股票列表檔案')
+    parser.add_argument('--csv', type=str, default='', help='收盤價 CSV 檔案')
+    parser.add_argument('--period', '-p', type=str, default='2y', help='歷史數據範圍')
+    parser.add_argument('--buy', type=float, default=20, help='買入評分門檻')
+    parser.add_argument('--sell', type=float, default=-20, help='賣出評分門檻')
+    parser.add_argument('--oversold', type=float, default=30, help='RSI 超賣')
+    parser.add_argument('--overbought', type=float, default=70, help='RSI 超買')
+    parser.add_argument('--cost-bps', type=float, default=10.0, help='單邊交易成本（基點）')
+    parser.add_argument('--short', action='store_true', help='賣出訊號放空')
+    parser.add_argument('--save', action='store_true', help='保存結果到 data/logs/backtest_*.json')
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧪 InvestSight 訊號回測")
+    print("=" * 60)
+
+    closes = load_closes(args)
+    if closes.empty:
+        print("✗ 沒有可用的價格數據")
+        return
+    print(f"\n📊 {closes.shape[1]} 支股票 × {closes.shape[0]} 根 K 線 "
+          f"({closes.index[0]:%Y-%m-%d} ~ {closes.index[-1]:%Y-%m-%d})")
+
+    advisor = InvestmentAdvisor()
+    advisor.rsi_levels = {'oversold': args.oversold, 'overbought': args.overbought}
+    backtester = Backtester(advisor, buy_threshold=args.buy, sell_threshold=args.sell,
+                            cost_bps=args.cost_bps, allow_short=args.short)
+
+    start = time.perf_counter()
+    result = backtester.run(closes)
+    elapsed = time.perf_counter() - start
+
+    print_metrics("📈 策略", result['metrics'])
+    print(f"   曝險: {result['metrics']['exposure']:.0%} | 交易次數: {result['metrics']['trades']}")
+    print_metrics("📊 等權買進持有", result['benchmark'])
+
+    print("\n個股:")
+    for symbol, stats in sorted(result['per_symbol'].items(),
+                                key=lambda item: item[1]['total_return'], reverse=True)[:10]:
+        print(f"   {symbol:8} {stats['total_return']:+8.2%}  回撤 {stats['max_drawdown']:7.2%}  "
+              f"交易 {stats['trades']}")
+
+    print(f"\n⏱️  回測耗時 {elapsed:.2f} 秒")
+
+    if args.save:
+        output_dir = Path('data/logs')
+        output_dir.mkdir(parents=True, exist_ok=True)
+        filepath = output_dir / f"backtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        payload = {key: value for key, value in result.items() if key != 'equity'}
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+        print(f"📁 結果已保存: {filepath}")
+
+
+if __name__ == '__main__':
+    main()
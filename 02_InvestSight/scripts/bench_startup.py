@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+腳本冷啟動時間測量
+在獨立進程中匯入各腳本模組（不執行 main），記錄啟動延遲與最慢的匯入，
+用於追蹤定時任務的冷啟動成本
+"""
+import sys
+import os
+from pathlib import Path
+
+project_root = str(Path(__file__).resolve().parent.parent)
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+import argparse
+import json
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, List
+
+# 追蹤的入口腳本
+DEFAULT_SCRIPTS = ['workflow', 'fetch_data', 'analyze_stocks', 'price_alert', 'portfolio_tracker']
+
+# 重量級依賴：報告中標示是否在啟動時被載入
+HEAVY_MODULES = ['textblob', 'nltk', 'pandas', 'yfinance', 'msgraph', 'azure.identity']
+
+
+def _parse_importtime(stderr: str) -> List[Dict]:
+    """解析 python -X importtime 輸出"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        try:
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            # 標題列
+            continue
+        modules.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+            'self_ms': self_us / 1000,
+            'cumulative_ms': cumulative_us / 1000,
+        })
+    return modules
+
+
+def measure_script(script: str, runs: int = 3) -> Dict:
+    """
+    測量單一腳本的冷啟動時間
+
+    Args:
+        script: scripts/ 下的模組名稱（不含 .py）
+        runs: 重複次數（取中位數）
+
+    Returns:
+        測量結果
+    """
+    timings = []
+    modules = []
+    error = None
+
+    for i in range(runs):
+        cmd = [sys.executable]
+        if i == 0:
+            cmd += ['-X', 'importtime']
+        cmd += ['-c', f'import scripts.{script}']
+
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=project_root, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f'exit {proc.returncode}'
+            break
+
+        if i == 0:
+            modules = _parse_importtime(proc.stderr)
+        else:
+            # 第一次含 importtime 開銷，不計入
+            timings.append(elapsed)
+
+    if error:
+        return {'script': script, 'error': error}
+
+    if not timings:
+        timings = [elapsed]
+
+    loaded = {m['module'] for m in modules}
+    # 腳本直接匯入的模組
+    top = sorted((m for m in modules if m['depth'] == 1),
+                 key=lambda m: m['cumulative_ms'], reverse=True)[:5]
+
+    return {
+        'script': script,
+        'median_ms': round(statistics.median(timings) * 1000, 1),
+        'min_ms': round(min(timings) * 1000, 1),
+        'runs': len(timings),
+        'heavy_loaded': [name for name in HEAVY_MODULES if name in loaded],
+        'top_imports': top,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='InvestSight 腳本冷啟動時間測量')
+    parser.add_argument('scripts', nargs='*', default=DEFAULT_SCRIPTS,
+                        help='要測量的腳本（預設全部入口腳本）')
+    parser.add_argument('--runs', '-r', type=int, default=3,
+                        help='每個腳本的重複次數（另加一次 importtime 分析）')
+    parser.add_argument('--save', '-s', action='store_true',
+                        help='保存結果到 data/logs/startup_*.json')
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  腳本冷啟動時間")
+    print("=" * 60)
+
+    results = []
+    for script in args.scripts:
+        result = measure_script(script, args.runs + 1)
+        results.append(result)
+
+        if 'error' in result:
+            print(f"\n✗ {script}: {result['error']}")
+            continue
+
+        print(f"\n📄 {script}: {result['median_ms']:.1f} ms (最快 {result['min_ms']:.1f} ms)")
+        print(f"   重量級模組: {', '.join(result['heavy_loaded']) or '無'}")
+        for m in result['top_imports']:
+            print(f"   {m['module']:24} {m['cumulative_ms']:8.1f} ms")
+
+    if args.save:
+        output_dir = Path('data/logs')
+        output_dir.mkdir(parents=True, exist_ok=True)
+        filepath = output_dir / f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump({'timestamp': datetime.now().isoformat(),
+                       'python': sys.version.split()[0],
+                       'results': results}, f, indent=2, ensure_ascii=False)
+        print(f"\n📁 結果已保存: {filepath}")
+
+
+if __name__ == '__main__':
+    main()
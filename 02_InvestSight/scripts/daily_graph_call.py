@@ -4,11 +4,15 @@ Microsoft Graph API - 每日調用（產生 E5 活躍記錄）
 使用 Client Secret 認證，不需要瀏覽器
 """
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
-from azure.identity import ClientSecretCredential
 import asyncio
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage.client_factory import CLIENT_SECRET as CLIENT_SECRET_KIND, get_credential
+
 load_dotenv()
 
 # 配置
@@ -34,10 +38,11 @@ async def daily_graph_call():
         return False
     
     try:
-        # 創建憑證（不需要互動）
-        credential = ClientSecretCredential(
-            client_id=CLIENT_ID,
+        # 共用憑證（不需要互動）
+        credential = get_credential(
+            CLIENT_SECRET_KIND,
             tenant_id=TENANT_ID,
+            client_id=CLIENT_ID,
             client_secret=CLIENT_SECRET
         )
         
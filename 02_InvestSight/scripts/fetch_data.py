@@ -16,8 +16,9 @@ load_dotenv()
 import argparse
 from data.finance_api import FinanceDataFetcher
 from data.news_api import NewsFetcher
-from analysis.sentiment import analyzer as sentiment_analyzer
+from analysis.news_pipeline import SentimentAggregator, stream_sentiment
 from config.settings import DEFAULT_STOCKS, RSS_FEEDS
+from monitoring.profiling import add_profile_argument, profile_main
 
 
 def fetch_stocks(symbols: list = None):
@@ -41,41 +42,28 @@ def fetch_stocks(symbols: list = None):
     return stocks
 
 
-def fetch_news(sources: list = None):
-    """抓取新聞數據"""
+def fetch_news(sources: list = None) -> SentimentAggregator:
+    """抓取新聞並以串流管線分析情感（只保留統計與最近幾篇，不累積所有新聞）"""
     print("\n" + "=" * 50)
-    print("📰 抓取新聞...")
+    print("📰 抓取新聞 / 🧠 情感分析...")
     print("=" * 50)
     
     fetcher = NewsFetcher()
     if sources:
         fetcher.rss_feeds = sources
     
-    articles = fetcher.fetch_all()
+    aggregator = SentimentAggregator()
+    for article in stream_sentiment(fetcher, aggregator=aggregator, limit=10):
+        # 先評分完成的新聞立即顯示，不等最慢的來源
+        if aggregator.count <= 5:
+            sent = article.get('sentiment', {})
+            icon = '🟢' if sent.get('sentiment') == 'positive' else '🔴' if sent.get('sentiment') == 'negative' else '⚪'
+            print(f"{icon} [{sent.get('sentiment', 'unknown'):8}] {article.get('title', '')[:50]}...")
     
-    print(f"✅ 成功抓取 {len(articles)} 篇新聞")
-    return articles
-
-
-def analyze_sentiment(articles: list):
-    """情感分析"""
-    print("\n" + "=" * 50)
-    print("🧠 情感分析...")
-    print("=" * 50)
-    
-    analyzed = sentiment_analyzer.analyze_articles(articles[:10])
-    
-    positive = sum(1 for a in analyzed if a.get('sentiment', {}).get('sentiment') == 'positive')
-    negative = sum(1 for a in analyzed if a.get('sentiment', {}).get('sentiment') == 'negative')
-    neutral = len(analyzed) - positive - negative
-    
-    for article in analyzed[:5]:
-        sent = article.get('sentiment', {})
-        icon = '🟢' if sent.get('sentiment') == 'positive' else '🔴' if sent.get('sentiment') == 'negative' else '⚪'
-        print(f"{icon} [{sent.get('sentiment', 'unknown'):8}] {article.get('title', '')[:50]}...")
-    
-    print(f"\n📊 統計: 🟢正面:{positive} | 🔴負面:{negative} | ⚪中性:{neutral}")
-    return analyzed
+    stats = aggregator.to_dict()
+    print(f"\n✅ 成功抓取 {stats['count']} 篇新聞")
+    print(f"📊 統計: 🟢正面:{stats['positive']} | 🔴負面:{stats['negative']} | ⚪中性:{stats['neutral']}")
+    return aggregator
 
 
 def main():
@@ -111,9 +99,14 @@ def main():
                         help='發送郵件通知到指定地址')
     parser.add_argument('--config', '-c', type=str, default='',
                         help='使用自定義配置文件')
+    add_profile_argument(parser)
     
     args = parser.parse_args()
-    
+    profile_main(args, lambda: run(args), 'fetch_data')
+
+
+def run(args):
+    """依命令列參數抓取數據"""
     # 預設：抓取所有數據
     fetch_all = not any([args.stocks, args.news])
     
@@ -130,11 +123,9 @@ def main():
     
     # 新聞
     if args.news or fetch_all:
-        results['articles'] = fetch_news()
-    
-    # 情感分析
-    if results['articles']:
-        analyze_sentiment(results['articles'])
+        news = fetch_news()
+        results['articles'] = list(news.recent)
+        results['summary'] = news.summary()
     
     # 發送郵件
     if args.email and results['stocks']:
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+InvestSight 參數掃描
+以網格或隨機搜尋並行回測 InvestmentAdvisor 的 RSI 門檻與評分門檻
+"""
+import sys
+import os
+from pathlib import Path
+
+project_root = str(Path(__file__).resolve().parent.parent)
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import json
+import time
+from datetime import datetime
+
+from analysis.param_sweep import ParameterSweep, grid_configs, random_configs
+from scripts.backtest import load_closes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='InvestSight 參數掃描',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+範例:
+  # 預設網格（RSI 超賣/超買 × 買入/賣出門檻）
+  python scripts/param_sweep.py --csv data/closes.csv
+
+  # 隨機搜尋 300 組，依最大回撤排序
+  python scripts/param_sweep.py --csv data/closes.csv --random 300 --objective max_drawdown
+        """
+    )
+    parser.add_argument('--symbols', '-s', nargs='*', help='股票代碼')
+    parser.add_argument('--symbols-file', '-f', type=str, default='', help='股票列表檔案')
+    parser.add_argument('--csv', type=str, default='', help='收盤價 CSV 檔案')
+    parser.add_argument('--period', '-p', type=str, default='5y', help='歷史數據範圍')
+    parser.add_argument('--random', '-r', type=int, default=0, help='隨機搜尋組數（0 為網格）')
+    parser.add_argument('--seed', type=int, default=None, help='隨機種子')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='進程數（預設 CPU 數）')
+    parser.add_argument('--objective', '-o', type=str, default='sharpe',
+                        help='排序指標（sharpe, total_return, cagr, max_drawdown）')
+    parser.add_argument('--cost-bps', type=float, default=10.0, help='單邊交易成本（基點）')
+    parser.add_argument('--short', action='store_true', help='賣出訊號放空')
+    parser.add_argument('--top', '-n', type=int, default=10, help='顯示前幾名')
+    parser.add_argument('--save', action='store_true', help='保存結果到 data/logs/sweep_*.json')
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧮 InvestSight 參數掃描")
+    print("=" * 60)
+
+    closes = load_closes(args)
+    if closes.empty:
+        print("✗ 沒有可用的價格數據")
+        return
+
+    start = time.perf_counter()
+    sweep = ParameterSweep(closes, cost_bps=args.cost_bps, allow_short=args.short)
+    print(f"\n📊 {closes.shape[1]} 支股票 × {closes.shape[0]} 根 K 線，"
+          f"指標計算 {time.perf_counter() - start:.2f} 秒")
+
+    configs = random_configs(count=args.random, seed=args.seed) if args.random else grid_configs()
+    print(f"🔁 {len(configs)} 組參數")
+
+    start = time.perf_counter()
+    results = sweep.run(configs, workers=args.workers, objective=args.objective)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n🏆 前 {args.top} 名（依 {args.objective}）:")
+    for rank, result in enumerate(results[:args.top], 1):
+        p, m = result['params'], result['metrics']
+        print(f"  {rank:2}. RSI {p['oversold']:g}/{p['overbought']:g} "
+              f"買入≥{p['buy_threshold']:g} 賣出<{p['sell_threshold']:g} | "
+              f"報酬 {m['total_return']:+.2%} 夏普 {m['sharpe']:.2f} 回撤 {m['max_drawdown']:.2%}")
+
+    print(f"\n⏱️  掃描耗時 {elapsed:.2f} 秒（{elapsed / max(len(configs), 1) * 1000:.0f} ms/組）")
+
+    if args.save:
+        output_dir = Path('data/logs')
+        output_dir.mkdir(parents=True, exist_ok=True)
+        filepath = output_dir / f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump({'objective': args.objective, 'results': results}, f, indent=2, ensure_ascii=False)
+        print(f"📁 結果已保存: {filepath}")
+
+
+if __name__ == '__main__':
+    main()
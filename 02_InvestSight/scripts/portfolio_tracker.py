@@ -305,5 +305,17 @@ def main():
     print("=" * 70)
 
 
+def cli():
+    """命令列入口"""
+    import argparse
+    from monitoring.profiling import add_profile_argument, profile_main
+    
+    parser = argparse.ArgumentParser(description='投資組合追蹤測試')
+    add_profile_argument(parser)
+    
+    args = parser.parse_args()
+    profile_main(args, main, 'portfolio_tracker')
+
+
 if __name__ == '__main__':
-    main()
+    cli()
@@ -20,7 +20,8 @@ from notification.teams import TeamsNotifier
 class PriceAlert:
     """股價警報"""
 
-    def __init__(self, symbol: str, condition: str, target_price: float, enabled: bool = True):
+    def __init__(self, symbol: str, condition: str, target_price: float, enabled: bool = True,
+                 hysteresis: Optional[float] = None, cooldown_minutes: Optional[float] = None):
         """
         初始化股價警報
 
@@ -29,15 +30,54 @@ class PriceAlert:
             condition: 條件 ('above' 或 'below')
             target_price: 目標價格
             enabled: 是否啟用
+            hysteresis: 回落帶寬（目標價的百分比），價格回到帶寬外後重新啟用
+            cooldown_minutes: 冷卻時間（分鐘），觸發後經過此時間重新啟用
         """
         self.symbol = symbol
         self.condition = condition
         self.target_price = target_price
         self.enabled = enabled
+        self.hysteresis = hysteresis
+        self.cooldown_minutes = cooldown_minutes
+        self.armed = True
         self.created_at = datetime.now().isoformat()
         self.triggered_at = None
         self.triggered_price = None
 
+    @property
+    def rearms(self) -> bool:
+        """是否設定了重新啟用策略（否則觸發後即停用）"""
+        return self.hysteresis is not None or self.cooldown_minutes is not None
+
+    def try_rearm(self, current_price: float) -> bool:
+        """
+        檢查已觸發的警報是否可重新啟用
+
+        Args:
+            current_price: 當前股價
+
+        Returns:
+            是否重新啟用
+        """
+        if self.armed:
+            return False
+
+        rearm = False
+        if self.cooldown_minutes is not None and self.triggered_at:
+            elapsed = (datetime.now() - datetime.fromisoformat(self.triggered_at)).total_seconds()
+            rearm = elapsed >= self.cooldown_minutes * 60
+
+        if not rearm and self.hysteresis is not None:
+            band = self.target_price * self.hysteresis / 100
+            if self.condition == 'above':
+                rearm = current_price <= self.target_price - band
+            elif self.condition == 'below':
+                rearm = current_price >= self.target_price + band
+
+        if rearm:
+            self.armed = True
+        return rearm
+
     def check(self, current_price: float) -> bool:
         """
         檢查是否觸發警報
@@ -51,6 +91,11 @@ class PriceAlert:
         if not self.enabled:
             return False
 
+        if not self.armed:
+            self.try_rearm(current_price)
+            if not self.armed:
+                return False
+
         triggered = False
         if self.condition == 'above' and current_price >= self.target_price:
             triggered = True
@@ -60,6 +105,7 @@ class PriceAlert:
         if triggered:
             self.triggered_at = datetime.now().isoformat()
             self.triggered_price = current_price
+            self.armed = False
 
         return triggered
 
@@ -70,6 +116,9 @@ class PriceAlert:
             'condition': self.condition,
             'target_price': self.target_price,
             'enabled': self.enabled,
+            'hysteresis': self.hysteresis,
+            'cooldown_minutes': self.cooldown_minutes,
+            'armed': self.armed,
             'created_at': self.created_at,
             'triggered_at': self.triggered_at,
             'triggered_price': self.triggered_price,
@@ -82,8 +131,11 @@ class PriceAlert:
             symbol=data['symbol'],
             condition=data['condition'],
             target_price=data['target_price'],
-            enabled=data.get('enabled', True)
+            enabled=data.get('enabled', True),
+            hysteresis=data.get('hysteresis'),
+            cooldown_minutes=data.get('cooldown_minutes')
         )
+        alert.armed = data.get('armed', True)
         alert.created_at = data.get('created_at')
         alert.triggered_at = data.get('triggered_at')
         alert.triggered_price = data.get('triggered_price')
@@ -111,7 +163,9 @@ class AlertManager:
         # 加載現有警報
         self.load_alerts()
 
-    def add_alert(self, symbol: str, condition: str, target_price: float) -> PriceAlert:
+    def add_alert(self, symbol: str, condition: str, target_price: float,
+                  hysteresis: Optional[float] = None,
+                  cooldown_minutes: Optional[float] = None) -> PriceAlert:
         """
         添加新警報
 
@@ -119,11 +173,14 @@ class AlertManager:
             symbol: 股票代號
             condition: 條件 ('above' 或 'below')
             target_price: 目標價格
+            hysteresis: 回落帶寬（目標價的百分比）
+            cooldown_minutes: 冷卻時間（分鐘）
 
         Returns:
             創建的警報對象
         """
-        alert = PriceAlert(symbol, condition, target_price)
+        alert = PriceAlert(symbol, condition, target_price,
+                           hysteresis=hysteresis, cooldown_minutes=cooldown_minutes)
         self.alerts.append(alert)
         self.save_alerts()
         return alert
@@ -161,6 +218,8 @@ class AlertManager:
         stocks = finance_fetcher.fetch_all_stocks()
         stock_prices = {s['symbol']: s.get('price') for s in stocks if s.get('price')}
         
+        changed = False
+        
         for alert in self.alerts:
             if not alert.enabled:
                 continue
@@ -169,6 +228,7 @@ class AlertManager:
             if current_price is None:
                 continue
             
+            was_armed = alert.armed
             if alert.check(current_price):
                 triggered_alerts.append(alert)
                 print(f"🚨 警報觸發！{alert.symbol} {alert.condition} ${alert.target_price:.2f}")
@@ -177,10 +237,14 @@ class AlertManager:
                 # 發送通知
                 self._send_notification(alert, current_price)
                 
-                # 禁用已觸發的警報（避免重複通知）
-                alert.enabled = False
+                # 未設定重新啟用策略的警報觸發後禁用（避免重複通知）
+                if not alert.rearms:
+                    alert.enabled = False
+            elif alert.armed != was_armed:
+                print(f"🔁 警報重新啟用：{alert.symbol} {alert.condition} ${alert.target_price:.2f}")
+                changed = True
         
-        if triggered_alerts:
+        if triggered_alerts or changed:
             self.save_alerts()
         
         return triggered_alerts
@@ -292,5 +356,17 @@ def main():
     print("=" * 70)
 
 
+def cli():
+    """命令列入口"""
+    import argparse
+    from monitoring.profiling import add_profile_argument, profile_main
+    
+    parser = argparse.ArgumentParser(description='股價警報系統測試')
+    add_profile_argument(parser)
+    
+    args = parser.parse_args()
+    profile_main(args, main, 'price_alert')
+
+
 if __name__ == '__main__':
-    main()
+    cli()
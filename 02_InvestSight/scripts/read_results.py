@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+InvestSight 執行記錄讀取
+列出 data/logs 中的執行記錄，或將記錄還原為 JSON 輸出
+"""
+import sys
+import os
+from pathlib import Path
+
+project_root = str(Path(__file__).resolve().parent.parent)
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+import argparse
+import json
+
+from pipeline.run_record import read_record, list_records, latest_record
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='InvestSight 執行記錄讀取',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+範例:
+  # 列出所有每日記錄
+  python scripts/read_results.py --list --type daily
+
+  # 輸出最新的每日記錄
+  python scripts/read_results.py --type daily
+
+  # 輸出指定記錄的股票部分
+  python scripts/read_results.py data/logs/daily_20240102_080000.isr --key stocks
+        """
+    )
+    parser.add_argument('path', nargs='?', help='記錄檔案（省略時取最新一筆）')
+    parser.add_argument('--dir', type=str, default='data/logs', help='記錄目錄')
+    parser.add_argument('--type', '-t', type=str, default=None, help='記錄類型（daily、weekly）')
+    parser.add_argument('--list', '-l', action='store_true', help='列出記錄')
+    parser.add_argument('--key', '-k', type=str, default=None, help='只輸出指定欄位')
+    parser.add_argument('--output', '-o', type=str, default='', help='輸出到 JSON 檔案')
+
+    args = parser.parse_args()
+
+    if args.list:
+        for path in list_records(args.dir, args.type):
+            meta = read_record(path, with_meta=True)
+            kind = f"差異（基於 {meta['base']}）" if meta.get('base') else "完整"
+            print(f"{path.name:32} {path.stat().st_size / 1024:8.1f} KB  {meta['created'][:19]}  {kind}")
+        return
+
+    path = Path(args.path) if args.path else latest_record(args.dir, args.type)
+    if path is None:
+        print("✗ 找不到執行記錄")
+        return
+
+    try:
+        data = read_record(path)
+    except (OSError, ValueError) as e:
+        print(f"✗ 讀取失敗：{e}")
+        return
+
+    if args.key:
+        data = data.get(args.key)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        print(f"📁 已輸出: {args.output}")
+    else:
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
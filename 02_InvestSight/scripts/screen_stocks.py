@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+InvestSight 股票篩選
+載入歷史數據到指標存放區，以條件表達式篩選並排序
+"""
+import sys
+import os
+from pathlib import Path
+
+project_root = str(Path(__file__).resolve().parent.parent)
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+from data.historical_data import prefetch_history
+from analysis.screener import IndicatorStore, Screener
+from config.settings import DEFAULT_STOCKS
+
+
+def load_symbols(args) -> list:
+    """由參數或檔案取得股票列表"""
+    symbols = list(args.symbols or [])
+    if args.symbols_file:
+        with open(args.symbols_file, encoding='utf-8') as f:
+            symbols += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return symbols or DEFAULT_STOCKS
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='InvestSight 股票篩選',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+範例:
+  # RSI 超賣且跌破布林帶下軌
+  python scripts/screen_stocks.py --where "rsi14 < 30 and close < lower"
+
+  # 從檔案讀取股票列表，依 RSI 由低到高取前 10
+  python scripts/screen_stocks.py --symbols-file symbols.txt --sort rsi14 --asc --top 10
+
+  # 依偏離 MA20 的幅度排序
+  python scripts/screen_stocks.py --sort "close / ma20"
+        """
+    )
+    parser.add_argument('--symbols', '-s', nargs='*', help='股票代碼')
+    parser.add_argument('--symbols-file', '-f', type=str, default='',
+                        help='股票列表檔案（每行一個代碼）')
+    parser.add_argument('--where', '-w', type=str, default=None,
+                        help='篩選條件，例如 "rsi14 < 30 and close < lower"')
+    parser.add_argument('--sort', type=str, default='score',
+                        help='排序欄位或表達式（預設技術評分 score）')
+    parser.add_argument('--asc', action='store_true', help='由小到大排序')
+    parser.add_argument('--top', '-n', type=int, default=20, help='顯示筆數')
+    parser.add_argument('--period', '-p', type=str, default='6mo', help='歷史數據範圍')
+
+    args = parser.parse_args()
+    symbols = load_symbols(args)
+
+    print("=" * 60)
+    print("🔎 InvestSight 股票篩選")
+    print("=" * 60)
+
+    print(f"\n📊 載入 {len(symbols)} 支股票的歷史數據...")
+    store = IndicatorStore()
+    for symbol, data in prefetch_history(symbols, args.period).items():
+        store.load_history(symbol, data['prices'], data.get('volumes'))
+    print(f"   ✅ {len(store)} 支股票")
+
+    screener = Screener(store)
+    try:
+        results = screener.query(args.where, sort_by=args.sort, ascending=args.asc, top=args.top)
+    except (ValueError, KeyError) as e:
+        print(f"\n✗ 查詢錯誤：{e}")
+        return
+
+    print(f"\n條件: {args.where or '（全部）'}  排序: {args.sort} {'↑' if args.asc else '↓'}")
+    print("-" * 60)
+    print(f"{'代碼':8} {'收盤':>10} {'漲跌%':>8} {'RSI':>7} {'MA20':>10} {'評分':>6}")
+    for r in results:
+        print(f"{r['symbol']:8} {r['close']:10.2f} {r['change_pct']:+8.2f} "
+              f"{r['rsi14']:7.1f} {r['ma20']:10.2f} {r['score']:6.0f}")
+    print(f"\n✅ 符合條件: {len(results)} 支")
+
+
+if __name__ == '__main__':
+    main()
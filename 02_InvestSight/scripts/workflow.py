@@ -12,116 +12,128 @@ os.chdir(Path(__file__).resolve().parent.parent)
 
 import argparse
 import json
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from monitoring.profiling import add_profile_argument, profile_main
 
-def run_daily_workflow(send_email: bool = False, send_teams: bool = False, recipient: str = ""):
-    """每日工作流"""
+
+def run_daily_workflow(send_email: bool = False, send_teams: bool = False, recipient: str = "",
+                       resume: bool = False):
+    """
+    每日工作流（股票與新聞、郵件與 Teams 各自並行）
+    
+    每個階段的輸出都保存為檢查點；resume=True 時輸入未變的階段直接取回上次輸出，
+    例如郵件發送失敗後重跑不會重新抓取與評分
+    """
+    from pipeline import DAGExecutor, CheckpointStore
+    
     print("=" * 60)
-    print("📅 InvestSight 每日工作流")
+    print("📅 InvestSight 每日工作流" + ("（續跑）" if resume else ""))
     print(f"   時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
     
-    results = {
-        'timestamp': datetime.now().isoformat(),
-        'stocks': None,
-        'news': None,
-        'reports': None,
-        'email': None,
-        'teams': None,
-    }
+    # 來源階段以日期為參數，同一天內可續跑
+    today = {'date': datetime.now().strftime('%Y-%m-%d')}
     
-    # 1. 抓取股票數據
-    print("\n[1/5] 📊 抓取股票數據...")
-    try:
+    # 抓取股票數據
+    def fetch_stocks(inputs):
         from data.finance_api import fetcher
         stocks = fetcher.fetch_all_stocks()
-        results['stocks'] = {
-            'count': len(stocks),
-            'data': stocks
-        }
-        for s in stocks:
-            print(f"   {s['symbol']:6} \${s['price']:7.2f} {s['change_percent']:+6.2f}%")
-        print(f"   ✅ 成功抓取 {len(stocks)} 支股票")
-    except Exception as e:
-        print(f"   ❌ 失敗: {e}")
+        lines = [f"   {s['symbol']:6} \${s['price']:7.2f} {s['change_percent']:+6.2f}%" for s in stocks]
+        print("\n".join(["\n📊 股票數據:"] + lines + [f"   ✅ 成功抓取 {len(stocks)} 支股票"]))
+        return stocks
     
-    # 2. 抓取新聞
-    print("\n[2/5] 📰 抓取新聞...")
-    try:
+    # 抓取新聞（串流：各來源並行下載，邊抓取邊評分；每個來源最多 10 篇，同 fetch_all）
+    # 輸出只保留統計與最近 20 篇，記憶體與檢查點大小不隨新聞數量增加
+    def fetch_news(inputs):
         from data.news_api import fetcher
-        articles = fetcher.fetch_all()
-        results['news'] = {
-            'count': len(articles),
-            'data': articles
+        from analysis.news_pipeline import run_pipeline
+        aggregator = run_pipeline(fetcher, limit=10)
+        print(f"\n📰 ✅ 成功抓取 {aggregator.count} 篇新聞")
+        return {
+            'count': aggregator.count,
+            'data': list(aggregator.recent),
+            'stats': aggregator.to_dict() if aggregator.count else None,
         }
-        print(f"   ✅ 成功抓取 {len(articles)} 篇新聞")
-    except Exception as e:
-        print(f"   ❌ 失敗: {e}")
     
-    # 3. 情感分析
-    print("\n[3/5] 🧠 情感分析...")
-    try:
-        from analysis.sentiment import analyzer
-        if articles:
-            analyzed = analyzer.analyze_articles(articles)
-            positive = sum(1 for a in analyzed if a.get('sentiment', {}).get('sentiment') == 'positive')
-            negative = sum(1 for a in analyzed if a.get('sentiment', {}).get('sentiment') == 'negative')
-            neutral = len(analyzed) - positive - negative
-            print(f"   ✅ 正面: {positive} | 負面: {negative} | 中性: {neutral}")
-            
-            if positive > negative:
-                summary = "市場情緒偏向正面"
-            elif negative > positive:
-                summary = "市場情緒偏向負面"
-            else:
-                summary = "市場情緒中性"
-            print(f"   📝 總結: {summary}")
-    except Exception as e:
-        print(f"   ❌ 失敗: {e}")
+    # 情感分析
+    def summarize_sentiment(inputs):
+        news = inputs['news']
+        if not (news and news['stats']):
+            print("\n🧠 ⏭️ 沒有新聞")
+            return None
+        stats = news['stats']
+        print(f"\n🧠 ✅ 正面: {stats['positive']} | 負面: {stats['negative']} | 中性: {stats['neutral']}")
+        print(f"   📝 總結: {stats['summary']}")
+        return stats
     
-    # 4. 生成報告
-    print("\n[4/5] 📈 生成報告...")
-    try:
+    # 生成報告
+    def build_reports(inputs):
         from report import generate_weekly_report
         report_files = generate_weekly_report()
-        results['reports'] = report_files
-        print(f"   ✅ 報告已生成: {report_files.get('html', 'N/A')}")
-    except Exception as e:
-        print(f"   ❌ 失敗: {e}")
-    
-    # 5. 發送通知
-    if send_email or send_teams:
-        print("\n[5/5] 📧 發送通知...")
-        
-        if send_email and recipient:
-            try:
-                from notification import send_daily_report
-                success = send_daily_report(recipient, stocks or [], summary)
-                results['email'] = 'success' if success else 'failed'
-                print(f"   ✅ 郵件已發送" if success else f"   ❌ 郵件發送失敗")
-            except Exception as e:
-                print(f"   ❌ 郵件錯誤: {e}")
-                results['email'] = f'error: {e}'
-        
-        if send_teams:
-            try:
-                from notification import teams_notifier
-                teams_notifier.send_daily_summary(stocks or [])
-                results['teams'] = 'success'
-                print(f"   ✅ Teams 通知已發送")
-            except Exception as e:
-                print(f"   ❌ Teams 錯誤: {e}")
-                results['teams'] = f'error: {e}'
-    else:
-        print("\n[5/5] ⏭️ 跳過通知（未配置）")
+        print(f"\n📈 ✅ 報告已生成: {report_files.get('html', 'N/A')}")
+        return report_files
+    
+    # 發送通知（失敗時拋出例外，不留下檢查點，續跑時會重送）
+    def notify_email(inputs):
+        from notification import send_daily_report
+        sentiment = inputs['sentiment']
+        summary = sentiment['summary'] if sentiment else "市場情緒中性"
+        if not send_daily_report(recipient, inputs['stocks'] or [], summary):
+            raise RuntimeError("郵件發送失敗")
+        print(f"\n📧 ✅ 郵件已發送")
+        return 'success'
+    
+    def notify_teams(inputs):
+        from notification import teams_notifier
+        if not teams_notifier.send_daily_summary(inputs['stocks'] or []):
+            raise RuntimeError("Teams 通知發送失敗")
+        print(f"\n💬 ✅ Teams 通知已發送")
+        return 'success'
+    
+    dag = DAGExecutor(checkpoints=CheckpointStore(), resume=resume)
+    dag.add('stocks', fetch_stocks, params=today)
+    dag.add('news', fetch_news, params=today)
+    dag.add('sentiment', summarize_sentiment, deps=['news'])
+    dag.add('reports', build_reports, params=today)
+    if send_email and recipient:
+        dag.add('email', notify_email, deps=['stocks', 'sentiment'], params={'recipient': recipient})
+    if send_teams:
+        dag.add('teams', notify_teams, deps=['stocks'])
+    if not (send_email or send_teams):
+        print("\n⏭️ 跳過通知（未配置）")
+    
+    outputs = dag.run()
+    dag.checkpoints.prune(max_age_days=7)
+    stocks = outputs.get('stocks')
+    news = outputs.get('news')
+    
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'stocks': {'count': len(stocks), 'data': stocks} if stocks is not None else None,
+        'news': {'count': news['count'], 'data': news['data']} if news else None,
+        'sentiment': outputs.get('sentiment'),
+        'reports': outputs.get('reports'),
+        'email': None,
+        'teams': None,
+    }
+    for channel in ('email', 'teams'):
+        record = dag.records.get(channel)
+        if record:
+            results[channel] = outputs[channel] or f"error: {record.get('error', record['status'])}"
+    results['pipeline'] = dag.summary()
     
     # 完成
     print("\n" + "=" * 60)
     print("✅ 每日工作流完成!")
+    for record in results['pipeline']['stages']:
+        print(f"   {record['name']:10} {record['status']:8} {record['duration_ms'] / 1000:6.2f}s")
+    print(f"   總耗時 {results['pipeline']['wall_ms'] / 1000:.2f}s"
+          f"（關鍵路徑 {results['pipeline']['critical_path_ms'] / 1000:.2f}s）")
     print("=" * 60)
     
     return results
@@ -149,14 +161,19 @@ def run_weekly_workflow():
     
     # 2. 技術分析
     print("\n[2/4] 📈 技術指標分析...")
+    from data.historical_data import prefetch_history
     from analysis.technical_indicators import analyze_stock
-    for stock in stocks[:3]:
+    history = prefetch_history([stock['symbol'] for stock in stocks], period='6mo')
+    results['analysis'] = {}
+    for symbol, data in history.items():
         try:
-            indicators = analyze_stock(stock['symbol'])
-            print(f"   {stock['symbol']}: RSI={indicators.get('rsi', 'N/A')}")
-        except:
-            pass
-    print("   ✅ 分析完成")
+            indicators = analyze_stock(symbol, data['prices'])
+            rsi = indicators['rsi14'][-1] if indicators['rsi14'] else None
+            results['analysis'][symbol] = {'rsi14': rsi, 'price': data['current_price']}
+            print(f"   {symbol}: RSI={rsi:.1f}" if rsi is not None else f"   {symbol}: RSI=N/A")
+        except Exception as e:
+            print(f"   ❌ {symbol}: {e}")
+    print(f"   ✅ 分析完成（{len(results['analysis'])}/{len(stocks)} 支）")
     
     # 3. 生成週報
     print("\n[3/4] 📋 生成每週報告...")
@@ -181,21 +198,139 @@ def run_weekly_workflow():
     return results
 
 
-def save_results(results: dict, workflow_type: str = "daily"):
-    """保存結果到 JSON"""
+def save_results(results: dict, workflow_type: str = "daily", fmt: str = "record",
+                 delta: bool = False):
+    """
+    保存結果
+    
+    Args:
+        results: 工作流結果
+        workflow_type: 工作流類型（檔名前綴）
+        fmt: 'record' 為壓縮的執行記錄（.isr，以 scripts/read_results.py 讀取），'json' 為縮排 JSON
+        delta: 只保存與上一筆同類型記錄的差異（僅 record 格式）
+    """
+    from pipeline import write_record, latest_record
+    
     output_dir = Path("data/logs")
     output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    start = time.perf_counter()
     
-    filename = f"{workflow_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    filepath = output_dir / filename
-    
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+    if fmt == 'json':
+        filepath = output_dir / f"{workflow_type}_{stamp}.json"
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+    else:
+        base = latest_record(output_dir, workflow_type) if delta else None
+        filepath = write_record(output_dir / f"{workflow_type}_{stamp}.isr", results,
+                                record_type=workflow_type, base_path=base)
     
-    print(f"📁 結果已保存: {filepath}")
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"📁 結果已保存: {filepath} ({filepath.stat().st_size / 1024:.1f} KB, {elapsed:.0f} ms)")
     return filepath
 
 
+def export_metrics(path: str):
+    """寫出量測指標並列出耗時最多的項目"""
+    from monitoring import metrics
+    
+    filepath = metrics.export(path)
+    if filepath:
+        histograms = metrics.snapshot()['histograms']
+        totals = sorted(((name, sum(h['sum'] for h in series)) for name, series in histograms.items()),
+                        key=lambda item: item[1], reverse=True)
+        print(f"📏 指標已寫出: {filepath}")
+        for name, seconds in totals[:5]:
+            print(f"   {name:20} {seconds:8.2f}s")
+
+
+def warm_up():
+    """預先載入重量級模組（常駐模式只需一次）"""
+    start = time.perf_counter()
+    import pandas  # noqa: F401
+    import yfinance  # noqa: F401
+    from analysis.sentiment import _load_textblob
+    _load_textblob()
+    import notification  # noqa: F401
+    print(f"🔥 模組預載完成 ({time.perf_counter() - start:.2f} 秒)")
+
+
+def run_daemon(args):
+    """
+    常駐模式：以進程內排程器執行每日、每週、盤中監控與警報工作
+    
+    模組、歷史數據與情緒緩存、HTTP 連線與 Graph 憑證在各次執行之間保留；
+    每個工作完成後將統計寫入 data/logs/daemon_stats.json
+    """
+    import signal
+    from pipeline import Scheduler, Interval, TimeOfDay
+    from config.settings import DEFAULT_STOCKS
+    
+    print("=" * 60)
+    print("🛰️  InvestSight 常駐模式")
+    print("=" * 60)
+    warm_up()
+    
+    recipient = args.email
+    weekdays = range(5)
+    market_hours = ('09:30', '16:00')
+    stats_file = Path('data/logs/daemon_stats.json')
+    scheduler = Scheduler()
+    monitor = None
+    
+    def daily():
+        results = run_daily_workflow(bool(recipient), args.teams, recipient, resume=args.resume)
+        if args.save:
+            save_results(results, 'daily', args.format, args.delta)
+    
+    def weekly():
+        results = run_weekly_workflow()
+        if args.save:
+            save_results(results, 'weekly', args.format, args.delta)
+    
+    scheduler.add('daily', daily, TimeOfDay(args.daily_at, weekdays=weekdays))
+    scheduler.add('weekly', weekly, TimeOfDay(args.weekly_at, weekdays=[0]))
+    
+    if args.monitor_interval > 0:
+        from data.price_monitor import IntradayMonitor
+        monitor = IntradayMonitor(DEFAULT_STOCKS, interval_seconds=args.monitor_interval)
+        scheduler.add('monitor', monitor.tick,
+                      Interval(args.monitor_interval, weekdays=weekdays, between=market_hours))
+    
+    if args.alert_interval > 0:
+        from scripts.price_alert import AlertManager
+        alert_manager = AlertManager()
+        scheduler.add('alerts', alert_manager.check_all,
+                      Interval(args.alert_interval, weekdays=weekdays, between=market_hours))
+    
+    def write_stats(job):
+        stats_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(stats_file, 'w', encoding='utf-8') as f:
+            json.dump({'updated': datetime.now().isoformat(), 'jobs': scheduler.stats()},
+                      f, indent=2, ensure_ascii=False)
+        print(f"⏱️  {job.name}: {job.last_ms / 1000:.2f} 秒"
+              f"（平均 {job.total_ms / job.runs / 1000:.2f} 秒，共 {job.runs} 次）")
+        if args.metrics:
+            from monitoring import metrics
+            metrics.observe('job_seconds', job.last_ms / 1000, job=job.name)
+            metrics.export(args.metrics)
+    
+    scheduler.on_job_done = write_stats
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    
+    for name, stats in scheduler.stats().items():
+        print(f"   {name:8} {stats['schedule']:12} 下次: {stats['next_run']}")
+    
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if monitor:
+            monitor.close()
+        print("\n👋 常駐模式結束")
+
+
 def main():
     parser = argparse.ArgumentParser(description='InvestSight 自動化工作流')
     parser.add_argument('--type', '-t', choices=['daily', 'weekly', 'both'], 
@@ -205,23 +340,54 @@ def main():
     parser.add_argument('--teams', '-T', action='store_true',
                         help='發送 Teams 通知')
     parser.add_argument('--save', '-s', action='store_true',
-                        help='保存結果到 JSON')
+                        help='保存結果到 data/logs')
+    parser.add_argument('--format', choices=['record', 'json'], default='record',
+                        help='保存格式：壓縮執行記錄或縮排 JSON')
+    parser.add_argument('--delta', action='store_true',
+                        help='只保存與上一筆記錄的差異（record 格式）')
+    parser.add_argument('--metrics', '-m', type=str, default=os.getenv('METRICS_FILE', ''),
+                        help='量測指標輸出檔（.prom 為 Prometheus 文字格式，.json 為 JSON）')
+    parser.add_argument('--resume', '-r', action='store_true',
+                        help='續跑：略過輸入未變且上次成功的階段')
+    parser.add_argument('--daemon', '-d', action='store_true',
+                        help='常駐模式：由進程內排程器定時執行')
+    parser.add_argument('--daily-at', type=str, default='08:00',
+                        help='常駐模式每日工作流時間（週一至週五）')
+    parser.add_argument('--weekly-at', type=str, default='09:00',
+                        help='常駐模式每週工作流時間（週一）')
+    parser.add_argument('--monitor-interval', type=int, default=300,
+                        help='常駐模式盤中監控間隔秒數（0 為停用）')
+    parser.add_argument('--alert-interval', type=int, default=300,
+                        help='常駐模式警報檢查間隔秒數（0 為停用）')
+    
+    add_profile_argument(parser)
     
     args = parser.parse_args()
+    profile_main(args, lambda: run(args), 'workflow')
+
+
+def run(args):
+    """依命令列參數執行工作流"""
+    if args.daemon:
+        run_daemon(args)
+        return
     
     recipient = args.email
     send_email = bool(recipient)
     send_teams = args.teams
     
     if args.type in ['daily', 'both']:
-        results = run_daily_workflow(send_email, send_teams, recipient)
+        results = run_daily_workflow(send_email, send_teams, recipient, resume=args.resume)
         if args.save:
-            save_results(results, 'daily')
+            save_results(results, 'daily', args.format, args.delta)
     
     if args.type in ['weekly', 'both']:
         results = run_weekly_workflow()
         if args.save:
-            save_results(results, 'weekly')
+            save_results(results, 'weekly', args.format, args.delta)
+    
+    if args.metrics:
+        export_metrics(args.metrics)
 
 
 if __name__ == '__main__':
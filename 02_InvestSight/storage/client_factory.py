@@ -0,0 +1,218 @@
+"""
+Graph 客戶端工廠
+整個程序共用憑證、GraphServiceClient 與 HTTP 連線：
+同一租戶只建立一次 credential（token 快取在其中），同一組 scopes 只建立一次 GraphServiceClient
+（底層連線池隨之重用），每次執行只需一次 TLS 握手與一次取得 token。
+
+Token 快取以 MSAL 持久化快取保存（含 refresh token），Device Code 登入後把
+AuthenticationRecord 存到 pri/，之後的執行（包括定時任務）直接靜默取得或刷新 token，不再要求登入
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 憑證類型
+DEVICE_CODE = 'device_code'
+CLIENT_SECRET = 'client_secret'
+
+# 持久化 token 快取名稱（同名的程序共用快取）
+TOKEN_CACHE_NAME = os.getenv('AZURE_TOKEN_CACHE_NAME') or 'investsight'
+
+# 沒有系統金鑰圈時（如無桌面的排程主機）是否允許以未加密檔案保存快取（預設不允許，需明確開啟）
+ALLOW_UNENCRYPTED_CACHE = os.getenv('AZURE_TOKEN_CACHE_UNENCRYPTED', 'false').lower() == 'true'
+
+# Device Code 登入記錄（帳號與租戶，不含 token）
+AUTH_RECORD_PATH = Path(os.getenv('AZURE_AUTH_RECORD_PATH')
+                        or Path(__file__).resolve().parent.parent / 'pri' / 'auth_record.json')
+
+# 設為 true 時不自動跳出 Device Code 登入（定時任務：沒有有效登入時直接失敗而不是等待）
+NON_INTERACTIVE = os.getenv('AZURE_NON_INTERACTIVE', 'false').lower() == 'true'
+
+_lock = threading.RLock()
+_credentials: Dict[Tuple, object] = {}
+_records: Dict[Tuple, object] = {}
+_service_clients: Dict[Tuple, object] = {}
+_session: Optional[requests.Session] = None
+
+
+def _credential_key(kind: str, tenant_id: Optional[str], client_id: Optional[str]) -> Tuple:
+    return (kind, tenant_id or os.getenv('AZURE_TENANT_ID'), client_id or os.getenv('AZURE_CLIENT_ID'))
+
+
+def _persistence_options():
+    from azure.identity import TokenCachePersistenceOptions
+    return TokenCachePersistenceOptions(name=TOKEN_CACHE_NAME,
+                                        allow_unencrypted_storage=ALLOW_UNENCRYPTED_CACHE)
+
+
+def load_authentication_record(path=None):
+    """
+    讀取 Device Code 登入記錄
+
+    Args:
+        path: 記錄檔案（預設 AUTH_RECORD_PATH）
+
+    Returns:
+        AuthenticationRecord，沒有或無法讀取時 None
+    """
+    path = Path(path or AUTH_RECORD_PATH)
+    if not path.exists():
+        return None
+    try:
+        from azure.identity import AuthenticationRecord
+        return AuthenticationRecord.deserialize(path.read_text(encoding='utf-8'))
+    except Exception as e:
+        print(f"⚠ 讀取登入記錄失敗：{e}")
+        return None
+
+
+def save_authentication_record(record, path=None) -> bool:
+    """
+    保存 Device Code 登入記錄
+
+    Args:
+        record: AuthenticationRecord
+        path: 記錄檔案（預設 AUTH_RECORD_PATH）
+
+    Returns:
+        是否成功
+    """
+    path = Path(path or AUTH_RECORD_PATH)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(record.serialize(), encoding='utf-8')
+        print(f"✓ 登入記錄已保存到：{path}")
+        return True
+    except OSError as e:
+        print(f"⚠ 保存登入記錄失敗：{e}")
+        return False
+
+
+def get_credential(kind: str = DEVICE_CODE, tenant_id: Optional[str] = None,
+                   client_id: Optional[str] = None, client_secret: Optional[str] = None):
+    """
+    取得共用憑證（同類型、同租戶、同應用只建立一次）
+
+    Args:
+        kind: DEVICE_CODE 或 CLIENT_SECRET
+        tenant_id: 租戶 ID（預設 AZURE_TENANT_ID）
+        client_id: 應用 ID（預設 AZURE_CLIENT_ID）
+        client_secret: 應用密碼（CLIENT_SECRET 類型，預設 AZURE_CLIENT_SECRET）
+
+    Returns:
+        azure.identity 憑證
+    """
+    key = _credential_key(kind, tenant_id, client_id)
+    with _lock:
+        credential = _credentials.get(key)
+        if credential is not None:
+            return credential
+
+        _, tenant_id, client_id = key
+        if kind == DEVICE_CODE:
+            from azure.identity import DeviceCodeCredential
+            record = load_authentication_record()
+            credential = DeviceCodeCredential(
+                client_id=client_id,
+                tenant_id=tenant_id,
+                cache_persistence_options=_persistence_options(),
+                authentication_record=record,
+                disable_automatic_authentication=NON_INTERACTIVE,
+            )
+            _records[key] = record
+        elif kind == CLIENT_SECRET:
+            from azure.identity import ClientSecretCredential
+            credential = ClientSecretCredential(
+                client_id=client_id,
+                tenant_id=tenant_id,
+                client_secret=client_secret or os.getenv('AZURE_CLIENT_SECRET'),
+                cache_persistence_options=_persistence_options(),
+            )
+        else:
+            raise ValueError(f"未知的憑證類型: {kind}")
+
+        _credentials[key] = credential
+        return credential
+
+
+def device_code_login(scopes: Sequence[str], tenant_id: Optional[str] = None,
+                      client_id: Optional[str] = None, force: bool = False):
+    """
+    確保已完成 Device Code 登入：已有登入記錄時不做任何請求（token 由快取靜默取得），
+    否則進行一次互動登入並保存記錄
+
+    Args:
+        scopes: Graph 權限範圍
+        tenant_id: 租戶 ID
+        client_id: 應用 ID
+        force: 忽略既有記錄重新登入
+
+    Returns:
+        DeviceCodeCredential
+    """
+    key = _credential_key(DEVICE_CODE, tenant_id, client_id)
+    with _lock:
+        credential = get_credential(DEVICE_CODE, tenant_id, client_id)
+        if force or _records.get(key) is None:
+            if NON_INTERACTIVE:
+                raise RuntimeError("沒有登入記錄，請先執行 scripts/save_token.py 完成 Device Code 登入")
+            record = credential.authenticate(scopes=list(scopes))
+            save_authentication_record(record)
+            _records[key] = record
+        return credential
+
+
+def has_authentication_record() -> bool:
+    """是否已有 Device Code 登入記錄"""
+    return Path(AUTH_RECORD_PATH).exists()
+
+
+def get_service_client(scopes: Sequence[str], kind: str = DEVICE_CODE,
+                       tenant_id: Optional[str] = None, client_id: Optional[str] = None,
+                       client_secret: Optional[str] = None):
+    """
+    取得共用 GraphServiceClient（同一憑證與 scopes 只建立一次）
+
+    Args:
+        scopes: Graph 權限範圍
+        kind, tenant_id, client_id, client_secret: 同 get_credential
+
+    Returns:
+        (credential, GraphServiceClient)
+    """
+    credential_key = _credential_key(kind, tenant_id, client_id)
+    key = credential_key + (tuple(scopes),)
+    with _lock:
+        credential = get_credential(kind, tenant_id, client_id, client_secret)
+        client = _service_clients.get(key)
+        if client is None:
+            from msgraph import GraphServiceClient
+            client = _service_clients[key] = GraphServiceClient(credentials=credential, scopes=list(scopes))
+        return credential, client
+
+
+def get_http_session() -> requests.Session:
+    """共用的 requests 連線（$batch、Webhook 等直接 HTTP 呼叫使用）"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+        return _session
+
+
+def reset():
+    """清除所有共用物件（測試或切換帳號時使用）"""
+    global _session
+    with _lock:
+        _credentials.clear()
+        _records.clear()
+        _service_clients.clear()
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -8,6 +8,8 @@ from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
+from .throttling import acall_with_retry
+
 load_dotenv()
 
 
@@ -49,7 +51,8 @@ class ExcelOnlineClient:
     async def _find_file(self) -> Optional[str]:
         """查找文件並返回 ID"""
         try:
-            result = await self.graph_client.me.drive.root.children.get()
+            result = await acall_with_retry(
+                lambda: self.graph_client.me.drive.root.children.get(), 'excel')
             if result and result.value:
                 for item in result.value:
                     if item.name == Path(self.file_path).name:
@@ -66,11 +69,11 @@ class ExcelOnlineClient:
         try:
             from msgraph.generated.models.o_data_errors.o_data_error import ODataError
             
-            worksheet = await self.graph_client.me.drive.items[file_id].workbook.worksheets.by_worksheet_id(
+            worksheet = await acall_with_retry(lambda: self.graph_client.me.drive.items[file_id].workbook.worksheets.by_worksheet_id(
                 self.worksheet_name
-            ).get()
+            ).get(), 'excel')
             
-            range_result = await worksheet.range(address="A:Z").get()
+            range_result = await acall_with_retry(lambda: worksheet.range(address="A:Z").get(), 'excel')
             
             data = []
             if range_result and range_result.values:
@@ -109,9 +112,9 @@ class ExcelOnlineClient:
             from msgraph.generated.models.json import JSON
             json_body = JSON(values=values)
             
-            await self.graph_client.me.drive.items[file_id].workbook.worksheets.by_worksheet_id(
+            await acall_with_retry(lambda: self.graph_client.me.drive.items[file_id].workbook.worksheets.by_worksheet_id(
                 self.worksheet_name
-            ).range(address="A1").patch(json_body)
+            ).range(address="A1").patch(json_body), 'excel')
             
             print(f"✓ 寫入 {len(data)} 行數據")
             return True
@@ -142,9 +145,9 @@ class ExcelOnlineClient:
             address = f"A{start_row}:{chr(65 + len(headers) - 1)}{start_row + len(values) - 1}"
             json_body = JSON(values=values)
             
-            await self.graph_client.me.drive.items[file_id].workbook.worksheets.by_worksheet_id(
+            await acall_with_retry(lambda: self.graph_client.me.drive.items[file_id].workbook.worksheets.by_worksheet_id(
                 self.worksheet_name
-            ).range(address=address).patch(json_body)
+            ).range(address=address).patch(json_body), 'excel')
             
             print(f"✓ 追加 {len(data)} 行數據")
             return True
@@ -1,13 +1,21 @@
 """
 Microsoft Graph API 整合模塊（Device Code 認證）
 """
+import asyncio
+import functools
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from azure.identity import DeviceCodeCredential
-from msgraph import GraphServiceClient
-import json
 import webbrowser
+from contextlib import contextmanager
+from typing import Dict, List
+
+from monitoring.metrics import metrics
+from .client_factory import (DEVICE_CODE, device_code_login, get_http_session, get_service_client,
+                             has_authentication_record)
+from .graph_batch import GraphBatcher, send_mail_request, upload_request
+from .throttling import acall_with_retry
+from .upload_session import needs_upload_session, print_progress, upload_large_file
 
 load_dotenv()
 
@@ -16,8 +24,12 @@ CLIENT_ID = os.getenv('AZURE_CLIENT_ID')
 TENANT_ID = os.getenv('AZURE_TENANT_ID')
 GRAPH_SCOPES = os.getenv('AZURE_GRAPH_SCOPES', 'User.Read Mail.Read Mail.Send').split(' ')
 
-# Token 緩存路徑（與 01_python_ms_graph 相同位置）
-TOKEN_CACHE_PATH = Path(__file__).parent.parent / 'pri' / 'tokens.json'
+
+@contextmanager
+def graph_timer(operation: str):
+    """記錄 Graph 呼叫耗時與失敗（HTTP 429 由 acall_with_retry 計入 graph_throttled_total）"""
+    with metrics.timer('graph_seconds', operation=operation):
+        yield
 
 
 class GraphClient:
@@ -26,98 +38,40 @@ class GraphClient:
     def __init__(self):
         self.credential = None
         self.graph_client = None
-        self._token_cache = {}
         
-    def _load_token_cache(self):
-        """從文件加載 token 緩存"""
-        if TOKEN_CACHE_PATH.exists():
-            try:
-                with open(TOKEN_CACHE_PATH, 'r', encoding='utf-8') as f:
-                    self._token_cache = json.load(f)
-                print(f"✓ 已加載 token 緩存：{TOKEN_CACHE_PATH}")
-                return True
-            except Exception as e:
-                print(f"⚠ 加載 token 緩存失敗：{e}")
-        return False
-    
-    def _save_token_cache(self, token_data: dict):
-        """保存 token 到文件緩存"""
-        TOKEN_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 添加過期時間
-        import time
-        import base64
-        import json
-        
-        access_token = token_data.get('access_token', '')
-        if access_token and len(access_token.split('.')) == 3:
-            try:
-                # 解析 JWT token 的過期時間
-                payload = access_token.split('.')[1]
-                payload += '=' * (4 - len(payload) % 4)
-                decoded = json.loads(base64.urlsafe_b64decode(payload))
-                token_data['exp'] = decoded.get('exp', int(time.time() + 3600))
-            except:
-                token_data['exp'] = int(time.time() + 3600)  # 預設 1 小時
-        else:
-            token_data['exp'] = int(time.time() + 3600)
-        
-        try:
-            with open(TOKEN_CACHE_PATH, 'w', encoding='utf-8') as f:
-                json.dump(token_data, f, indent=2)
-            print(f"✓ Token 已保存到：{TOKEN_CACHE_PATH}")
-        except Exception as e:
-            print(f"⚠ 保存 token 失敗：{e}")
-    
-    def _token_is_valid(self) -> bool:
-        """檢查 token 是否有效（包含過期時間檢查）"""
-        if not self._token_cache.get('access_token'):
-            return False
-        
-        # 檢查過期時間
-        import time
-        exp = self._token_cache.get('exp', 0)
-        if exp and exp < time.time():
-            print("⚠️ Token 已過期，需要重新認證")
-            return False
-        
-        # 添加 5 分鐘緩衝時間
-        if exp and exp < time.time() + 300:
-            print("⚠️ Token 即將過期，建議重新認證")
-            return False
-        
-        return True
-    
     def authenticate(self, use_cache: bool = True):
         """
-        使用 Device Code 進行認證
+        使用 Device Code 進行認證（已認證時直接返回，可重複呼叫）
+        
+        token 保存在持久化快取中（含 refresh token）：已有登入記錄時靜默取得或刷新，
+        不需要瀏覽器登入，也不會為了驗證而額外請求 token
         
         Args:
-            use_cache: 是否使用緩存的 token（預設 True）
+            use_cache: 是否使用保存的登入記錄（False 時強制重新登入）
         """
+        if self.credential and self.graph_client:
+            return True
+        
         print("\n" + "=" * 60)
         print("🔐 Microsoft Graph API 認證")
         print("=" * 60)
         
-        # 嘗試使用緩存的 token
-        if use_cache and self._load_token_cache():
-            if self._token_is_valid():
-                print("✓ 使用緩存的 token")
-                # 注意：DeviceCodeCredential 不支持直接設置 token
-                # 但我們可以跳過瀏覽器，直接嘗試 API 調用
-                # 如果 token 過期，會自動觸發重新認證
-                print("⚠ 如果 token 過期，將自動重新認證")
+        if use_cache and has_authentication_record():
+            print("✓ 使用保存的登入記錄（token 由快取靜默取得）")
+        else:
+            print("🌐 請依提示到 https://microsoft.com/devicelogin 完成登入")
         
-        # 創建 DeviceCodeCredential
-        self.credential = DeviceCodeCredential(
-            client_id=CLIENT_ID,
-            tenant_id=TENANT_ID
-        )
+        try:
+            with graph_timer('authenticate'):
+                device_code_login(GRAPH_SCOPES, tenant_id=TENANT_ID, client_id=CLIENT_ID,
+                                  force=not use_cache)
+        except Exception as e:
+            print(f"✗ 認證失敗：{e}")
+            return False
         
-        # 創建 Graph 客戶端
-        self.graph_client = GraphServiceClient(
-            credentials=self.credential,
-            scopes=GRAPH_SCOPES
+        # 共用的 DeviceCodeCredential 與 Graph 客戶端（整個程序只建立一次）
+        self.credential, self.graph_client = get_service_client(
+            GRAPH_SCOPES, DEVICE_CODE, tenant_id=TENANT_ID, client_id=CLIENT_ID
         )
         
         print("✓ 認證客戶端已初始化")
@@ -139,7 +93,8 @@ class GraphClient:
             return None
         
         try:
-            user = await self.graph_client.me.get()
+            with graph_timer('get_user'):
+                user = await acall_with_retry(lambda: self.graph_client.me.get())
             return {
                 'display_name': user.display_name,
                 'email': user.mail or user.user_principal_name,
@@ -180,7 +135,8 @@ class GraphClient:
             request_body = SendMailPostRequestBody()
             request_body.message = message
             
-            await self.graph_client.me.send_mail.post(body=request_body)
+            with graph_timer('send_mail'):
+                await acall_with_retry(lambda: self.graph_client.me.send_mail.post(body=request_body), 'mail')
             print(f"✓ 郵件已發送到：{to_email}")
             return True
             
@@ -188,8 +144,15 @@ class GraphClient:
             print(f"✗ 發送郵件失敗：{e}")
             return False
     
-    async def upload_to_onedrive(self, file_path: str, drive_path: str = None):
-        """上傳文件到 OneDrive"""
+    async def upload_to_onedrive(self, file_path: str, drive_path: str = None, progress=None):
+        """
+        上傳文件到 OneDrive（超過 4 MB 時以 upload session 分塊上傳，可續傳）
+        
+        Args:
+            file_path: 本機文件
+            drive_path: OneDrive 路徑（預設根目錄下同名）
+            progress: 分塊上傳的進度回呼 progress(已上傳位元組, 總位元組)
+        """
         if not self.graph_client:
             print("✗ 請先認證")
             return False
@@ -206,12 +169,24 @@ class GraphClient:
             if drive_path is None:
                 drive_path = f"/{file_path.name}"
             
+            if needs_upload_session(file_path):
+                loop = asyncio.get_running_loop()
+                item = await loop.run_in_executor(None, functools.partial(
+                    upload_large_file, self.access_token, file_path, drive_path,
+                    progress=progress or print_progress, session=get_http_session()))
+                if item is None:
+                    return False
+                print(f"✓ 文件已上傳到 OneDrive: {drive_path}")
+                return True
+            
             # 讀取文件內容
             with open(file_path, 'rb') as f:
                 content = f.read()
             
             # 上傳到 OneDrive
-            await self.graph_client.me.drive.root.item_by_path(drive_path).content.put(content)
+            with graph_timer('upload'):
+                await acall_with_retry(
+                    lambda: self.graph_client.me.drive.root.item_by_path(drive_path).content.put(content), 'drive')
             
             print(f"✓ 文件已上傳到 OneDrive: {drive_path}")
             return True
@@ -231,13 +206,15 @@ class GraphClient:
             from msgraph import GraphServiceClient
             
             # 使用簡單的查詢方式
-            messages = await self.graph_client.me.mail_folders.by_mail_folder_id('inbox').messages.get(
-                query_parameters={
-                    '$select': 'from,isRead,receivedDateTime,subject',
-                    '$top': top,
-                    '$orderby': 'receivedDateTime DESC'
-                }
-            )
+            with graph_timer('list_messages'):
+                messages = await acall_with_retry(
+                    lambda: self.graph_client.me.mail_folders.by_mail_folder_id('inbox').messages.get(
+                        query_parameters={
+                            '$select': 'from,isRead,receivedDateTime,subject',
+                            '$top': top,
+                            '$orderby': 'receivedDateTime DESC'
+                        }
+                    ), 'mail')
 
             if messages and messages.value:
                 result = []
@@ -255,6 +232,106 @@ class GraphClient:
             print(f"✗ 獲取郵件失敗：{e}")
             return None
 
+    def access_token(self) -> str:
+        """從 credential 取得 access token（供 $batch 使用）"""
+        return self.credential.get_token(*GRAPH_SCOPES).token
+
+    def batch(self, **kwargs) -> GraphBatcher:
+        """
+        建立批次請求收集器（with 區塊結束時送出）
+
+        Args:
+            **kwargs: 傳給 GraphBatcher 的參數（max_batch、max_retries 等）
+
+        Returns:
+            GraphBatcher，未認證時為 None
+        """
+        if not self.credential:
+            print("✗ 請先認證")
+            return None
+        kwargs.setdefault('session', get_http_session())
+        return GraphBatcher(self.access_token, **kwargs)
+
+    def send_emails(self, messages: List[Dict]) -> List[bool]:
+        """
+        以 $batch 一次發送多封郵件
+
+        Args:
+            messages: [{'to_email', 'subject', 'body', 'html'(可選)}]
+
+        Returns:
+            每封郵件是否成功
+        """
+        batcher = self.batch()
+        if batcher is None:
+            return [False] * len(messages)
+
+        with batcher:
+            futures = [batcher.submit(**send_mail_request(m['to_email'], m['subject'], m['body'],
+                                                          m.get('html', False)))
+                       for m in messages]
+        return self._batch_results(futures, [m['to_email'] for m in messages], '發送郵件')
+
+    def upload_files(self, files: List[Dict]) -> List[bool]:
+        """
+        以 $batch 一次上傳多個小檔案到 OneDrive（超過 4 MB 的檔案改以 upload session 分塊上傳）
+
+        Args:
+            files: [{'file_path', 'drive_path'(可選)}]
+
+        Returns:
+            每個檔案是否成功（無法讀取的檔案為 False）
+        """
+        batcher = self.batch()
+        if batcher is None:
+            return [False] * len(files)
+
+        results = [False] * len(files)
+        futures, names, positions, large = [], [], [], []
+        with batcher:
+            for i, item in enumerate(files):
+                file_path = Path(item['file_path'])
+                drive_path = item.get('drive_path') or file_path.name
+                try:
+                    if needs_upload_session(file_path):
+                        large.append((i, file_path, drive_path))
+                        continue
+                    content = file_path.read_bytes()
+                except OSError as e:
+                    print(f"✗ 上傳失敗（{drive_path}）：{e}")
+                    continue
+                futures.append(batcher.submit(**upload_request(drive_path, content)))
+                names.append(drive_path)
+                positions.append(i)
+
+        if futures:
+            for i, ok in zip(positions, self._batch_results(futures, names, '上傳')):
+                results[i] = ok
+
+        for i, file_path, drive_path in large:
+            item = upload_large_file(self.access_token, file_path, drive_path,
+                                     progress=print_progress, session=get_http_session())
+            results[i] = item is not None
+            if item is not None:
+                print(f"✓ 文件已上傳到 OneDrive: {drive_path}")
+        return results
+
+    @staticmethod
+    def _batch_results(futures, names: List[str], action: str) -> List[bool]:
+        """整理批次結果並印出失敗項目"""
+        results = []
+        for future, name in zip(futures, names):
+            try:
+                response = future.result()
+                if not response.ok:
+                    print(f"✗ {action}失敗（{name}）：HTTP {response.status}")
+                results.append(response.ok)
+            except Exception as e:
+                print(f"✗ {action}失敗（{name}）：{e}")
+                results.append(False)
+        print(f"✓ {action}：{sum(results)}/{len(results)} 成功（$batch）")
+        return results
+
 
 # 全局實例
 _graph_client = None
@@ -284,12 +361,6 @@ async def test_graph_api():
     if user:
         print(f"✓ 用戶：{user['display_name']}")
         print(f"✓ Email: {user['email']}")
-        
-        # 保存 token
-        client._save_token_cache({
-            'graph_scopes': ' '.join(GRAPH_SCOPES),
-            'access_token': 'saved_after_auth'  # 實際 token 由 credential 管理
-        })
 
     # 測試 2: 列出收件匣郵件
     print("\n" + "=" * 60)
@@ -308,5 +379,4 @@ async def test_graph_api():
 
 
 if __name__ == '__main__':
-    import asyncio
     asyncio.run(test_graph_api())
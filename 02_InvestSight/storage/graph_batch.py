@@ -0,0 +1,218 @@
+"""
+Microsoft Graph JSON 批次請求
+收集多個 Graph 操作，每 20 個合併為一次 $batch 請求，回應依 id 對應回各自的 Future；
+單一項目被限流（429）時依 Retry-After 等待後只重送該項目
+"""
+import base64
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from monitoring.metrics import metrics
+from .throttling import RetryPolicy, call_with_retry, get_limiter, retry_after
+
+# Graph 端點
+GRAPH_BASE_URL = 'https://graph.microsoft.com/v1.0'
+
+# 單次 $batch 的請求數上限（Graph 限制）
+MAX_BATCH_SIZE = 20
+
+
+class GraphResponse:
+    """批次中單一請求的回應"""
+
+    def __init__(self, status: int, headers: Optional[Dict] = None, body=None):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def __repr__(self):
+        return f"GraphResponse(status={self.status})"
+
+
+class GraphBatchError(Exception):
+    """整個 $batch 請求失敗"""
+
+
+class GraphBatcher:
+    """Graph 批次請求收集器"""
+
+    def __init__(self, token_provider: Callable[[], str], base_url: str = GRAPH_BASE_URL,
+                 session: Optional[requests.Session] = None, max_batch: int = MAX_BATCH_SIZE,
+                 max_retries: int = 3, timeout: float = 60, policy: Optional[RetryPolicy] = None):
+        """
+        初始化
+
+        Args:
+            token_provider: 回傳 access token 的函數
+            base_url: Graph 端點（測試時指向本機替身伺服器）
+            session: HTTP 連線（None 時新建）
+            max_batch: 每次 $batch 的請求數（不超過 20）
+            max_retries: 429/503/504 的重試次數
+            timeout: HTTP 逾時（秒）
+            policy: 重試策略（None 時以 max_retries 建立）
+        """
+        self.token_provider = token_provider
+        self.base_url = base_url.rstrip('/')
+        self.session = session or requests.Session()
+        self.max_batch = min(max_batch, MAX_BATCH_SIZE)
+        self.policy = policy or RetryPolicy(max_retries=max_retries)
+        self.timeout = timeout
+        self._pending: List[Dict] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+
+    def submit(self, method: str, url: str, body=None, headers: Optional[Dict] = None) -> Future:
+        """
+        加入一個 Graph 操作（flush 時才送出）
+
+        Args:
+            method: HTTP 方法
+            url: 相對路徑（如 '/me/sendMail'）
+            body: dict（JSON）或 bytes（以 base64 傳送）
+            headers: 額外標頭
+
+        Returns:
+            Future，結果為 GraphResponse
+        """
+        headers = dict(headers or {})
+        if isinstance(body, (bytes, bytearray)):
+            body = base64.b64encode(bytes(body)).decode('ascii')
+            headers.setdefault('Content-Type', 'application/octet-stream')
+        elif body is not None:
+            headers.setdefault('Content-Type', 'application/json')
+
+        request = {'id': str(next(self._ids)), 'method': method.upper(), 'url': '/' + url.lstrip('/')}
+        if headers:
+            request['headers'] = headers
+        if body is not None:
+            request['body'] = body
+
+        future = Future()
+        with self._lock:
+            self._pending.append({'request': request, 'future': future, 'attempt': 0})
+        return future
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _post(self, requests_: List[Dict]) -> Dict:
+        """送出一次 $batch；整體被限流時依共用重試策略等待後重送"""
+        def post():
+            self.requests_sent += 1
+            with metrics.timer('graph_seconds', operation='batch'):
+                return self.session.post(
+                    f"{self.base_url}/$batch",
+                    json={'requests': requests_},
+                    headers={'Authorization': f"Bearer {self.token_provider()}"},
+                    timeout=self.timeout,
+                )
+
+        response = call_with_retry(post, 'batch', self.policy)
+        if response.status_code != 200:
+            raise GraphBatchError(f"$batch 失敗: HTTP {response.status_code} {response.text[:200]}")
+        return response.json()
+
+    def _send_chunk(self, items: List[Dict]) -> List[Dict]:
+        """送出一批，完成的項目設定 Future，回傳需要重試的項目"""
+        try:
+            payload = self._post([item['request'] for item in items])
+        except Exception as e:
+            for item in items:
+                item['future'].set_exception(e)
+            return []
+
+        by_id = {item['request']['id']: item for item in items}
+        retry = []
+        for entry in payload.get('responses', []):
+            item = by_id.pop(str(entry.get('id')), None)
+            if item is None:
+                continue
+            response = GraphResponse(entry.get('status', 0), entry.get('headers'), entry.get('body'))
+            if self.policy.should_retry(response.status, item['attempt']):
+                if response.status == 429:
+                    metrics.inc('graph_throttled_total', operation='batch_item')
+                get_limiter('batch').on_throttle()
+                item['retry_after'] = self.policy.delay(item['attempt'], retry_after(response.headers))
+                item['attempt'] += 1
+                retry.append(item)
+            else:
+                item['future'].set_result(response)
+
+        for item in by_id.values():
+            item['future'].set_exception(GraphBatchError(f"回應缺少請求 {item['request']['id']}"))
+        return retry
+
+    def flush(self) -> int:
+        """
+        送出所有待處理的操作（每 max_batch 個一批；被限流的項目等待後重送）
+
+        Returns:
+            送出的 HTTP 請求數
+        """
+        with self._lock:
+            queue, self._pending = self._pending, []
+
+        sent_before = self.requests_sent
+        while queue:
+            retry = []
+            for i in range(0, len(queue), self.max_batch):
+                retry += self._send_chunk(queue[i:i + self.max_batch])
+            if retry:
+                time.sleep(max(item.pop('retry_after', 0) for item in retry))
+            queue = retry
+        return self.requests_sent - sent_before
+
+    def __enter__(self) -> 'GraphBatcher':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+
+# 常用操作
+def send_mail_request(to_email: str, subject: str, body: str, html: bool = False) -> Dict:
+    """
+    /me/sendMail 的請求內容
+
+    Returns:
+        {'method', 'url', 'body'}（可直接 submit(**request)）
+    """
+    return {
+        'method': 'POST',
+        'url': '/me/sendMail',
+        'body': {
+            'message': {
+                'subject': subject,
+                'body': {'contentType': 'HTML' if html else 'Text', 'content': body},
+                'toRecipients': [{'emailAddress': {'address': to_email}}],
+            },
+        },
+    }
+
+
+def channel_message_request(team_id: str, channel_id: str, html: str) -> Dict:
+    """Teams 頻道訊息的請求內容"""
+    return {
+        'method': 'POST',
+        'url': f'/teams/{team_id}/channels/{channel_id}/messages',
+        'body': {'body': {'contentType': 'html', 'content': html}},
+    }
+
+
+def upload_request(drive_path: str, content: bytes) -> Dict:
+    """OneDrive 小檔案上傳（4 MB 以下）的請求內容"""
+    return {
+        'method': 'PUT',
+        'url': f"/me/drive/root:/{drive_path.lstrip('/')}:/content",
+        'body': content,
+    }
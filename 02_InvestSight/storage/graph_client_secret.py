@@ -6,11 +6,11 @@ Microsoft Graph API - Client Secret 認證（自動化）
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from azure.identity import ClientSecretCredential
-from msgraph import GraphServiceClient
 import json
 import asyncio
 
+from storage.client_factory import CLIENT_SECRET as CLIENT_SECRET_KIND, get_service_client
+
 load_dotenv()
 
 # 配置（從 .env 讀取）
@@ -35,6 +35,9 @@ class ClientSecretGraphClient:
         Returns:
             bool: 認證是否成功
         """
+        if self.credential and self.graph_client:
+            return True
+        
         print("\n" + "=" * 60)
         print("🔐 Microsoft Graph API - Client Secret 認證")
         print("=" * 60)
@@ -49,17 +52,10 @@ class ClientSecretGraphClient:
             return False
         
         try:
-            # 創建 Client Secret Credential（不需要互動）
-            self.credential = ClientSecretCredential(
-                client_id=CLIENT_ID,
-                tenant_id=TENANT_ID,
-                client_secret=CLIENT_SECRET
-            )
-            
-            # 創建 Graph 客戶端
-            self.graph_client = GraphServiceClient(
-                credentials=self.credential,
-                scopes=SCOPES
+            # 共用的 Client Secret Credential 與 Graph 客戶端（不需要互動）
+            self.credential, self.graph_client = get_service_client(
+                SCOPES, CLIENT_SECRET_KIND,
+                tenant_id=TENANT_ID, client_id=CLIENT_ID, client_secret=CLIENT_SECRET
             )
             
             print("✓ 认证成功！")
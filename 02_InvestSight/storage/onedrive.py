@@ -2,12 +2,18 @@
 OneDrive 文件存儲模組
 通過 Microsoft Graph API 管理 OneDrive 文件
 """
+import asyncio
+import functools
 import os
 from pathlib import Path
 from typing import Optional, List, Dict, BinaryIO
 from datetime import datetime
 from dotenv import load_dotenv
 
+from .client_factory import get_http_session
+from .throttling import acall_with_retry
+from .upload_session import needs_upload_session, print_progress, upload_large_file
+
 load_dotenv()
 
 
@@ -25,8 +31,15 @@ class OneDriveClient:
             self.graph_client = get_graph_client()
             self.graph_client.authenticate(use_cache=True)
     
-    async def upload_file(self, local_path: str, remote_path: str = None) -> bool:
-        """上傳文件"""
+    async def upload_file(self, local_path: str, remote_path: str = None, progress=None) -> bool:
+        """
+        上傳文件（超過 4 MB 時從磁碟分塊串流上傳，中斷後再次呼叫可續傳）
+        
+        Args:
+            local_path: 本機文件
+            remote_path: OneDrive 路徑（預設 base_path 下同名）
+            progress: 分塊上傳的進度回呼 progress(已上傳位元組, 總位元組)
+        """
         self._ensure_client()
         
         try:
@@ -40,10 +53,21 @@ class OneDriveClient:
             
             remote_path = remote_path.lstrip('/')
             
+            if needs_upload_session(local_path):
+                loop = asyncio.get_running_loop()
+                item = await loop.run_in_executor(None, functools.partial(
+                    upload_large_file, self.graph_client.access_token, local_path, remote_path,
+                    progress=progress or print_progress, session=get_http_session()))
+                if item is None:
+                    return False
+                print(f"✓ 已上傳: {remote_path}（分塊）")
+                return True
+            
             with open(local_path, 'rb') as f:
                 content = f.read()
             
-            await self.graph_client.me.drive.root.item_by_path(remote_path).content.put(content)
+            await acall_with_retry(
+                lambda: self.graph_client.me.drive.root.item_by_path(remote_path).content.put(content), 'drive')
             
             print(f"✓ 已上傳: {remote_path}")
             return True
@@ -59,9 +83,9 @@ class OneDriveClient:
         try:
             remote_path = remote_path.lstrip('/')
             
-            await self.graph_client.me.drive.root.item_by_path(remote_path).content.put(
+            await acall_with_retry(lambda: self.graph_client.me.drive.root.item_by_path(remote_path).content.put(
                 content.encode('utf-8')
-            )
+            ), 'drive')
             
             print(f"✓ 已上傳: {remote_path}")
             return True
@@ -80,7 +104,8 @@ class OneDriveClient:
             if local_path is None:
                 local_path = Path.cwd() / Path(remote_path).name
             
-            content = await self.graph_client.me.drive.root.item_by_path(remote_path).content.get()
+            content = await acall_with_retry(
+                lambda: self.graph_client.me.drive.root.item_by_path(remote_path).content.get(), 'drive')
             
             with open(local_path, 'wb') as f:
                 f.write(content)
@@ -99,9 +124,11 @@ class OneDriveClient:
         try:
             if path:
                 path = path.lstrip('/')
-                result = await self.graph_client.me.drive.root.item_by_path(path).children.get()
+                result = await acall_with_retry(
+                    lambda: self.graph_client.me.drive.root.item_by_path(path).children.get(), 'drive')
             else:
-                result = await self.graph_client.me.drive.root.children.get()
+                result = await acall_with_retry(
+                    lambda: self.graph_client.me.drive.root.children.get(), 'drive')
             
             files = []
             if result and result.value:
@@ -129,7 +156,8 @@ class OneDriveClient:
         try:
             remote_path = remote_path.lstrip('/')
             
-            await self.graph_client.me.drive.root.item_by_path(remote_path).delete()
+            await acall_with_retry(
+                lambda: self.graph_client.me.drive.root.item_by_path(remote_path).delete(), 'drive')
             
             print(f"✓ 已刪除: {remote_path}")
             return True
@@ -158,7 +186,8 @@ class OneDriveClient:
             else:
                 parent_path = f"{self.base_path}/{parent_path}"
             
-            await self.graph_client.me.drive.root.item_by_path(parent_path).children.post(drive_item)
+            await acall_with_retry(
+                lambda: self.graph_client.me.drive.root.item_by_path(parent_path).children.post(drive_item), 'drive')
             
             print(f"✓ 已創建文件夾: {path}")
             return True
@@ -182,7 +211,8 @@ class OneDriveClient:
             permission.link = SharingLink()
             permission.link.type = LinkType(type)
             
-            result = await self.graph_client.me.drive.root.item_by_path(remote_path).permissions.post(permission)
+            result = await acall_with_retry(
+                lambda: self.graph_client.me.drive.root.item_by_path(remote_path).permissions.post(permission), 'drive')
             
             if result and result.link and result.link.web_url:
                 print(f"✓ 獲取分享連結成功")
@@ -0,0 +1,305 @@
+"""
+Graph 限流處理
+所有 Graph 呼叫共用的重試與並行控制：
+- RetryPolicy：HTTP 429/503/504 依 Retry-After 等待（沒有時以指數退避加隨機抖動）後重試
+- AIMDLimiter：每種資源（郵件、Teams、Excel、OneDrive 等）一個並行上限，
+  成功時緩慢增加、被限流時減半，使吞吐量維持在租戶限流門檻附近而不失敗
+"""
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Optional
+
+from monitoring.metrics import metrics
+
+# 可重試的狀態碼
+RETRY_STATUS = (429, 503, 504)
+
+# 各資源的初始並行上限（Excel 工作簿寫入最容易被限流）
+DEFAULT_LIMITS = {
+    'mail': 4,
+    'teams': 2,
+    'excel': 2,
+    'drive': 8,
+    'batch': 4,
+    'default': 4,
+}
+
+
+def status_code(obj) -> Optional[int]:
+    """
+    取得 HTTP 狀態碼（SDK 的 APIError、requests 的 HTTPError 或 Response）
+
+    Returns:
+        狀態碼，無法判斷時 None
+    """
+    code = getattr(obj, 'response_status_code', None)
+    if code is None:
+        code = getattr(obj, 'status_code', None)
+    if code is None:
+        code = getattr(getattr(obj, 'response', None), 'status_code', None)
+    return code
+
+
+def retry_after(obj) -> Optional[float]:
+    """
+    取得 Retry-After 秒數（標頭字典、Response 或帶回應標頭的例外）
+
+    Returns:
+        秒數，沒有時 None
+    """
+    headers = obj if isinstance(obj, dict) else getattr(obj, 'response_headers', None)
+    if headers is None:
+        headers = getattr(obj, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(obj, 'response', None), 'headers', None)
+    for key, value in dict(headers or {}).items():
+        if str(key).lower() == 'retry-after':
+            if isinstance(value, (list, tuple)):
+                value = next(iter(value), None)
+            try:
+                return max(float(value), 0.0)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class RetryPolicy:
+    """依 Retry-After 等待並加上抖動的重試策略"""
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 jitter: float = 0.5, retry_status=RETRY_STATUS):
+        """
+        初始化
+
+        Args:
+            max_retries: 最大重試次數
+            base_delay: 指數退避的起始秒數
+            max_delay: 單次等待上限（秒）
+            jitter: Retry-After 之外額外加上的最大隨機秒數（避免同時重試）
+            retry_status: 可重試的狀態碼
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_status = tuple(retry_status)
+
+    def should_retry(self, code: Optional[int], attempt: int) -> bool:
+        """此狀態碼在第 attempt 次（從 0 起算）失敗後是否重試"""
+        return code in self.retry_status and attempt < self.max_retries
+
+    def delay(self, attempt: int, after: Optional[float] = None) -> float:
+        """
+        計算等待秒數
+
+        Args:
+            attempt: 第幾次重試（從 0 起算）
+            after: 伺服器要求的 Retry-After 秒數
+
+        Returns:
+            等待秒數（有 Retry-After 時不少於其值）
+        """
+        if after is not None:
+            return min(after, self.max_delay) + random.uniform(0, self.jitter)
+        # full jitter：0 到指數上限之間隨機
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class AIMDLimiter:
+    """加法增加、乘法減少的並行上限"""
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 decrease: float = 0.5, cooldown: float = 1.0):
+        """
+        初始化
+
+        Args:
+            initial: 初始並行數
+            min_limit: 下限
+            max_limit: 上限
+            decrease: 被限流時的縮減倍數
+            cooldown: 兩次縮減的最短間隔（秒；同一波限流只縮減一次）
+        """
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def current(self) -> int:
+        """目前允許的並行數"""
+        return max(self.min_limit, int(self.limit))
+
+    def try_acquire(self) -> bool:
+        """取得一個名額（不等待）"""
+        with self._cond:
+            if self.in_flight < self.current:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """取得一個名額（等待到有空位）"""
+        with self._cond:
+            while self.in_flight >= self.current:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        """歸還名額"""
+        with self._cond:
+            self.in_flight = max(self.in_flight - 1, 0)
+            self._cond.notify_all()
+
+    def on_success(self):
+        """成功：每個完整並行窗口增加 1"""
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+            self._cond.notify_all()
+
+    def on_throttle(self):
+        """被限流：縮減並行數"""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(float(self.min_limit), self.limit * self.decrease)
+                self._last_decrease = now
+
+    @contextmanager
+    def slot(self):
+        """同步名額"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def async_slot(self, poll: float = 0.01):
+        """非同步名額（輪詢等待，不阻塞事件迴圈）"""
+        while not self.try_acquire():
+            await asyncio.sleep(poll)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_limiters: Dict[str, AIMDLimiter] = {}
+_limiters_lock = threading.Lock()
+
+# 預設重試策略
+default_policy = RetryPolicy()
+
+
+def get_limiter(resource: str) -> AIMDLimiter:
+    """
+    取得資源的共用並行控制器
+
+    Args:
+        resource: 資源類型（mail、teams、excel、drive、batch 等）
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(resource)
+        if limiter is None:
+            initial = DEFAULT_LIMITS.get(resource, DEFAULT_LIMITS['default'])
+            limiter = _limiters[resource] = AIMDLimiter(initial=initial)
+        return limiter
+
+
+def _throttled(resource: str, code: Optional[int], limiter: AIMDLimiter):
+    if code == 429:
+        metrics.inc('graph_throttled_total', operation=resource)
+    limiter.on_throttle()
+
+
+def _succeeded(code: Optional[int]) -> bool:
+    """非 HTTP 回應（SDK 回傳的模型物件）或 2xx 視為成功"""
+    return code is None or 200 <= code < 300
+
+
+def call_with_retry(func: Callable, resource: str = 'default', policy: Optional[RetryPolicy] = None):
+    """
+    同步呼叫並處理限流（例外或回應的狀態碼為 429/503/504 時等待後重試）
+
+    Args:
+        func: 無參數函數（例如 lambda: session.post(...)）
+        resource: 資源類型
+        policy: 重試策略（預設 default_policy）
+
+    Returns:
+        func 的回傳值（重試用盡時回傳最後一次的回應，或拋出最後一次的例外）
+    """
+    policy = policy or default_policy
+    limiter = get_limiter(resource)
+    attempt = 0
+    while True:
+        with limiter.slot():
+            try:
+                result = func()
+            except Exception as e:
+                code = status_code(e)
+                if not policy.should_retry(code, attempt):
+                    if code in policy.retry_status:
+                        _throttled(resource, code, limiter)
+                    raise
+                failure = e
+            else:
+                code = status_code(result)
+                if not policy.should_retry(code, attempt):
+                    if _succeeded(code):
+                        limiter.on_success()
+                    elif code in policy.retry_status:
+                        _throttled(resource, code, limiter)
+                    return result
+                failure = result
+        _throttled(resource, code, limiter)
+        time.sleep(policy.delay(attempt, retry_after(failure)))
+        attempt += 1
+
+
+async def acall_with_retry(factory: Callable, resource: str = 'default', policy: Optional[RetryPolicy] = None):
+    """
+    非同步版本的 call_with_retry
+
+    Args:
+        factory: 每次呼叫產生新協程的無參數函數（例如 lambda: client.me.send_mail.post(...)）
+        resource: 資源類型
+        policy: 重試策略
+
+    Returns:
+        協程的結果
+    """
+    policy = policy or default_policy
+    limiter = get_limiter(resource)
+    attempt = 0
+    while True:
+        async with limiter.async_slot():
+            try:
+                result = await factory()
+            except Exception as e:
+                code = status_code(e)
+                if not policy.should_retry(code, attempt):
+                    if code in policy.retry_status:
+                        _throttled(resource, code, limiter)
+                    raise
+                failure = e
+            else:
+                limiter.on_success()
+                return result
+        _throttled(resource, code, limiter)
+        await asyncio.sleep(policy.delay(attempt, retry_after(failure)))
+        attempt += 1
+
+
+def reset():
+    """清除所有並行控制器（測試使用）"""
+    with _limiters_lock:
+        _limiters.clear()
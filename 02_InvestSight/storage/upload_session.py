@@ -0,0 +1,274 @@
+"""
+OneDrive 大檔案上傳（Graph upload session）
+超過簡單上傳上限（4 MB）的檔案以 upload session 分塊上傳：
+- 從磁碟串流讀取，每塊為 320 KiB 的整數倍，不把整個檔案載入記憶體
+- 上傳目前這塊時，背景執行緒預先讀取下一塊
+- 上傳狀態保存在 data/cache/uploads，中斷後再次呼叫會向伺服器查詢進度並從斷點續傳
+- 每塊完成後呼叫進度回呼
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import quote
+
+import requests
+
+from monitoring.metrics import metrics
+from .throttling import RetryPolicy, call_with_retry
+
+# Graph 端點
+GRAPH_BASE_URL = 'https://graph.microsoft.com/v1.0'
+
+# 簡單上傳（單次 PUT）的大小上限
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+
+# 分塊大小必須是 320 KiB 的整數倍
+CHUNK_MULTIPLE = 320 * 1024
+DEFAULT_CHUNK_SIZE = 16 * CHUNK_MULTIPLE  # 5 MiB
+
+# 續傳狀態目錄
+UPLOAD_STATE_DIR = Path(__file__).resolve().parent.parent / 'data' / 'cache' / 'uploads'
+
+
+class UploadError(Exception):
+    """分塊上傳失敗（狀態已保存，可再次呼叫續傳）"""
+
+
+def _chunk_size(size: int) -> int:
+    """調整為 320 KiB 的整數倍（至少一個單位）"""
+    return max(CHUNK_MULTIPLE, size - size % CHUNK_MULTIPLE)
+
+
+def _next_offset(ranges) -> Optional[int]:
+    """nextExpectedRanges（如 ['5242880-']）的起點"""
+    if not ranges:
+        return None
+    return int(str(ranges[0]).split('-')[0])
+
+
+class UploadSession:
+    """單一檔案的分塊上傳"""
+
+    def __init__(self, token_provider: Callable[[], str], local_path, drive_path: str,
+                 base_url: str = GRAPH_BASE_URL, session: Optional[requests.Session] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, progress: Optional[Callable[[int, int], None]] = None,
+                 state_dir=None, policy: Optional[RetryPolicy] = None, timeout: float = 120):
+        """
+        初始化
+
+        Args:
+            token_provider: 回傳 access token 的函數（只用於建立 session）
+            local_path: 本機檔案
+            drive_path: OneDrive 路徑（相對根目錄）
+            base_url: Graph 端點
+            session: HTTP 連線
+            chunk_size: 分塊大小（自動調整為 320 KiB 的整數倍）
+            progress: 進度回呼 progress(已上傳位元組, 總位元組)
+            state_dir: 續傳狀態目錄（預設 data/cache/uploads）
+            policy: 重試策略
+            timeout: 單次請求逾時（秒）
+        """
+        self.token_provider = token_provider
+        self.local_path = Path(local_path)
+        self.drive_path = drive_path.strip('/')
+        self.base_url = base_url.rstrip('/')
+        self.session = session or requests.Session()
+        self.chunk_size = _chunk_size(chunk_size)
+        self.progress = progress
+        self.state_dir = Path(state_dir or UPLOAD_STATE_DIR)
+        self.policy = policy or RetryPolicy()
+        self.timeout = timeout
+
+        stat = self.local_path.stat()
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.upload_url = None
+        self.chunks_sent = 0
+
+    @property
+    def state_path(self) -> Path:
+        """續傳狀態檔（依本機檔案、大小、修改時間與目的路徑區分）"""
+        key = f"{self.local_path.resolve()}|{self.size}|{self.mtime}|{self.drive_path}"
+        return self.state_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]}.json"
+
+    def _load_state(self) -> Optional[Dict]:
+        try:
+            state = json.loads(self.state_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        expires = state.get('expiration')
+        if expires:
+            try:
+                expiry = datetime.fromisoformat(expires.replace('Z', '+00:00'))
+                if expiry.tzinfo is None:
+                    expiry = expiry.replace(tzinfo=timezone.utc)
+                if expiry <= datetime.now(timezone.utc):
+                    return None
+            except ValueError:
+                pass
+        return state
+
+    def _save_state(self, expiration: Optional[str]):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        state = {
+            'upload_url': self.upload_url,
+            'expiration': expiration,
+            'local_path': str(self.local_path),
+            'drive_path': self.drive_path,
+            'size': self.size,
+        }
+        tmp = self.state_path.with_name(self.state_path.name + '.tmp')
+        tmp.write_text(json.dumps(state, indent=2), encoding='utf-8')
+        tmp.replace(self.state_path)
+
+    def _clear_state(self):
+        try:
+            self.state_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _create(self) -> int:
+        """建立 upload session，回傳起始位置"""
+        url = f"{self.base_url}/me/drive/root:/{quote(self.drive_path)}:/createUploadSession"
+        response = call_with_retry(lambda: self.session.post(
+            url,
+            json={'item': {'@microsoft.graph.conflictBehavior': 'replace'}},
+            headers={'Authorization': f"Bearer {self.token_provider()}"},
+            timeout=self.timeout,
+        ), 'drive', self.policy)
+        if response.status_code != 200:
+            raise UploadError(f"建立上傳工作階段失敗: HTTP {response.status_code} {response.text[:200]}")
+        data = response.json()
+        self.upload_url = data['uploadUrl']
+        self._save_state(data.get('expirationDateTime'))
+        return 0
+
+    def _resume(self) -> Optional[int]:
+        """從保存的狀態續傳：向伺服器查詢下一個位置，工作階段失效時回傳 None"""
+        state = self._load_state()
+        if not state:
+            return None
+        self.upload_url = state['upload_url']
+        # upload URL 已含授權，不帶 Authorization 標頭
+        response = call_with_retry(lambda: self.session.get(self.upload_url, timeout=self.timeout),
+                                   'drive', self.policy)
+        if response.status_code != 200:
+            self._clear_state()
+            return None
+        offset = _next_offset(response.json().get('nextExpectedRanges'))
+        if offset is not None:
+            print(f"↻ 續傳 {self.drive_path}：從 {offset / 1024 / 1024:.1f} MB 繼續")
+        return offset
+
+    def _read(self, f, offset: int) -> bytes:
+        f.seek(offset)
+        return f.read(min(self.chunk_size, self.size - offset))
+
+    def _put(self, offset: int, chunk: bytes) -> requests.Response:
+        end = offset + len(chunk) - 1
+        with metrics.timer('graph_seconds', operation='upload_chunk'):
+            return call_with_retry(lambda: self.session.put(
+                self.upload_url,
+                data=chunk,
+                headers={
+                    'Content-Length': str(len(chunk)),
+                    'Content-Range': f"bytes {offset}-{end}/{self.size}",
+                },
+                timeout=self.timeout,
+            ), 'drive', self.policy)
+
+    def upload(self) -> Dict:
+        """
+        上傳（有保存的工作階段時續傳）
+
+        Returns:
+            完成後的 driveItem
+
+        Raises:
+            UploadError: 上傳失敗（狀態已保存，可再次呼叫續傳）
+        """
+        offset = self._resume()
+        if offset is None:
+            offset = self._create()
+
+        if self.progress:
+            self.progress(offset, self.size)
+
+        with open(self.local_path, 'rb') as f, ThreadPoolExecutor(max_workers=1) as reader:
+            pending = reader.submit(self._read, f, offset)
+            while True:
+                chunk = pending.result()
+                next_offset = offset + len(chunk)
+                # 上傳這一塊時預先讀取下一塊
+                if next_offset < self.size:
+                    pending = reader.submit(self._read, f, next_offset)
+
+                response = self._put(offset, chunk)
+                self.chunks_sent += 1
+
+                if response.status_code in (200, 201):
+                    self._clear_state()
+                    if self.progress:
+                        self.progress(self.size, self.size)
+                    return response.json()
+                if response.status_code != 202:
+                    raise UploadError(f"上傳分塊失敗（{offset}）: HTTP {response.status_code} {response.text[:200]}")
+
+                expected = _next_offset(response.json().get('nextExpectedRanges'))
+                offset = next_offset if expected is None else expected
+                if self.progress:
+                    self.progress(offset, self.size)
+                if expected is not None and expected != next_offset:
+                    # 伺服器要求的位置與預讀不同：丟棄預讀，改讀伺服器要的位置
+                    if next_offset < self.size:
+                        pending.result()
+                    pending = reader.submit(self._read, f, offset)
+
+    def cancel(self):
+        """取消上傳並刪除伺服器上的工作階段"""
+        if self.upload_url is None:
+            state = self._load_state()
+            self.upload_url = state['upload_url'] if state else None
+        if self.upload_url:
+            try:
+                self.session.delete(self.upload_url, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"⚠ 取消上傳工作階段失敗：{e}")
+        self._clear_state()
+
+
+def upload_large_file(token_provider: Callable[[], str], local_path, drive_path: str,
+                      progress: Optional[Callable[[int, int], None]] = None, **kwargs) -> Optional[Dict]:
+    """
+    以 upload session 上傳檔案（失敗時保存狀態，下次呼叫續傳）
+
+    Args:
+        token_provider: 回傳 access token 的函數
+        local_path: 本機檔案
+        drive_path: OneDrive 路徑
+        progress: 進度回呼 progress(已上傳位元組, 總位元組)
+        **kwargs: 傳給 UploadSession 的參數
+
+    Returns:
+        driveItem，失敗時 None
+    """
+    try:
+        return UploadSession(token_provider, local_path, drive_path, progress=progress, **kwargs).upload()
+    except (UploadError, requests.RequestException, OSError) as e:
+        print(f"✗ 分塊上傳失敗：{e}")
+        return None
+
+
+def print_progress(uploaded: int, total: int):
+    """預設進度回呼：印出百分比"""
+    percent = uploaded / total * 100 if total else 100
+    print(f"   ⬆ {uploaded / 1024 / 1024:7.1f} / {total / 1024 / 1024:.1f} MB ({percent:5.1f}%)", flush=True)
+
+
+def needs_upload_session(path) -> bool:
+    """檔案是否超過簡單上傳上限"""
+    return os.path.getsize(path) > SIMPLE_UPLOAD_LIMIT
@@ -90,6 +90,68 @@ class TestSentimentAnalyzer:
         assert len(result) == 2
         assert 'sentiment' in result[0]
         assert 'sentiment' in result[1]
+    
+    def test_keyword_matcher_word_boundaries(self):
+        """測試關鍵詞比對使用單字邊界"""
+        from analysis.sentiment import keyword_matcher
+        
+        # 'up' 不應匹配 'supply'；複數字尾與多字詞可匹配
+        assert keyword_matcher.count("Supply chain outlook") == (0, 0)
+        assert keyword_matcher.count("Sell-off deepens as stocks crashes into bear market") == (3, 0)
+        # 同一關鍵詞重複出現只計一次
+        assert keyword_matcher.count("Profit up, profit up again") == (0, 2)
+    
+    def test_analyze_batch_dedupes_in_order(self):
+        """測試批量分析去重並保持輸入順序"""
+        from analysis.sentiment import SentimentAnalyzer
+        analyzer = SentimentAnalyzer(workers=1)
+        
+        texts = [
+            "Stock surges to record high",
+            "The meeting is scheduled for tomorrow.",
+            "Stock surges to record high",
+            "Markets crash on war fears",
+        ]
+        
+        with patch('analysis.sentiment._textblob_polarity', return_value=0.0) as mock_polarity:
+            result = analyzer.analyze_batch(texts)
+        
+        assert [r['sentiment'] for r in result] == ['positive', 'neutral', 'positive', 'negative']
+        # 只有關鍵詞無法判斷的文本進入 TextBlob，且相同文本只算一次
+        assert mock_polarity.call_count == 1
+        assert result[0] is not result[2]
+    
+    def test_persistent_cache(self, tmp_path):
+        """測試持久化緩存與關鍵詞變更後失效"""
+        from analysis.sentiment import SentimentAnalyzer, KeywordMatcher
+        from analysis.sentiment_cache import SentimentCache
+        
+        cache = SentimentCache(tmp_path / 'sentiment.sqlite')
+        text = "The meeting is scheduled for tomorrow."
+        
+        with patch('analysis.sentiment._textblob_polarity', return_value=0.0) as mock_polarity:
+            SentimentAnalyzer(cache=cache).analyze_text(text)
+            SentimentAnalyzer(cache=cache).analyze_text(text)
+            assert mock_polarity.call_count == 1
+            
+            # 關鍵詞列表變更 → 簽名不同，重新計算
+            matcher = KeywordMatcher(['crash'], ['meeting'])
+            result = SentimentAnalyzer(cache=cache, matcher=matcher).analyze_text(text)
+            assert result['sentiment'] == 'positive'
+        
+        assert cache.hits == 1
+        cache.close()
+
+    def test_textblob_imported_lazily(self):
+        """測試匯入模組時不載入 TextBlob"""
+        import subprocess
+
+        code = ("import sys; import analysis.sentiment; "
+                "print('textblob' in sys.modules)")
+        output = subprocess.run([sys.executable, '-c', code],
+                                cwd=str(Path(__file__).resolve().parent.parent),
+                                capture_output=True, text=True, check=True).stdout
+        assert output.strip() == 'False'
 
 
 class TestNewsFetcher:
@@ -200,5 +262,1100 @@ class TestReportGenerator:
         assert 'Test summary' in text
 
 
+class TestAlertRules:
+    """測試表達式警示規則"""
+    
+    def test_rule_vectorized_over_symbols(self):
+        """測試一條規則對整個快照一次計算"""
+        from data.alert_rules import AlertRuleEngine, build_snapshot
+        
+        engine = AlertRuleEngine()
+        engine.add_rule('rsi14 < 30 and close > ma20')
+        engine.add_rule('pct_change_15m > 3', symbols=['MSFT'])
+        
+        snapshot = build_snapshot([
+            {'symbol': 'AAPL', 'close': 150.0, 'ma20': 140.0, 'rsi14': 25.0, 'pct_change_15m': 5.0},
+            {'symbol': 'MSFT', 'close': 300.0, 'ma20': 310.0, 'rsi14': 20.0, 'pct_change_15m': 4.0},
+            {'symbol': 'TSLA', 'close': 200.0, 'ma20': 190.0, 'rsi14': None, 'pct_change_15m': 1.0},
+        ])
+        
+        triggered = engine.evaluate(snapshot)
+        hits = sorted((t['symbol'], t['expression']) for t in triggered)
+        
+        assert hits == [('AAPL', 'rsi14 < 30 and close > ma20'), ('MSFT', 'pct_change_15m > 3')]
+        # 已觸發的規則不會重複通知
+        assert engine.evaluate(snapshot) == []
+    
+    def test_rule_rejects_unsafe_expression(self):
+        """測試拒絕不支援的語法"""
+        from data.alert_rules import CompiledCondition
+        
+        with pytest.raises(ValueError):
+            CompiledCondition("__import__('os').system('ls')")
+
+
+class TestAlertRearm:
+    """測試警示遲滯與冷卻"""
+    
+    def test_price_alert_hysteresis(self):
+        """測試價格回到帶寬外才重新啟用"""
+        from data.price_monitor import PriceMonitor
+        
+        monitor = PriceMonitor()
+        monitor.add_alert('AAPL', 100.0, 'above', hysteresis=2.0)
+        
+        assert len(monitor.check_price('AAPL', 101.0)) == 1
+        assert monitor.check_price('AAPL', 102.0) == []
+        # 回落不足 2%，仍停用
+        assert monitor.check_price('AAPL', 99.0) == []
+        assert monitor.check_price('AAPL', 101.0) == []
+        # 回落至 98 以下後重新啟用
+        assert monitor.check_price('AAPL', 97.5) == []
+        assert len(monitor.check_price('AAPL', 101.0)) == 1
+    
+    def test_price_alert_cooldown(self):
+        """測試冷卻時間後重新啟用"""
+        from data.price_monitor import PriceMonitor
+        
+        now = [1000.0]
+        monitor = PriceMonitor()
+        monitor.clock = lambda: now[0]
+        monitor.add_alert('AAPL', 100.0, 'above', cooldown_seconds=60)
+        monitor.add_alert('MSFT', 300.0, 'above')
+        
+        assert len(monitor.check_price('AAPL', 101.0)) == 1
+        now[0] += 30
+        assert monitor.check_price('AAPL', 101.0) == []
+        now[0] += 31
+        assert len(monitor.check_price('AAPL', 101.0)) == 1
+        
+        # 未設定策略的警示維持停用
+        assert len(monitor.check_price('MSFT', 301.0)) == 1
+        now[0] += 3600
+        assert monitor.check_price('MSFT', 301.0) == []
+    
+    def test_rule_rearm_condition(self):
+        """測試表達式規則的遲滯重新啟用"""
+        from data.alert_rules import AlertRuleEngine, build_snapshot
+        
+        engine = AlertRuleEngine()
+        engine.add_rule('rsi14 < 30', rearm='rsi14 > 35')
+        
+        def tick(rsi):
+            return engine.evaluate(build_snapshot([{'symbol': 'AAPL', 'rsi14': rsi}]), now=0)
+        
+        assert len(tick(25)) == 1
+        assert tick(28) == []
+        assert tick(32) == []
+        assert tick(28) == []
+        assert tick(40) == []
+        assert len(tick(25)) == 1
+    
+    def test_rule_cooldown_heap(self):
+        """測試冷卻到期與遲滯重新啟用後的過期堆積項目"""
+        from data.alert_rules import AlertRuleEngine, build_snapshot
+        
+        engine = AlertRuleEngine()
+        engine.add_rule('rsi14 < 30', rearm='rsi14 > 35', cooldown_seconds=60)
+        
+        def tick(rows, now):
+            return engine.evaluate(build_snapshot(rows), now=now)
+        
+        assert len(tick([{'symbol': 'AAPL', 'rsi14': 25}], 0)) == 1
+        # 遲滯重新啟用後於 t=40 再次觸發，t=0 的冷卻項目到期時不應清除新的觸發
+        assert tick([{'symbol': 'AAPL', 'rsi14': 40}], 10) == []
+        assert len(tick([{'symbol': 'AAPL', 'rsi14': 25}], 40)) == 1
+        assert tick([{'symbol': 'AAPL', 'rsi14': 25}], 70) == []
+        # 快照中沒有該股票時冷卻照樣到期
+        assert tick([{'symbol': 'MSFT', 'rsi14': 50}], 100) == []
+        assert len(tick([{'symbol': 'AAPL', 'rsi14': 25}], 101)) == 1
+        
+        engine.rearm('AAPL')
+        assert len(tick([{'symbol': 'AAPL', 'rsi14': 25}], 102)) == 1
+
+
+class TestAlertDispatcher:
+    """測試非阻塞警示派送"""
+    
+    def test_slow_callback_does_not_block(self):
+        """測試慢速回調不阻塞價格檢查"""
+        import time
+        from data.price_monitor import PriceMonitor
+        
+        received = []
+        
+        def slow_callback(alert):
+            time.sleep(0.2)
+            received.append(alert['symbol'])
+        
+        monitor = PriceMonitor()
+        monitor.add_callback(slow_callback)
+        monitor.add_alert('AAPL', 100.0, 'above')
+        monitor.add_alert('MSFT', 300.0, 'above')
+        
+        start = time.monotonic()
+        monitor.check_price('AAPL', 101.0)
+        monitor.check_price('MSFT', 301.0)
+        assert time.monotonic() - start < 0.2
+        
+        monitor.close()
+        assert sorted(received) == ['AAPL', 'MSFT']
+    
+    def test_queue_full_merge_and_drop(self):
+        """測試佇列已滿時的合併與丟棄"""
+        import threading
+        from data.alert_dispatch import AlertDispatcher
+        
+        gate = threading.Event()
+        dispatcher = AlertDispatcher([lambda alert: gate.wait(5)], maxsize=2, workers=1)
+        
+        dispatcher.submit({'symbol': 'A', 'type': 'above'})
+        # 等待第一筆被 worker 取走
+        for _ in range(100):
+            if dispatcher.depth == 0:
+                break
+            threading.Event().wait(0.01)
+        
+        # 佇列未滿時同鍵警示各自入列，不合併
+        dispatcher.submit({'symbol': 'B', 'type': 'above'})
+        dispatcher.submit({'symbol': 'B', 'type': 'above'})
+        assert dispatcher.get_stats()['merged'] == 0
+        
+        # 佇列已滿：沒有同鍵的待送警示時丟棄最舊，有則合併
+        dispatcher.submit({'symbol': 'C', 'type': 'above'})
+        dispatcher.submit({'symbol': 'C', 'type': 'above'})
+        
+        stats = dispatcher.get_stats()
+        assert stats['merged'] == 1
+        assert stats['dropped'] == 1
+        assert stats['queue_depth'] == 2
+        
+        gate.set()
+        dispatcher.close()
+        assert dispatcher.get_stats()['dispatched'] == 3
+
+
+class TestEntityIndex:
+    """測試個股新聞實體索引"""
+    
+    def test_match_tickers_and_company_names(self):
+        """測試代碼與公司名稱比對"""
+        from analysis.entity_index import EntityIndex
+        
+        index = EntityIndex()
+        index.add_symbols([
+            {'symbol': 'AAPL', 'name': 'Apple Inc.'},
+            {'symbol': 'ON', 'name': 'ON Semiconductor Corporation'},
+        ])
+        
+        assert index.match("apple shares rise, $AAPL up") == ['AAPL']
+        # 代碼大小寫敏感，避免比對到一般英文
+        assert index.match("pineapple prices on the rise") == []
+        assert index.match("ON Semiconductor beats estimates") == ['ON']
+    
+    def test_time_decayed_aggregate(self):
+        """測試時間衰減彙總情感"""
+        from datetime import datetime, timezone
+        from analysis.entity_index import EntityIndex
+        
+        index = EntityIndex(half_life_hours=24)
+        index.add_symbol('AAPL', 'Apple Inc.')
+        index.index([
+            {'title': 'Apple beats', 'published': 'Fri, 02 Jan 2026 00:00:00 GMT',
+             'sentiment': {'sentiment': 'positive', 'polarity': 0.3}},
+            {'title': 'AAPL falls', 'published': '2026-01-01T00:00:00',
+             'sentiment': {'sentiment': 'negative', 'polarity': -0.3}},
+            {'title': 'Unrelated news', 'sentiment': {'polarity': -0.9}},
+        ])
+        
+        result = index.aggregate('AAPL', now=datetime(2026, 1, 2, tzinfo=timezone.utc))
+        # 權重 1 與 0.5：(0.3 - 0.15) / 1.5
+        assert result['polarity'] == pytest.approx(0.1)
+        assert result['sentiment'] == 'positive'
+        assert result['article_count'] == 2
+        assert index.aggregate('MSFT') is None
+
+
+class TestNewsPipeline:
+    """測試串流新聞情感管線"""
+    
+    def test_stream_dedupes_and_aggregates(self):
+        """測試並行抓取、去重、評分與彙總"""
+        from types import SimpleNamespace
+        from data.news_api import NewsFetcher
+        from analysis.sentiment import SentimentAnalyzer
+        from analysis.news_pipeline import SentimentAggregator, stream_sentiment
+        
+        def entry(title, link):
+            return SimpleNamespace(title=title, link=link, source=None,
+                                   get=lambda key, default=None: default)
+        
+        feeds = {
+            'feed1': SimpleNamespace(entries=[entry('Stock surges', 'a'), entry('Markets crash', 'b')]),
+            'feed2': SimpleNamespace(entries=[entry('Stock surges', 'a'), entry('Profit jumps', 'c')]),
+        }
+        fetcher = NewsFetcher()
+        fetcher.rss_feeds = ['feed1', 'feed2']
+        aggregator = SentimentAggregator(keep_recent=2)
+        
+        with patch('data.news_api.feedparser.parse', side_effect=feeds.get):
+            articles = list(stream_sentiment(fetcher, SentimentAnalyzer(workers=1),
+                                             aggregator, batch_size=2))
+        
+        assert sorted(a['link'] for a in articles) == ['a', 'b', 'c']
+        assert all('sentiment' in a for a in articles)
+        stats = aggregator.to_dict()
+        assert (stats['positive'], stats['negative']) == (2, 1)
+        assert len(aggregator.recent) == 2
+    
+    def test_score_is_lazy(self):
+        """測試評分階段逐批產生，不預先讀完輸入"""
+        from analysis.sentiment import SentimentAnalyzer
+        from analysis.news_pipeline import score
+        
+        consumed = []
+        
+        def source():
+            for i in range(1000):
+                consumed.append(i)
+                yield {'title': f'Stock surges {i}', 'link': str(i)}
+        
+        first = next(score(source(), SentimentAnalyzer(workers=1), batch_size=10))
+        assert first['sentiment']['sentiment'] == 'positive'
+        assert len(consumed) == 10
+
+
+class TestUniverseScoring:
+    """測試向量化股票池評分"""
+    
+    def test_matches_per_symbol_scoring(self):
+        """測試批量評分與逐支 analyze_technical 結果一致"""
+        import random
+        from analysis.technical_indicators import analyze_stock
+        from analysis.investment_advisor import InvestmentAdvisor, indicator_columns
+        
+        random.seed(7)
+        advisor = InvestmentAdvisor()
+        indicators_list = []
+        for length in [10, 25, 40, 60, 80] * 20:
+            prices = [100.0]
+            for _ in range(length - 1):
+                prices.append(prices[-1] * (1 + random.gauss(0, 0.03)))
+            indicators = analyze_stock('TEST', prices)
+            indicators['current_price'] = prices[-1] * random.choice([0.95, 1.0, 1.05])
+            indicators_list.append(indicators)
+        
+        result = advisor.score_universe(indicator_columns(indicators_list))
+        
+        for i, indicators in enumerate(indicators_list):
+            expected = advisor.analyze_technical(dict(indicators))
+            assert result['score'][i] == expected['score']
+            assert result['recommendation'][i] == expected['recommendation']
+            assert result['confidence'][i] == pytest.approx(expected['confidence'])
+            assert result['risk_level'][i] == advisor._assess_risk(indicators)
+    
+    def test_rank_top_n(self):
+        """測試排序與前 N 名"""
+        import numpy as np
+        from analysis.investment_advisor import InvestmentAdvisor
+        
+        columns = {'rsi14': np.array([50, 25, 75, 35]), 'close': np.array([10, 10, 10, 10]),
+                   'ma20': np.array([9, 9, 11, 11])}
+        ranked = InvestmentAdvisor().rank_universe(['A', 'B', 'C', 'D'], columns, top=2)
+        
+        assert [r['symbol'] for r in ranked] == ['B', 'A']
+        assert ranked[0]['score'] == 40
+        assert ranked[0]['risk_level'] == '中風險'
+
+
+class TestScreener:
+    """測試股票篩選引擎"""
+    
+    def test_incremental_store_matches_indicators(self):
+        """測試增量更新的指標與 TechnicalIndicators 一致"""
+        import random
+        from analysis.technical_indicators import analyze_stock
+        from analysis.screener import IndicatorStore
+        
+        random.seed(11)
+        prices = [100.0]
+        for _ in range(79):
+            prices.append(prices[-1] * (1 + random.gauss(0, 0.02)))
+        
+        store = IndicatorStore(capacity=1)
+        store.load_history('OTHER', prices[:30])
+        store.load_history('AAPL', prices)
+        snapshot = store.snapshot()
+        row = snapshot.index['AAPL']
+        expected = analyze_stock('AAPL', prices)
+        
+        for name in ['ma20', 'ma60', 'rsi14', 'macd', 'signal', 'histogram', 'upper', 'lower']:
+            assert snapshot.columns[name][row] == pytest.approx(expected[name][-1])
+        assert snapshot.columns['macd_prev'][row] == pytest.approx(expected['macd'][-2])
+    
+    def test_query_filter_and_top_n(self):
+        """測試篩選條件與前 N 名"""
+        from analysis.screener import IndicatorStore, Screener
+        
+        store = IndicatorStore()
+        for i, symbol in enumerate(['A', 'B', 'C', 'D']):
+            # 連續下跌的股票 RSI 為 0，上漲的為 100
+            step = -1 if i % 2 else 1
+            store.load_history(symbol, [100 + step * (n + i) for n in range(20)])
+        
+        screener = Screener(store)
+        results = screener.query('rsi14 < 30', sort_by='close', ascending=True, top=1)
+        assert [r['symbol'] for r in results] == ['D']
+        
+        results = screener.query(sort_by='close', top=3)
+        assert [r['symbol'] for r in results] == ['C', 'A', 'B']
+        
+        with pytest.raises(ValueError):
+            screener.query('__import__("os")')
+
+
+class TestBacktest:
+    """測試向量化回測"""
+    
+    def test_panel_scores_match_per_day_analysis(self):
+        """測試整段歷史的評分與逐日呼叫 analyze_technical 一致"""
+        import numpy as np
+        from analysis.backtest import compute_indicators
+        from analysis.technical_indicators import analyze_stock
+        from analysis.investment_advisor import InvestmentAdvisor
+        
+        rng = np.random.default_rng(5)
+        closes = 100 * np.cumprod(1 + rng.normal(0, 0.02, (90, 3)), axis=0)
+        closes[:25, 1] = np.nan  # 較晚上市
+        
+        advisor = InvestmentAdvisor()
+        score = advisor.score_universe(compute_indicators(closes))['score']
+        
+        for j in range(3):
+            series = closes[:, j]
+            first = int(np.argmax(~np.isnan(series)))
+            for t in range(first, 90, 5):
+                prices = list(series[first:t + 1])
+                indicators = analyze_stock('TEST', prices)
+                indicators['current_price'] = prices[-1]
+                assert score[t, j] == advisor.analyze_technical(indicators)['score']
+    
+    def test_next_bar_execution_and_costs(self):
+        """測試次日進場與交易成本"""
+        import numpy as np
+        from analysis.backtest import Backtester
+        
+        closes = np.array([[100.0], [110.0], [121.0], [121.0]])
+        score = np.array([[30.0], [0.0], [-30.0], [0.0]])
+        backtester = Backtester(cost_bps=100)
+        
+        sim = backtester.simulate(closes, backtester.positions(score))
+        
+        # 第 0 根收盤買入訊號 → 第 1 根持有；第 2 根收盤賣出 → 第 3 根空手
+        assert list(sim['held'][:, 0]) == [0, 1, 1, 0]
+        assert sim['returns'][1, 0] == pytest.approx(0.10 - 0.01)
+        assert sim['returns'][2, 0] == pytest.approx(0.10)
+        assert sim['returns'][3, 0] == pytest.approx(-0.01)
+
+
+class TestParameterSweep:
+    """測試參數掃描"""
+    
+    def test_sweep_matches_direct_backtest(self):
+        """測試共享記憶體並行掃描與直接回測結果一致"""
+        import numpy as np
+        import pandas as pd
+        from analysis.backtest import Backtester
+        from analysis.investment_advisor import InvestmentAdvisor
+        from analysis.param_sweep import ParameterSweep, grid_configs
+        
+        rng = np.random.default_rng(3)
+        closes = pd.DataFrame(100 * np.cumprod(1 + rng.normal(0, 0.02, (150, 4)), axis=0))
+        configs = grid_configs({'oversold': [25, 30], 'overbought': [70],
+                                'buy_threshold': [10, 20], 'sell_threshold': [-20, 20]})
+        # 賣出門檻 ≥ 買入門檻的組合被略過
+        assert len(configs) == 4
+        
+        sweep = ParameterSweep(closes, cost_bps=5)
+        parallel = sweep.run(configs, workers=2, objective='total_return')
+        serial = sweep.run(configs, workers=1, objective='total_return')
+        assert parallel == serial
+        
+        best = parallel[0]['params']
+        advisor = InvestmentAdvisor()
+        advisor.rsi_levels = {'oversold': best['oversold'], 'overbought': best['overbought']}
+        direct = Backtester(advisor, buy_threshold=best['buy_threshold'],
+                            sell_threshold=best['sell_threshold'], cost_bps=5).run(closes)
+        assert direct['metrics'] == parallel[0]['metrics']
+
+
+class TestPrefetchHistory:
+    """測試批量預取歷史數據"""
+    
+    def test_single_download_then_cache(self, tmp_path, monkeypatch):
+        """測試缺少的股票一次下載，之後由緩存取得"""
+        import pandas as pd
+        import data.historical_data as hd
+        
+        monkeypatch.setattr(hd, 'HISTORY_CACHE_DIR', tmp_path)
+        monkeypatch.setattr(hd, '_history_cache', {})
+        
+        index = pd.date_range('2024-01-01', periods=3)
+        columns = pd.MultiIndex.from_product([['AAPL', 'MSFT'], ['Open', 'High', 'Low', 'Close', 'Volume']])
+        frame = pd.DataFrame([[1, 2, 0.5, 1.5, 100, 10, 12, 9, 11, 200]] * 3,
+                             index=index, columns=columns, dtype=float)
+        
+        with patch('data.historical_data.yf.download', return_value=frame) as mock_download:
+            result = hd.prefetch_history(['MSFT', 'AAPL', 'MSFT'], period='6mo')
+            assert mock_download.call_count == 1
+            assert mock_download.call_args[0][0] == ['MSFT', 'AAPL']
+            assert list(result) == ['MSFT', 'AAPL']
+            assert result['AAPL']['prices'] == [1.5, 1.5, 1.5]
+            assert result['MSFT']['current_price'] == 11.0
+            assert result['MSFT']['dates'][0] == '2024-01-01'
+            
+            # 清空記憶體緩存後仍可由磁碟讀回
+            hd._history_cache.clear()
+            again = hd.prefetch_history(['AAPL', 'MSFT'], period='6mo')
+            assert mock_download.call_count == 1
+            assert again['AAPL']['prices'] == result['AAPL']['prices']
+    
+    def test_prefetch_info_cached(self, tmp_path, monkeypatch):
+        """測試股票信息並行查詢後由緩存取得"""
+        import data.historical_data as hd
+        
+        monkeypatch.setattr(hd, 'INFO_CACHE_DIR', tmp_path)
+        monkeypatch.setattr(hd, '_info_cache', {})
+        
+        def fake_info(symbol):
+            return {} if symbol == 'BAD' else {'symbol': symbol, 'name': f'{symbol} Inc.'}
+        
+        with patch('data.historical_data.get_stock_info', side_effect=fake_info) as mock_info:
+            result = hd.prefetch_info(['MSFT', 'AAPL', 'BAD', 'MSFT'])
+            assert mock_info.call_count == 3
+            assert list(result) == ['MSFT', 'AAPL']
+            assert result['AAPL']['name'] == 'AAPL Inc.'
+            
+            # 清空記憶體緩存後由磁碟讀回，失敗的股票下次重試
+            hd._info_cache.clear()
+            again = hd.prefetch_info(['AAPL', 'MSFT', 'BAD'])
+            assert mock_info.call_count == 4
+            assert again == result
+
+
+class TestDAGExecutor:
+    """測試工作流 DAG 執行器"""
+    
+    def test_independent_stages_run_concurrently(self):
+        """測試無依賴的階段並行執行，依賴輸出傳給下游"""
+        import time
+        from pipeline import DAGExecutor
+        
+        def slow(value):
+            def run(inputs):
+                time.sleep(0.2)
+                return value
+            return run
+        
+        dag = DAGExecutor(max_workers=4)
+        dag.add('a', slow(1)).add('b', slow(2))
+        dag.add('total', lambda inputs: inputs['a'] + inputs['b'], deps=['a', 'b'])
+        outputs = dag.run()
+        
+        assert outputs['total'] == 3
+        summary = dag.summary()
+        assert [r['name'] for r in summary['stages']] == ['a', 'b', 'total']
+        assert summary['wall_ms'] < summary['serial_ms']
+        assert summary['critical_path_ms'] < summary['serial_ms']
+    
+    def test_failure_and_skip(self):
+        """測試失敗階段的記錄與 skip_on_failure"""
+        from pipeline import DAGExecutor
+        
+        def broken(inputs):
+            raise RuntimeError('boom')
+        
+        dag = DAGExecutor()
+        dag.add('fetch', broken)
+        dag.add('tolerant', lambda inputs: inputs['fetch'] or [], deps=['fetch'])
+        dag.add('strict', lambda inputs: 'sent', deps=['fetch'], skip_on_failure=True)
+        outputs = dag.run()
+        
+        assert dag.records['fetch']['status'] == 'failed'
+        assert dag.records['fetch']['error'] == 'boom'
+        assert outputs['tolerant'] == []
+        assert dag.records['strict']['status'] == 'skipped'
+        assert outputs['strict'] is None
+    
+    def test_cycle_rejected(self):
+        """測試循環依賴"""
+        from pipeline import DAGExecutor
+        
+        dag = DAGExecutor()
+        dag.add('a', lambda inputs: 1, deps=['b']).add('b', lambda inputs: 2, deps=['a'])
+        with pytest.raises(ValueError):
+            dag.run()
+
+
+class TestCheckpoint:
+    """測試階段檢查點與續跑"""
+    
+    def test_resume_skips_unchanged_stages(self, tmp_path):
+        """測試續跑時只重跑上次失敗的階段"""
+        from pipeline import DAGExecutor, CheckpointStore
+        
+        calls = {'fetch': 0, 'send': 0}
+        attempts = iter([False, True])
+        
+        def fetch(inputs):
+            calls['fetch'] += 1
+            return {'prices': [1, 2, 3]}
+        
+        def send(inputs):
+            calls['send'] += 1
+            if not next(attempts):
+                raise ConnectionError('SMTP timeout')
+            return len(inputs['fetch']['prices'])
+        
+        def build(resume):
+            dag = DAGExecutor(checkpoints=CheckpointStore(tmp_path), resume=resume)
+            dag.add('fetch', fetch, params={'date': '2024-01-02'})
+            dag.add('send', send, deps=['fetch'])
+            return dag
+        
+        first = build(resume=False)
+        first.run()
+        assert first.records['send']['status'] == 'failed'
+        
+        second = build(resume=True)
+        outputs = second.run()
+        assert second.records['fetch']['status'] == 'cached'
+        assert second.records['send']['status'] == 'success'
+        assert outputs == {'fetch': {'prices': [1, 2, 3]}, 'send': 3}
+        assert calls == {'fetch': 1, 'send': 2}
+    
+    def test_changed_input_invalidates_downstream(self, tmp_path):
+        """測試上游輸出改變時下游重跑"""
+        from pipeline import DAGExecutor, CheckpointStore
+        
+        values = iter([1, 2])
+        calls = []
+        
+        def build(params):
+            dag = DAGExecutor(checkpoints=CheckpointStore(tmp_path), resume=True)
+            dag.add('source', lambda inputs: next(values), params=params)
+            dag.add('double', lambda inputs: calls.append(1) or inputs['source'] * 2, deps=['source'])
+            return dag
+        
+        assert build({'date': 'd1'}).run()['double'] == 2
+        assert build({'date': 'd1'}).run()['double'] == 2
+        assert build({'date': 'd2'}).run()['double'] == 4
+        assert len(calls) == 2
+    
+    def test_workflow_resends_failed_notification(self, tmp_path, monkeypatch):
+        """測試 Teams 發送失敗時不留下檢查點，續跑時重送"""
+        import pipeline.checkpoint
+        from data.finance_api import fetcher as finance_fetcher
+        from data.news_api import fetcher as news_fetcher
+        from notification import teams_notifier
+        
+        # workflow 匯入時會切換工作目錄，測試結束後還原
+        monkeypatch.chdir(Path.cwd())
+        from scripts.workflow import run_daily_workflow
+        
+        monkeypatch.setattr(pipeline.checkpoint, 'CHECKPOINT_DIR', tmp_path)
+        report = Mock(generate_weekly_report=Mock(return_value={'html': 'weekly.html'}))
+        stocks = [{'symbol': 'AAPL', 'price': 150.0, 'change_percent': 1.0}]
+        with patch.object(finance_fetcher, 'fetch_all_stocks', return_value=stocks) as mock_stocks, \
+                patch.object(news_fetcher, 'iter_all', return_value=iter([])), \
+                patch.dict(sys.modules, {'report': report}), \
+                patch.object(teams_notifier, 'send_daily_summary', side_effect=[False, True]) as mock_send:
+            first = run_daily_workflow(send_teams=True)
+            assert first['teams'] == 'error: Teams 通知發送失敗'
+            
+            second = run_daily_workflow(send_teams=True, resume=True)
+            assert second['teams'] == 'success'
+            assert mock_send.call_count == 2
+            assert mock_stocks.call_count == 1
+
+
+class TestScheduler:
+    """測試常駐排程器"""
+    
+    def test_schedules(self):
+        """測試每日定時與盤中間隔的下次執行時間"""
+        from datetime import datetime
+        from pipeline import Interval, TimeOfDay
+        
+        friday_evening = datetime(2024, 1, 5, 17, 0)
+        assert TimeOfDay('08:00', weekdays=range(5)).next_run(friday_evening) == datetime(2024, 1, 8, 8, 0)
+        assert TimeOfDay('18:30').next_run(friday_evening) == datetime(2024, 1, 5, 18, 30)
+        
+        market = Interval(300, weekdays=range(5), between=('09:30', '16:00'))
+        assert market.next_run(datetime(2024, 1, 8, 10, 0)) == datetime(2024, 1, 8, 10, 5)
+        assert market.next_run(datetime(2024, 1, 8, 15, 58)) == datetime(2024, 1, 9, 9, 30)
+        assert market.next_run(friday_evening) == datetime(2024, 1, 8, 9, 30)
+    
+    def test_run_pending_and_stats(self):
+        """測試到期工作執行、失敗不中斷與統計"""
+        from datetime import datetime, timedelta
+        from pipeline import Scheduler, Interval
+        
+        now = [datetime(2024, 1, 8, 10, 0)]
+        scheduler = Scheduler(clock=lambda: now[0])
+        calls = []
+        
+        def broken():
+            raise RuntimeError('Graph 401')
+        
+        scheduler.add('tick', lambda: calls.append(now[0]), Interval(60), run_now=True)
+        scheduler.add('broken', broken, Interval(120))
+        
+        assert scheduler.run_pending() == ['tick']
+        now[0] += timedelta(seconds=120)
+        assert sorted(scheduler.run_pending()) == ['broken', 'tick']
+        
+        stats = scheduler.stats()
+        assert stats['tick']['runs'] == 2
+        assert stats['broken']['failures'] == 1
+        assert stats['broken']['last_error'] == 'Graph 401'
+        assert stats['tick']['next_run'] == '2024-01-08T10:03:00'
+
+
+class TestRunRecord:
+    """測試執行記錄格式"""
+    
+    def test_round_trip(self, tmp_path):
+        """測試欄式編碼與還原（含無法直接序列化的值）"""
+        from datetime import datetime
+        from pipeline.run_record import write_record, read_record, MAGIC
+        
+        results = {
+            'timestamp': datetime(2024, 1, 2, 8, 0),
+            'stocks': {'count': 2, 'data': [{'symbol': 'AAPL', 'price': 190.5},
+                                            {'symbol': 'MSFT', 'price': 370.0}]},
+            'email': None,
+        }
+        path = write_record(tmp_path / 'daily_1.isr', results)
+        assert path.read_bytes()[:4] == MAGIC
+        
+        data = read_record(path)
+        assert data['timestamp'] == '2024-01-02T08:00:00'
+        assert data['stocks'] == results['stocks']
+        assert data['email'] is None
+    
+    def test_delta_chain(self, tmp_path):
+        """測試差異記錄只保存變動並可沿鏈還原"""
+        from pipeline.run_record import write_record, read_record, latest_record
+        
+        articles = [{'title': f'news {i}', 'summary': 'x' * 200} for i in range(50)]
+        first = {'news': {'data': articles}, 'sentiment': {'summary': '中性'}}
+        second = {'news': {'data': articles[5:] + [{'title': 'fresh', 'summary': 'y'}]},
+                  'sentiment': {'summary': '中性'}}
+        third = {'news': {'data': articles[5:]}, 'sentiment': {'summary': '樂觀'}}
+        
+        full = write_record(tmp_path / 'daily_1.isr', first)
+        delta = write_record(tmp_path / 'daily_2.isr', second, base_path=latest_record(tmp_path, 'daily'))
+        write_record(tmp_path / 'daily_3.isr', third, base_path=latest_record(tmp_path, 'daily'))
+        
+        assert delta.stat().st_size < full.stat().st_size
+        assert read_record(tmp_path / 'daily_2.isr') == second
+        assert read_record(tmp_path / 'daily_3.isr', with_meta=True)['depth'] == 2
+        assert read_record(tmp_path / 'daily_3.isr') == third
+    
+    def test_rejects_foreign_file(self, tmp_path):
+        """測試非執行記錄檔案"""
+        from pipeline.run_record import read_record
+        
+        path = tmp_path / 'daily.json'
+        path.write_text('{"a": 1}')
+        with pytest.raises(ValueError):
+            read_record(path)
+
+
+class TestMetrics:
+    """測試量測模塊"""
+    
+    def test_counters_timers_and_export(self, tmp_path):
+        """測試計數器、計時器失敗計數與兩種輸出格式"""
+        import json
+        from monitoring.metrics import MetricsRegistry
+        
+        registry = MetricsRegistry()
+        registry.inc('cache_requests_total', cache='history', result='hit')
+        registry.inc('cache_requests_total', 2, cache='history', result='hit')
+        with registry.timer('fetch_seconds', source='quote'):
+            pass
+        with pytest.raises(ConnectionError):
+            with registry.timer('fetch_seconds', source='quote'):
+                raise ConnectionError('timeout')
+        
+        assert registry.counter_value('cache_requests_total', cache='history', result='hit') == 3
+        assert registry.counter_value('fetch_errors_total', source='quote') == 1
+        assert registry.histogram_value('fetch_seconds', source='quote')['count'] == 2
+        
+        text = registry.to_prometheus()
+        assert '# TYPE investsight_fetch_seconds histogram' in text
+        assert 'investsight_cache_requests_total{cache="history",result="hit"} 3' in text
+        assert 'investsight_fetch_seconds_bucket{source="quote",le="+Inf"} 2' in text
+        
+        registry.export(tmp_path / 'metrics.json')
+        data = json.loads((tmp_path / 'metrics.json').read_text())
+        assert data['counters']['fetch_errors_total'][0]['labels'] == {'source': 'quote'}
+    
+    def test_indicator_timing_wired(self):
+        """測試技術指標計算記錄各指標耗時"""
+        from monitoring import metrics
+        from analysis.technical_indicators import TechnicalIndicators
+        
+        before = (metrics.histogram_value('indicator_seconds', indicator='rsi') or {}).get('count', 0)
+        TechnicalIndicators().get_all_indicators([100 + i % 7 for i in range(80)])
+        assert metrics.histogram_value('indicator_seconds', indicator='rsi')['count'] == before + 1
+        assert metrics.histogram_value('indicator_seconds', indicator='atr') is not None
+
+
+class TestProfiling:
+    """測試效能剖析掛鉤"""
+    
+    def test_cprofile_and_sample_outputs(self, tmp_path):
+        """測試兩種模式的輸出檔與回傳值（含執行緒中的工作）"""
+        import pstats
+        import threading
+        import time
+        from monitoring.profiling import run_profiled
+        
+        def spin():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                sum(range(100))
+        
+        def job():
+            worker = threading.Thread(target=spin)
+            worker.start()
+            worker.join()
+            return 42
+        
+        assert run_profiled(job, 'cprofile', 'job', output_dir=tmp_path) == 42
+        stats = pstats.Stats(str(next(tmp_path.glob('job_*.pstats'))))
+        assert any(func[2] == 'spin' for func in stats.stats)
+        
+        assert run_profiled(job, 'sample', 'job', interval=0.002, output_dir=tmp_path) == 42
+        collapsed = next(tmp_path.glob('job_*.collapsed')).read_text()
+        assert 'test_modules.py:spin' in collapsed
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in collapsed.splitlines())
+        
+        assert run_profiled(job, None, 'job', output_dir=tmp_path) == 42
+
+
+class TestClientFactory:
+    """測試共用 Graph 憑證與連線"""
+    
+    def test_credentials_and_clients_are_shared(self):
+        """測試同租戶只建立一次憑證與客戶端，authenticate 可重複呼叫"""
+        pytest.importorskip('azure.identity')
+        pytest.importorskip('msgraph')
+        from storage import client_factory
+        from storage.graph_api import GraphClient
+        
+        client_factory.reset()
+        first = client_factory.get_credential(tenant_id='tenant', client_id='app')
+        assert client_factory.get_credential(tenant_id='tenant', client_id='app') is first
+        assert client_factory.get_credential(tenant_id='other', client_id='app') is not first
+        
+        credential, service = client_factory.get_service_client(['User.Read'], tenant_id='tenant', client_id='app')
+        assert client_factory.get_service_client(['User.Read'], tenant_id='tenant', client_id='app') == (
+            credential, service)
+        assert credential is first
+        
+        client = GraphClient()
+        client.credential, client.graph_client = credential, service
+        assert client.authenticate() and client.graph_client is service
+        
+        session = client_factory.get_http_session()
+        assert client_factory.get_http_session() is session
+        client_factory.reset()
+        assert client_factory.get_http_session() is not session
+    
+    def test_authentication_record_round_trip(self, tmp_path):
+        """測試登入記錄保存與讀取（不含 token）"""
+        pytest.importorskip('azure.identity')
+        from azure.identity import AuthenticationRecord
+        from storage import client_factory
+        
+        path = tmp_path / 'auth_record.json'
+        assert client_factory.load_authentication_record(path) is None
+        record = AuthenticationRecord('tenant', 'app', 'login.microsoftonline.com', 'home-id', 'user@example.com')
+        assert client_factory.save_authentication_record(record, path)
+        loaded = client_factory.load_authentication_record(path)
+        assert loaded.username == 'user@example.com' and loaded.client_id == 'app'
+        assert 'token' not in path.read_text().lower()
+
+
+class TestThrottling:
+    """測試 Graph 限流重試與並行控制"""
+    
+    class _Response:
+        def __init__(self, status, retry_after=None):
+            self.status_code = status
+            self.headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+    
+    def test_retry_after_and_aimd(self):
+        """測試依 Retry-After 重試、成功後回傳，以及被限流時並行數減半"""
+        pytest.importorskip('azure.identity')
+        from storage import throttling
+        
+        throttling.reset()
+        policy = throttling.RetryPolicy(max_retries=3, jitter=0)
+        assert policy.delay(0, 2.5) == 2.5
+        assert 0 <= policy.delay(3) <= 8
+        
+        responses = [self._Response(429, 0), self._Response(503, 0), self._Response(200)]
+        result = throttling.call_with_retry(lambda: responses.pop(0), 'excel', policy)
+        assert result.status_code == 200 and not responses
+        
+        limiter = throttling.get_limiter('excel')
+        # 初始 2 → 429 減半為 1（503 在冷卻期內不再縮減）→ 成功後加 1
+        assert limiter.limit == 2.0 and limiter.in_flight == 0
+        
+        exhausted = throttling.call_with_retry(lambda: self._Response(429, 0), 'mail',
+                                               throttling.RetryPolicy(max_retries=1, jitter=0))
+        assert exhausted.status_code == 429
+        # 重試用盡的 429 與非限流錯誤都不會提高並行數
+        mail = throttling.get_limiter('mail')
+        assert mail.limit == 2.0
+        for _ in range(5):
+            throttling.call_with_retry(lambda: self._Response(500), 'mail', throttling.RetryPolicy(max_retries=0))
+        assert mail.limit == 2.0
+        
+        aimd = throttling.AIMDLimiter(initial=4, cooldown=0)
+        for _ in range(4):
+            aimd.on_success()
+        assert aimd.current == 4 and aimd.limit > 4.9
+        aimd.on_throttle()
+        assert aimd.current == 2
+    
+    def test_async_retry_on_exception(self):
+        """測試非同步呼叫在 429 例外後重試，非限流例外直接拋出"""
+        pytest.importorskip('azure.identity')
+        import asyncio
+        from storage import throttling
+        
+        class APIError(Exception):
+            def __init__(self, status):
+                self.response_status_code = status
+                self.response_headers = {'retry-after': '0'}
+        
+        calls = []
+        
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise APIError(429)
+            return 'ok'
+        
+        policy = throttling.RetryPolicy(jitter=0)
+        assert asyncio.run(throttling.acall_with_retry(flaky, 'teams', policy)) == 'ok'
+        assert len(calls) == 3
+        
+        async def forbidden():
+            raise APIError(403)
+        
+        with pytest.raises(APIError):
+            asyncio.run(throttling.acall_with_retry(forbidden, 'teams', policy))
+        
+        async def throttled():
+            raise APIError(429)
+        
+        throttling.reset()
+        with pytest.raises(APIError):
+            asyncio.run(throttling.acall_with_retry(throttled, 'mail', throttling.RetryPolicy(max_retries=0)))
+        assert throttling.get_limiter('mail').limit == 2.0
+
+
+class TestUploadSession:
+    """測試 OneDrive 分塊上傳與續傳（本機替身伺服器）"""
+    
+    @pytest.fixture
+    def drive_stub(self):
+        """模擬 createUploadSession 與分塊 PUT；fail_at 指定的位置第一次回 500"""
+        import json
+        import re
+        import threading
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        
+        state = {'data': bytearray(), 'puts': [], 'fail_at': None, 'sessions': 0}
+        
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                state['sessions'] += 1
+                state['data'] = bytearray()
+                self._reply(200, {'uploadUrl': f"http://127.0.0.1:{self.server.server_port}/upload/1",
+                                  'expirationDateTime': '2999-01-01T00:00:00Z'})
+            
+            def do_GET(self):
+                self._reply(200, {'nextExpectedRanges': [f"{len(state['data'])}-"]})
+            
+            def do_PUT(self):
+                chunk = self.rfile.read(int(self.headers['Content-Length']))
+                start, end, total = map(int, re.match(r'bytes (\d+)-(\d+)/(\d+)', self.headers['Content-Range']).groups())
+                state['puts'].append((start, end))
+                if start == state['fail_at']:
+                    state['fail_at'] = None
+                    return self._reply(500, {'error': 'boom'})
+                assert start == len(state['data']) and end - start + 1 == len(chunk)
+                state['data'] += chunk
+                if len(state['data']) == total:
+                    return self._reply(201, {'id': 'item', 'size': total})
+                self._reply(202, {'nextExpectedRanges': [f"{len(state['data'])}-"]})
+            
+            def log_message(self, *args):
+                pass
+        
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield f"http://127.0.0.1:{server.server_port}/v1.0", state
+        server.shutdown()
+        server.server_close()
+    
+    def test_chunked_upload_resumes(self, drive_stub, tmp_path):
+        """測試 320 KiB 倍數分塊、失敗後保存狀態，再次呼叫從斷點續傳"""
+        pytest.importorskip('azure.identity')
+        import os
+        from storage.upload_session import CHUNK_MULTIPLE, UploadError, UploadSession
+        
+        base_url, state = drive_stub
+        local = tmp_path / 'big.bin'
+        content = os.urandom(3 * CHUNK_MULTIPLE + 1000)
+        local.write_bytes(content)
+        options = dict(base_url=base_url, chunk_size=CHUNK_MULTIPLE + 5, state_dir=tmp_path / 'uploads')
+        
+        state['fail_at'] = 2 * CHUNK_MULTIPLE
+        first = UploadSession(lambda: 'token', local, 'InvestSight/big.bin', **options)
+        assert first.chunk_size == CHUNK_MULTIPLE
+        with pytest.raises(UploadError):
+            first.upload()
+        assert first.state_path.exists()
+        
+        progress = []
+        second = UploadSession(lambda: 'token', local, 'InvestSight/big.bin',
+                               progress=lambda done, total: progress.append(done), **options)
+        item = second.upload()
+        
+        assert item == {'id': 'item', 'size': len(content)}
+        assert bytes(state['data']) == content
+        assert state['sessions'] == 1
+        assert second.chunks_sent == 2
+        assert progress[0] == 2 * CHUNK_MULTIPLE and progress[-1] == len(content)
+        assert not second.state_path.exists()
+
+
+class TestGraphBatch:
+    """測試 Graph $batch 批次請求（本機替身伺服器）"""
+    
+    @pytest.fixture
+    def graph_stub(self):
+        """模擬 /v1.0/$batch：每個請求第一次回 429（Retry-After: 0），之後回 204"""
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        
+        state = {'posts': [], 'seen': set()}
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                state['posts'].append(payload['requests'])
+                responses = []
+                for request in payload['requests']:
+                    key = request['url']
+                    if key.endswith('throttled') and key not in state['seen']:
+                        state['seen'].add(key)
+                        responses.append({'id': request['id'], 'status': 429, 'headers': {'Retry-After': '0'}})
+                    else:
+                        responses.append({'id': request['id'], 'status': 201, 'body': {'url': key}})
+                body = json.dumps({'responses': list(reversed(responses))}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_port}/v1.0", state
+        server.shutdown()
+        server.server_close()
+    
+    def test_chunking_and_item_retry(self, graph_stub):
+        """測試每 20 個一批、回應依 id 對應，以及只重送被限流的項目"""
+        pytest.importorskip('azure.identity')
+        from storage.graph_batch import GraphBatcher
+        from monitoring.metrics import metrics
+        
+        base_url, state = graph_stub
+        before = metrics.counter_value('graph_throttled_total', operation='batch_item')
+        with GraphBatcher(lambda: 'token', base_url=base_url) as batcher:
+            futures = [batcher.submit('POST', f'/items/{i}', body={'n': i}) for i in range(25)]
+            futures.append(batcher.submit('PUT', '/items/throttled', body=b'data'))
+        
+        assert [len(post) for post in state['posts']] == [20, 6, 1]
+        assert state['posts'][2][0]['url'] == '/items/throttled'
+        assert state['posts'][1][-1]['headers']['Content-Type'] == 'application/octet-stream'
+        assert [f.result().body['url'] for f in futures[:25]] == [f'/items/{i}' for i in range(25)]
+        assert futures[-1].result().status == 201
+        assert metrics.counter_value('graph_throttled_total', operation='batch_item') == before + 1
+    
+    def test_upload_files_routes_large_and_missing(self, graph_stub, tmp_path, monkeypatch):
+        """測試大檔案改走 upload session、不存在的檔案回傳 False，其餘以 $batch 上傳"""
+        pytest.importorskip('azure.identity')
+        import storage.graph_api as graph_api
+        import storage.upload_session as upload_session
+        from storage.graph_batch import GraphBatcher
+        
+        base_url, state = graph_stub
+        small = tmp_path / 'small.txt'
+        small.write_bytes(b'abc')
+        large = tmp_path / 'large.bin'
+        large.write_bytes(b'x' * 100)
+        
+        monkeypatch.setattr(upload_session, 'SIMPLE_UPLOAD_LIMIT', 10)
+        uploader = Mock(return_value={'id': 'item'})
+        monkeypatch.setattr(graph_api, 'upload_large_file', uploader)
+        client = graph_api.GraphClient()
+        client.credential = Mock()
+        monkeypatch.setattr(client, 'batch', lambda: GraphBatcher(lambda: 'token', base_url=base_url))
+        
+        results = client.upload_files([{'file_path': large}, {'file_path': tmp_path / 'missing.txt'},
+                                       {'file_path': small}])
+        
+        assert results == [True, False, True]
+        assert [request['url'] for request in state['posts'][0]] == ['/me/drive/root:/small.txt:/content']
+        assert uploader.call_args[0][1:] == (large, 'large.bin')
+    
+    def test_transport_error_fails_futures(self):
+        """測試連線失敗時所有 Future 帶例外"""
+        pytest.importorskip('azure.identity')
+        from storage.graph_batch import GraphBatcher
+        
+        batcher = GraphBatcher(lambda: 'token', base_url='http://127.0.0.1:9/v1.0', timeout=1)
+        future = batcher.submit('GET', '/me')
+        batcher.flush()
+        with pytest.raises(Exception):
+            future.result()
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])